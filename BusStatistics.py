@@ -0,0 +1,136 @@
+import numpy as np
+
+#Jitter percentiles reported by id_statistics
+JITTER_PERCENTILES = (50, 95, 99)
+
+
+def grouped_percentiles(values:np.ndarray, counts:np.ndarray, percentiles:tuple) -> np.ndarray:
+    """Percentiles of values within each group, interpolated linearly like np.percentile
+
+    Args:
+        values (np.ndarray): values to take percentiles of, grouped so that each group follows the previous one
+        counts (np.ndarray): number of values in each group
+        percentiles (tuple): percentiles to compute, 0 to 100
+
+    Returns:
+        np.ndarray: one row per group and one column per percentile, NaN for groups without values
+    """
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    #Sorting each group on its own is much faster than sorting by (group, value). Logs have at most a few thousand IDs
+    sorted_values = values.copy()
+    for start, count in zip(starts[counts > 1], counts[counts > 1]):
+        sorted_values[start:start + count].sort()
+    result = np.full((len(counts), len(percentiles)), np.nan)
+    has_values = counts > 0
+    for column, percentile in enumerate(percentiles):
+        position = (counts[has_values] - 1)*percentile/100
+        below = np.floor(position).astype(np.int64)
+        above = np.minimum(below + 1, counts[has_values] - 1)
+        fraction = position - below
+        low = sorted_values[starts[has_values] + below]
+        high = sorted_values[starts[has_values] + above]
+        result[has_values, column] = low + (high - low)*fraction
+    return result
+
+
+def id_statistics(time:np.ndarray, message_id:np.ndarray, exclude_rows:np.ndarray = None) -> dict:
+    """Timing statistics of each message ID, computed for all IDs at once. The period of a message is the time since
+    the previous message with the same ID. Jitter is how far periods are from the median period of the ID
+
+    Args:
+        time (np.ndarray): time of each row in ms
+        message_id (np.ndarray): message ID of each row
+        exclude_rows (np.ndarray, optional): rows to leave out, e.g. messages whose ID could not be decoded. Defaults to None.
+
+    Returns:
+        dict: arrays with one value per ID, sorted by ID:
+            "id", "count", "first_row", "rate" (messages per second over the whole log),
+            "min_period", "mean_period", "median_period", "max_period" (ms),
+            "jitter_p50", "jitter_p95", "jitter_p99" (ms), "longest_gap_row" (row ending the longest period, -1 if none)
+    """
+    rows = np.flatnonzero(np.isfinite(time))
+    if exclude_rows is not None and len(exclude_rows):
+        rows = np.setdiff1d(rows, exclude_rows, assume_unique=True)
+    #Rows of each ID stay in time order
+    rows = rows[np.argsort(message_id[rows], kind="stable")]
+    ids, starts, counts = np.unique(message_id[rows], return_index=True, return_counts=True)
+    group_count = len(ids)
+    groups = np.repeat(np.arange(group_count), counts)
+
+    #A period ends at every message but the first of its ID
+    period_end = np.ones(len(rows), dtype=bool)
+    period_end[starts] = False
+    periods = np.diff(time[rows], prepend=np.nan)[period_end]
+    period_groups = groups[period_end]
+    period_rows = rows[period_end]
+    period_counts = counts - 1
+    has_periods = period_counts > 0
+
+    mean_period = np.full(group_count, np.nan)
+    mean_period[has_periods] = np.bincount(period_groups, weights=periods, minlength=group_count)[has_periods]/period_counts[has_periods]
+    min_period = np.full(group_count, np.nan)
+    max_period = np.full(group_count, np.nan)
+    longest_gap_row = np.full(group_count, -1, dtype=np.int64)
+    if len(periods):
+        #Periods are grouped by ID, so each group starts where the previous one ends
+        period_starts = np.concatenate([[0], np.cumsum(period_counts)[:-1]])[has_periods]
+        min_period[has_periods] = np.minimum.reduceat(periods, period_starts)
+        max_period[has_periods] = np.maximum.reduceat(periods, period_starts)
+        #First period of each group that is as long as the longest one
+        is_longest = periods == max_period[period_groups]
+        longest = np.flatnonzero(is_longest)
+        first_longest = longest[np.unique(period_groups[longest], return_index=True)[1]]
+        longest_gap_row[period_groups[first_longest]] = period_rows[first_longest]
+
+    median_period = grouped_percentiles(periods, period_counts, (50,))[:,0]
+    jitter = np.abs(periods - median_period[period_groups])
+    jitter_percentiles = grouped_percentiles(jitter, period_counts, JITTER_PERCENTILES)
+
+    finite_time = time[np.isfinite(time)]
+    duration = finite_time.max() - finite_time.min() if len(finite_time) else 0.0
+    statistics = {"id": ids,
+                  "count": counts,
+                  "first_row": rows[starts],
+                  "rate": counts*1000/duration if duration > 0 else np.full(group_count, np.nan),
+                  "min_period": min_period,
+                  "mean_period": mean_period,
+                  "median_period": median_period,
+                  "max_period": max_period}
+    for column, percentile in enumerate(JITTER_PERCENTILES):
+        statistics["jitter_p%d" % percentile] = jitter_percentiles[:,column]
+    statistics["longest_gap_row"] = longest_gap_row
+    return statistics
+
+
+def frame_bits(message_id:np.ndarray, dlc:np.ndarray) -> np.ndarray:
+    """Bits each frame occupies on the bus, without stuff bits. IDs above 0x7FF are sent as extended frames
+    """
+    return np.where(message_id > 0x7FF, 67, 47) + 8*dlc.astype(np.int64)
+
+
+def bus_load(time:np.ndarray, message_id:np.ndarray, dlc:np.ndarray, window:float = 1000.0, bitrate:float = None) -> dict:
+    """Message rate and optionally bus load in consecutive windows of time
+
+    Args:
+        time (np.ndarray): time of each row in ms
+        message_id (np.ndarray): message ID of each row
+        dlc (np.ndarray): number of data bytes of each row
+        window (float, optional): width of each window in ms. Defaults to 1000.0.
+        bitrate (float, optional): bitrate of the bus in bit/s. Defaults to None (no bus load).
+
+    Returns:
+        dict: "time" (start of each window in ms), "frames_per_second" and, if bitrate is given, "load" (fraction of
+            the bitrate used, without stuff bits)
+    """
+    finite = np.isfinite(time)
+    if not np.any(finite):
+        return {"time": np.zeros(0), "frames_per_second": np.zeros(0)}
+    start = np.floor(time[finite].min()/window)*window
+    windows = ((time[finite] - start)//window).astype(np.int64)
+    window_count = windows.max() + 1
+    series = {"time": start + np.arange(window_count)*window,
+              "frames_per_second": np.bincount(windows, minlength=window_count)*1000/window}
+    if bitrate:
+        bits = np.bincount(windows, weights=frame_bits(message_id[finite], dlc[finite]), minlength=window_count)
+        series["load"] = bits*1000/window/bitrate
+    return series
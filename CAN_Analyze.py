@@ -1,114 +1,233 @@
 import ctypes
 import csv
-import datetime
 import io
+import multiprocessing
 import os
 import string
 import sys
-import numpy as np
+import time
+from collections import OrderedDict
+
+#Startup is timed from here, see report_startup
+startup_started = time.perf_counter()
+
 from PyQt6 import QtCore, QtGui, QtWidgets
 from PyQt6.QtCore import Qt
-import matplotlib
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+import numpy as np
 
-from DataHandler import DataHandler
+#The plotting stack (PlotCanvas, matplotlib) is imported by MainWindow after the window is shown
+from DataHandler import DataHandler, LoadCancelled
+from LiveCapture import CanViewLogTail, CanViewReplay, PythonCanSource
+from ResourcePaths import resolve_path
+from SignalDecoder import value_range
 
 version = u"0.1.4"
 
-matplotlib.use("QtAgg")
-matplotlib.rcParams["savefig.directory"] = ""
-matplotlib.rcParams["savefig.format"] = "svg"
+COLUMN_NAMES = ["Time", "Delta", "Description", "ID", "D0", "D1", "D2", "D3", "D4", "D5", "D6", "D7", "Colour"]
+
+#Entries added after the log names in the log selector when more than one log is loaded, see MainWindow.show_session_plot
+SESSION_PLOTS = {"All logs, aligned": "aligned", "All logs, stacked": "stacked"}
+
+
+def report_startup(milestone:str):
+    """Prints the time since startup when run with --startup-time. Used to track startup time regressions
+
+    Args:
+        milestone (str): what has just finished
+    """
+    if "--startup-time" in sys.argv:
+        print("%7.3f s  %s" % (time.perf_counter() - startup_started, milestone))
+
+
+#Row background colours used by CanView filters
+CANVIEW_COLOURS = {"RED": (220, 0, 0),
+                   "GREEN": (0, 220, 0),
+                   "BLUE": (0, 128, 255),
+                   "YELLOW": (255, 255, 0),
+                   "GREY": (190, 190, 190),
+                   "PURPLE": (255, 0, 255),
+                   "ORANGE": (255, 128, 64),
+                   "PINK": (255, 100, 177),
+                   "LIGHT_RED": (255, 125, 125),
+                   "LIGHT_GREEN": (213, 255, 213),
+                   "LIGHT_BLUE": (170, 213, 255),
+                   "LIGHT_YELLOW": (255, 255, 190),
+                   "LIGHT_GREY": (223, 223, 223),
+                   "LIGHT_PURPLE": (255, 150, 255),
+                   "LIGHT_ORANGE": (255, 165, 121),
+                   "LIGHT_PINK": (255, 170, 213)}
 
 class TableModel(QtCore.QAbstractTableModel):
 
-    def __init__(self, data):
+    #Display strings are formatted for blocks of rows at a time and the most recently shown blocks are kept
+    block_size = 256
+    max_cached_blocks = 64
+
+    def __init__(self, data, rows:np.ndarray = None):
         super(TableModel, self).__init__()
         self._data = data[0]
         self.column_names = data[1]
+        #Rows of the log shown in the table, see DataHandler.get_visible_rows. None shows every row
+        self.rows = rows
+        self.display_blocks = OrderedDict()
+        #Number of the first row shown in the vertical header, minus one. Rows dropped by a live capture are still counted
+        self.first_row_number = 0
+
+        #Resolve column indices and build brushes once instead of on every call to data
+        self.description_column = self.column_names.index("Description")
+        self.id_column = self.column_names.index("ID")
+        self.white_brush = QtGui.QBrush(QtGui.QColor.fromRgb(255, 255, 255))
+        #CAN msg ID background light green rgb(200, 255, 200).
+        self.id_brush = QtGui.QBrush(QtGui.QColor.fromRgb(200, 255, 200))
+        self.update_palette()
+
+        #Align timestamps in the first two columns to the right. Align description to the left. Align everything else to the center
+        self.alignments = [Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight] * 2 + [Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft]
+        self.centered = Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter
+
+    def update_palette(self):
+        """Builds one brush per colour category of the log so that row colours are looked up by colour code
+        """
+        self.colour_brushes = [QtGui.QBrush(QtGui.QColor.fromRgb(*CANVIEW_COLOURS[colour])) if colour in CANVIEW_COLOURS else self.white_brush
+                               for colour in self._data.colour_categories]
+
+    def invalidate(self):
+        """Drops formatted display strings. Call after the log data has changed
+        """
+        self.display_blocks.clear()
+        self.update_palette()
+
+    def set_rows(self, rows:np.ndarray):
+        """Shows other rows of the log, e.g. after the row filter changed
+
+        Args:
+            rows (np.ndarray): sorted row numbers, or None to show every row
+        """
+        if (rows is None and self.rows is None) or (rows is not None and self.rows is not None and np.array_equal(rows, self.rows)):
+            return
+        self.beginResetModel()
+        self.rows = rows
+        self.display_blocks.clear()
+        self.endResetModel()
+
+    def log_row(self, row:int) -> int:
+        """Converts a row of the table to a row of the log
+        """
+        return row if self.rows is None else int(self.rows[row])
+
+    def table_row(self, log_row:int) -> int:
+        """Converts a row of the log to the row of the table showing it or, if it is hidden, the closest shown row before it
+        """
+        if self.rows is None:
+            return log_row
+        return max(0, int(np.searchsorted(self.rows, log_row, side="right")) - 1)
+
+    def update_data(self, data, column_names:list[str], changed_columns:list[int]):
+        """Replaces the log with a re-annotated version of it that has the same rows and columns. Only display strings
+        of changed columns are formatted again and only those columns are reported as changed to the views
+
+        Args:
+            data (LogStore): re-annotated log
+            column_names (list[str]): column names, trace columns may have been renamed
+            changed_columns (list[int]): indices of columns whose values changed
+        """
+        renamed = [column for column, name in enumerate(column_names) if name != self.column_names[column]]
+        self._data = data
+        self.column_names = column_names
+        self.update_palette()
+        for columns in self.display_blocks.values():
+            for column in changed_columns:
+                columns[column] = None
+
+        last_row = self.rowCount(None) - 1
+        for column in changed_columns:
+            self.dataChanged.emit(self.index(0, column), self.index(last_row, column))
+        if renamed:
+            self.headerDataChanged.emit(Qt.Orientation.Horizontal, min(renamed), max(renamed))
+
+    def append_rows(self, data, dropped:int, first_row_number:int, rows:np.ndarray = None):
+        """Replaces the log with a later version of it with rows added to the end and possibly dropped from the start,
+        e.g. by a live capture. Views are told about the inserted rows and, if rows were dropped, that the others moved
+
+        Args:
+            data (LogStore): the later version of the log
+            dropped (int): number of rows dropped from the start
+            first_row_number (int): total number of rows dropped so far
+            rows (np.ndarray, optional): rows of the later version shown in the table. Defaults to None (every row).
+        """
+        old_rows = self.rowCount(None)
+        new_rows = len(data) if rows is None else len(rows)
+        if new_rows > old_rows:
+            self.beginInsertRows(QtCore.QModelIndex(), old_rows, new_rows - 1)
+        elif new_rows < old_rows:
+            #Fewer of the remaining rows may be shown once rows were dropped
+            self.beginRemoveRows(QtCore.QModelIndex(), new_rows, old_rows - 1)
+        self._data = data
+        self.rows = rows
+        self.first_row_number = first_row_number
+        if dropped:
+            self.display_blocks.clear()
+        else:
+            #Only the last block can have gained rows
+            self.display_blocks.pop(old_rows // self.block_size, None)
+        self.update_palette()
+        if new_rows > old_rows:
+            self.endInsertRows()
+        elif new_rows < old_rows:
+            self.endRemoveRows()
+        if dropped and min(old_rows, new_rows):
+            self.dataChanged.emit(self.index(0, 0), self.index(min(old_rows, new_rows) - 1, self.columnCount(None) - 1))
+            self.headerDataChanged.emit(Qt.Orientation.Vertical, 0, new_rows - 1)
+
+    def format_column(self, block:int, column:int) -> list:
+        """Formats display strings of a column in a block of rows
+
+        Returns:
+            list: display strings
+        """
+        rows = slice(block * self.block_size, (block + 1) * self.block_size)
+        values = self._data.column(column, rows if self.rows is None else self.rows[rows])
+        if column == 0:
+            # Render float to 1 digit
+            return ["%.1f" % value for value in values.tolist()]
+        elif column == 1:
+            # Render float to 1 digit and add +
+            return ["+%.1f" % value for value in values.tolist()]
+        return ["" if text == "nan" else text for text in map(str, values.tolist())]
+
+    def display_string(self, row:int, column:int) -> str:
+        block = row // self.block_size
+        columns = self.display_blocks.get(block)
+        if columns is None:
+            columns = [None] * self._data.shape[1]
+            self.display_blocks[block] = columns
+            if len(self.display_blocks) > self.max_cached_blocks:
+                self.display_blocks.popitem(last=False)
+        else:
+            self.display_blocks.move_to_end(block)
+        if columns[column] is None:
+            columns[column] = self.format_column(block, column)
+        return columns[column][row - block * self.block_size]
 
     def data(self, index, role):
         if role == Qt.ItemDataRole.DisplayRole:
-            value = self._data[index.row(), index.column()]
-            #Format time and delta columns with 1 digit
-            if index.column() == 0:
-                if isinstance(value, float):
-                    # Render float to 1 digit
-                    return "%.1f" % value    
-            if index.column() == 1:
-                if isinstance(value, float):
-                    # Render float to 1 digit and add +
-                    return "+%.1f" % value
-            if str(value)=="nan":
-                return ""
-            return str(value)
-        
-        #Align timestamps in the first two columns to the right. Align description to the left. Align everything else to the center
+            return self.display_string(index.row(), index.column())
+
         if role == Qt.ItemDataRole.TextAlignmentRole:
-            if index.column() == 0 or index.column() == 1:
-                return Qt.AlignmentFlag.AlignVCenter + Qt.AlignmentFlag.AlignRight
-            elif index.column() == 2:
-                return Qt.AlignmentFlag.AlignVCenter + Qt.AlignmentFlag.AlignLeft
-            else:
-                return Qt.AlignmentFlag.AlignVCenter + Qt.AlignmentFlag.AlignHCenter
+            column = index.column()
+            return self.alignments[column] if column < len(self.alignments) else self.centered
 
         #Highlight rows in colours according to the applied filter
         if role == Qt.ItemDataRole.BackgroundRole:
-            if index.column() == self.column_names.index("Description"):
-                value = self._data[index.row()]
-                row_colour = value[self.column_names.index("Colour")]
-                (r,g,b) = (255, 255, 255)
-                if row_colour > "":
-                    #If a colour value is defined for this row, work out corresponding RGB value and apply it
-                    # // ---Colors from CanView---
-                    match row_colour:
-                        case "RED":
-                            (r,g,b) = (220, 0, 0)
-                        case "GREEN":
-                            (r,g,b) = (0, 220, 0)
-                        case "BLUE":
-                            (r,g,b) = (0, 128, 255)
-                        case "YELLOW":
-                            (r,g,b) = (255, 255, 0)
-                        case "GREY": 
-                            (r,g,b) = (190, 190, 190)
-                        case "PURPLE":
-                            (r,g,b) = (255, 0, 255)
-                        case "ORANGE":
-                            (r,g,b) = (255, 128, 64)
-                        case "PINK":
-                            (r,g,b) = (255, 100, 177)
-                        case "LIGHT_RED":
-                            (r,g,b) = (255, 125, 125)
-                        case "LIGHT_GREEN":
-                            (r,g,b) = (213, 255, 213)
-                        case "LIGHT_BLUE":
-                            (r,g,b) = (170, 213, 255)
-                        case "LIGHT_YELLOW":
-                            (r,g,b) = (255, 255, 190)
-                        case "LIGHT_GREY":
-                            (r,g,b) = (223, 223, 223)
-                        case "LIGHT_PURPLE":
-                            (r,g,b) = (255, 150, 255)
-                        case "LIGHT_ORANGE":
-                            (r,g,b) = (255, 165, 121)
-                        case "LIGHT_PINK":
-                            (r,g,b) = (255, 170, 213)
-                        case _:
-                            (r,g,b) = (255, 255, 255)
-
-            elif index.column() == self.column_names.index("ID"):
-                #CAN msg ID background light green rgb(200, 255, 200).
-                (r,g,b) = (200, 255, 200)
-
-            else:
-                (r,g,b) = (255, 255, 255)
-
-            return QtGui.QColor.fromRgb(r,g,b)
+            column = index.column()
+            if column == self.description_column:
+                return self.colour_brushes[self._data.colour_codes[self.log_row(index.row())]]
+            elif column == self.id_column:
+                return self.id_brush
+            return self.white_brush
 
     def rowCount(self, index):
-        return self._data.shape[0]
+        return self._data.shape[0] if self.rows is None else len(self.rows)
 
     def columnCount(self, index):
         return self._data.shape[1]
@@ -123,7 +242,8 @@ class TableModel(QtCore.QAbstractTableModel):
                     return section+1
 
             if orientation == Qt.Orientation.Vertical:
-                return section+1
+                #Line numbers of the log are shown when rows are filtered
+                return self.log_row(section)+1+self.first_row_number
 
 
 class TableView(QtWidgets.QTableView):
@@ -181,280 +301,311 @@ class TableView(QtWidgets.QTableView):
         """        
         self.status_label = label
 
-class MplCanvas(FigureCanvasQTAgg):
-
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = self.fig.add_subplot(111)
-
-        self.snap_x = []
-        self._last_index = None
-        self.current_snap_index = 0
-
-        trans = matplotlib.transforms.blended_transform_factory(self.axes.transData, self.axes.transAxes)
-        self.text = self.axes.text(0.0, 0.0, '', va="center", ha="center", transform = trans)
-        self.measured_value_text = self.axes.text(0.0, 0.0, '', va="center", ha="center", transform = trans, bbox=dict(boxstyle="round", fc="orange", alpha = 0.8))
-        self.measured_value_text.set_visible(False)
-
-        self.measurement_arrow = self.axes.annotate("", xy=(0, 0), xytext=(0, 0), arrowprops=dict(arrowstyle="<->", color = "orange", lw = 2), xycoords = trans, textcoords = trans)
-        self.measurement_arrow.set_visible(False)
-
-
-        self.axes.set_yticklabels("",ha = "right", va = "bottom")
-        self.axes.yaxis.set_major_formatter(self.y_label_formatter)
-        self.axes.yaxis.set_major_locator(matplotlib.ticker.MultipleLocator(2))
-
-        self.log_file_name = "log"
-        self.save_count = 1
-
-        self.status_label = QtWidgets.QLabel()
-
-        self.trace_count = 0
-
-        super(MplCanvas, self).__init__(self.fig)
-
-    def remove_traces(self):
-        #Remove any existing traces lines from the plot
-        for line in self.axes.get_lines():
-            line.remove()
-        self.trace_count = 1
-        self.trace_labels = [""]
-
-    def initialize_cursor_snapping(self):
+class StatisticsModel(QtCore.QAbstractTableModel):
+
+    #Header, key in DataHandler.get_id_statistics and format of each column
+    columns = [("ID", "id", "%08X"),
+               ("Description", "description", "%s"),
+               ("Count", "count", "%d"),
+               ("Rate (1/s)", "rate", "%.3f"),
+               ("Min period (ms)", "min_period", "%.1f"),
+               ("Mean period (ms)", "mean_period", "%.1f"),
+               ("Median period (ms)", "median_period", "%.1f"),
+               ("Max period (ms)", "max_period", "%.1f"),
+               ("Jitter p50 (ms)", "jitter_p50", "%.1f"),
+               ("Jitter p95 (ms)", "jitter_p95", "%.1f"),
+               ("Jitter p99 (ms)", "jitter_p99", "%.1f"),
+               ("Longest gap at line", "longest_gap_row", "%d")]
+
+    def __init__(self, statistics:dict):
+        """Table of timing statistics with one row per message ID, sortable by any column
 
-        #Reset save counter
-        self.save_count = 1
-
-        #Before adding any other lines, collect names of traces that have been added so far
-        self.trace_count = len(self.axes.get_lines())
-        self.trace_labels = []
-        self.snap_x = []
-        for line in self.axes.get_lines():
-            self.trace_labels.append(line.get_label())
-
-            self.x = list(line.get_xdata())
-            y = line.get_ydata()
-            
-            #Create the list to which the cursor will snap
-            for i in range(len(y)):
-                if not y[i] == y[i-1]:
-                    self.snap_x.append(self.x[i])
-
-        #Remove duplicates and sort the snapping list
-        self.snap_x = list(set(self.snap_x))
-        self.snap_x.sort()
-
-        #Re-set x and y axis limits
-        margin = max(self.x)*0.05
-        self.axes.set_xlim([-margin, max(self.x)+margin])
-        self.axes.set_ylim([1, (self.trace_count+1)*2])
-
-        #Define vertical cursor line and measurement lines
-        self.vertical_line = self.axes.axvline(color='k', lw=0.8, ls='--')
-        self.measurement_start_line = self.axes.axvline(color='red', lw=2, ls='-')
-        self.measurement_end_line = self.axes.axvline(color='red', lw=2, ls='-')
-        self.measurement_start_line.set_visible(False)
-        self.measurement_end_line.set_visible(False)
-        self.measurement_step = 0
-        self.measured_value = 0
-
-        self.text.set_text('t=%1.2f ms\nLine %d' % (0,self.current_snap_index+1))
-        self.text.set_position((0,-0.1))
-        self.text.set_visible(True)
-
-        self.measured_value_text.set_text('Δt = %1.2f ms' % abs(self.measured_value))
-        self.measured_value_text.set_position(((self.measurement_end_line.get_xdata()[0]+self.measurement_start_line.get_xdata()[0])/2, 0.04))
-        self.measured_value_text.set_visible(True)
+        Args:
+            statistics (dict): as returned by DataHandler.get_id_statistics
+        """
+        super(StatisticsModel, self).__init__()
+        self.statistics = statistics
+        #Row of statistics shown on each row of the table
+        self.order = np.arange(len(statistics["id"]))
 
-        self.measurement_arrow.xyann = (self.measurement_start_line.get_xdata()[0], 0)
-        self.measurement_arrow.xytext = (self.measurement_end_line.get_xdata()[0], 0)
-        self.measurement_arrow.set_visible(True)
+    def rowCount(self, index):
+        return len(self.order)
 
-        self.fig.canvas.draw_idle()
+    def columnCount(self, index):
+        return len(self.columns)
 
-        self.fig.tight_layout()
+    def data(self, index, role):
+        if role == Qt.ItemDataRole.DisplayRole:
+            _, key, value_format = self.columns[index.column()]
+            value = self.statistics[key][self.order[index.row()]]
+            if key == "longest_gap_row":
+                return value_format % (value + 1) if value >= 0 else ""
+            if isinstance(value, float) and np.isnan(value):
+                return ""
+            return value_format % value
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            if index.column() == 1:
+                return Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft
+            return Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight
 
-        self.text.set_visible(False)
-        self.measured_value_text.set_visible(False)
-        self.measurement_arrow.set_visible(False)
+    def headerData(self, section, orientation, role):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
 
+    def sort(self, column, order = Qt.SortOrder.AscendingOrder):
+        """Sorts rows by a column. Empty values stay at the end in either order
+        """
+        if not 0 <= column < len(self.columns):
+            return
+        self.layoutAboutToBeChanged.emit()
+        values = self.statistics[self.columns[column][1]]
+        sort_order = np.argsort(values, kind="stable")
+        if order == Qt.SortOrder.DescendingOrder:
+            empty = np.isnan(values[sort_order]) if values.dtype.kind == "f" else np.zeros(len(values), dtype=bool)
+            sort_order = np.concatenate([sort_order[~empty][::-1], sort_order[empty]])
+        self.order = sort_order
+        self.layoutChanged.emit()
+
+    def log_row(self, row:int) -> int:
+        """Returns the log line to jump to for a row of the table: the end of the longest gap, or the first message of the ID
+        """
+        statistics_row = self.order[row]
+        longest_gap_row = self.statistics["longest_gap_row"][statistics_row]
+        return int(longest_gap_row if longest_gap_row >= 0 else self.statistics["first_row"][statistics_row])
 
-    def y_label_formatter(self, tick_val, tick_pos):
-        if self.trace_count:
-            yval_range = range(2*self.trace_count, 1, -2)
-            if int(tick_val) in yval_range:
-                return self.trace_labels[yval_range.index(int(tick_val))]
-        return ''
-
-    def set_cross_hair_visible(self, visible):
-        need_redraw = self.vertical_line.get_visible() != visible
-        self.vertical_line.set_visible(visible)
-        self.text.set_visible(visible)
-        return need_redraw
-
-    def on_mouse_move(self, event):
-        if self.trace_count > 0:
-            if not event.inaxes:
-                self._last_index = None
-                need_redraw = self.set_cross_hair_visible(False)
-                if need_redraw:
-                    self.axes.figure.canvas.draw()
-            else:
-                self.set_cross_hair_visible(True)
-                x, y = event.xdata, event.ydata
-
-                #find index of the nearest match in the data to snap to            
-                self.current_snap_index = min(np.searchsorted(self.snap_x, x), len(self.snap_x) - 1)
-                if self.current_snap_index>0 and (abs(self.snap_x[self.current_snap_index] - x) > abs(self.snap_x[self.current_snap_index-1] - x)):
-                    self.current_snap_index -=1
-
-                if self.current_snap_index == self._last_index:
-                    return  # still on the same data point, no update needed
-                self._last_index = self.current_snap_index
-
-                self.current_line_index = self.x.index(self.snap_x[self.current_snap_index])
-                x = self.x[self.current_line_index]
-
-
-                # update snapline position
-                self.vertical_line.set_xdata([x])
-                # show current time and line number in plot and in status bar
-                self.text.set_text('t=%1.2f ms\nLine %d' % (x,self.current_line_index+1))
-                status_label_text = 'Line %d   t=%1.2f ms   ' % (self.current_line_index+1, x)
-                if self.measurement_step > 0:
-                    status_label_text = ''.join([status_label_text, "Δt = %1.2f ms   " % abs(self.measured_value)])
-                self.status_label.setText(status_label_text)
-
-                #x in data coordinates, y in axes coordinates
-                self.text.set_position((x, -0.1))
-                self.axes.figure.canvas.draw()
-
-
-    def on_press(self, event):
-        #print("keypress detected in matplotlib canvas:")
-        if event.key == " ":
-            if not event.inaxes:
-                #press spacebar outside the graph to clear measurement lines
-                self.measurement_start_line.set_visible(False)
-                self.measurement_end_line.set_visible(False)
-                self.measured_value_text.set_visible(False)
-                self.measurement_arrow.set_visible(False)
-                self.axes.figure.canvas.draw()
-                self.measurement_step = 0 
-            else:
-                if self.measurement_step == 0:
-                    #press spacear once to set the first measurement line
-                    self.measurement_start_line.set_xdata(self.vertical_line.get_xdata())
-                    self.measurement_start_line.set_visible(True)
-                    self.axes.figure.canvas.draw()  
-                    self.measurement_step += 1
-
-                elif self.measurement_step == 1:
-                    #press spacebar twice to set the second measurement line and display measured value
-                    self.measurement_end_line.set_xdata(self.vertical_line.get_xdata())
-                    self.measurement_end_line.set_visible(True)
-                    self.measured_value = self.measurement_end_line.get_xdata()[0] - self.measurement_start_line.get_xdata()[0]
-
-                    self.measured_value_text.set_text('Δt = %1.2f ms' % abs(self.measured_value))
-                    self.measured_value_text.set_position(((self.measurement_end_line.get_xdata()[0]+self.measurement_start_line.get_xdata()[0])/2, 0.04))
-                    self.measured_value_text.set_visible(True)
-
-                    self.measurement_arrow.xy = (self.measurement_start_line.get_xdata()[0], 0)
-                    self.measurement_arrow.xyann = (self.measurement_end_line.get_xdata()[0], 0)
-                    self.measurement_arrow.set_visible(True)
-
-                    self.axes.figure.canvas.draw()  
-                    self.measurement_step += 1
-                else:
-                    #press spacebar again to clear measurement
-                    self.measurement_start_line.set_visible(False)
-                    self.measurement_end_line.set_visible(False)
-                    self.measured_value_text.set_visible(False)
-                    self.measurement_arrow.set_visible(False)
-                    self.axes.figure.canvas.draw()  
-                    self.measurement_step = 0
-        else:
-            print(event.key)
 
-    def on_mouse_click(self, event):
-        if event.inaxes and self.trace_count > 0:
-            w.highlightRow(self.current_line_index)
+class StatisticsWindow(QtWidgets.QWidget):
+    #Bitrates offered for computing the bus load, in bit/s
+    bitrates = {"Messages/s": None, "Load at 125 kbit/s": 125000, "Load at 250 kbit/s": 250000, "Load at 500 kbit/s": 500000, "Load at 1 Mbit/s": 1000000}
 
-    def set_status_label(self, label:QtWidgets.QLabel):
-        """Passes a QLabel to the canvas. Used to display timestamp and log line number
+    def __init__(self, jump_to_row:callable):
+        """Window with timing statistics of each message ID and the message rate or bus load over time. Double-clicking
+        an ID jumps to its longest gap in the log. A second tab measures the latency between edges of two traces
 
         Args:
-            label (QtWidgets.QLabel): A label that will display current timestamp and line in log file
-        """        
-        self.status_label = label
-
-    def get_default_filename(self) -> str:
-        filename = "".join([self.log_file_name, "_CAN-Analyze_" , datetime.datetime.today().strftime('%Y-%m-%d'), "_", str(self.save_count)])
-        self.save_count = self.save_count + 1
-        return filename
-
-    def set_plot_title(self,plot_title:str):
-        self.log_file_name = plot_title
-        self.axes.set_title(self.log_file_name)
-
-class MplNavigationToolbar(NavigationToolbar2QT):
-    """Inherited class from matplotlib. Modified to remove unnecessary toolbar buttons and add new application specific ones
-    """    
-    def __init__(self, canvas, parent=None, coordinates=True):
-        #A dictionary that contains functions passed on from other classes that can be used by the toolbar
-        self.linked_callbacks = dict()
-
-        #text, tooltip_text, image file, callback function
-        #None means separator
-        NavigationToolbar2QT.toolitems = (
-                    ('Home', 'Reset view', 'home', 'home'),
-                    ('Back', 'Back to previous view', 'arrow-180', 'back'),
-                    ('Forward', 'Forward to next view', 'arrow', 'forward'),
-                    (None, None, None, None),
-                    ('Pan',
-                    'Left button pans, Right button zooms\n'
-                    'x/y fixes axis, CTRL fixes aspect',
-                    'arrow-move', 'pan'),
-                    ('Zoom', 'Zoom to rectangle\nx/y fixes axis', 'magnifier-zoom', 'zoom'),
-                    #('Subplots', 'Configure subplots', 'subplots', 'configure_subplots'),
-                    (None, None, None, None),
-                    ('Screenshot', 'Save plot', 'camera', 'save_figure'),
-                    ('Save', 'Save log with descriptions', 'disk', 'save_log'),
-                    ('Open', 'Open log file, filter or trace configuration', 'folder-open-document-text', 'open_file')
-                    )
-
-        NavigationToolbar2QT.__init__(self, canvas, parent, coordinates)
-
-    def set_callback_function(self, callback_type:str, callback_function:callable):
-        """Used to set callback functions for custom toolbar buttons
+            jump_to_row (callable): called with a log line to show it in the main window
+        """
+        super(StatisticsWindow, self).__init__()
+        from PlotCanvas import BusLoadCanvas, LatencyCanvas
+        self.setWindowTitle("Message statistics")
+        self.jump_to_row = jump_to_row
+        self.dh = None
+
+        self.table = QtWidgets.QTableView()
+        self.table.setSortingEnabled(True)
+        self.table.doubleClicked.connect(lambda index: self.jump_to_row(self.table.model().log_row(index.row())))
+        self.summary_label = QtWidgets.QLabel("")
+        self.window_box = QtWidgets.QDoubleSpinBox()
+        self.window_box.setRange(1, 3600000)
+        self.window_box.setDecimals(0)
+        self.window_box.setValue(1000)
+        self.window_box.setSuffix(" ms window")
+        self.window_box.valueChanged.connect(self.update_bus_load)
+        self.bitrate_selector = QtWidgets.QComboBox()
+        self.bitrate_selector.addItems(list(self.bitrates))
+        self.bitrate_selector.currentIndexChanged.connect(self.update_bus_load)
+        self.bus_load_canvas = BusLoadCanvas()
+
+        controls_layout = QtWidgets.QHBoxLayout()
+        controls_layout.addWidget(self.summary_label)
+        controls_layout.addStretch()
+        controls_layout.addWidget(self.window_box)
+        controls_layout.addWidget(self.bitrate_selector)
+        timing_layout = QtWidgets.QVBoxLayout()
+        timing_layout.addWidget(self.table, 3)
+        timing_layout.addLayout(controls_layout)
+        timing_layout.addWidget(self.bus_load_canvas, 1)
+        timing_tab = QtWidgets.QWidget()
+        timing_tab.setLayout(timing_layout)
+
+        #Measurements from the trace configuration are listed, others can be typed in
+        self.measurement_selector = QtWidgets.QComboBox()
+        self.measurement_selector.setEditable(True)
+        self.measurement_selector.setInsertPolicy(QtWidgets.QComboBox.InsertPolicy.NoInsert)
+        self.measurement_selector.lineEdit().setPlaceholderText("Start edge -> end edge, e.g. S5 Ready+ -> C0 Sheet exit+")
+        self.measurement_selector.lineEdit().returnPressed.connect(self.update_latency)
+        measure_button = QtWidgets.QPushButton("Measure")
+        measure_button.clicked.connect(self.update_latency)
+        self.latency_label = QtWidgets.QLabel("")
+        self.latency_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.outlier_table = QtWidgets.QTableWidget(0, 3)
+        self.outlier_table.setHorizontalHeaderLabels(["Start line", "End line", "Δt (ms)"])
+        self.outlier_table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.outlier_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectionBehavior.SelectRows)
+        self.outlier_table.cellDoubleClicked.connect(lambda row, column: self.jump_to_row(int(self.outlier_table.item(row, 1 if column == 1 else 0).text()) - 1))
+        self.latency_canvas = LatencyCanvas()
+
+        measurement_layout = QtWidgets.QHBoxLayout()
+        measurement_layout.addWidget(self.measurement_selector, 1)
+        measurement_layout.addWidget(measure_button)
+        latency_layout = QtWidgets.QVBoxLayout()
+        latency_layout.addLayout(measurement_layout)
+        latency_layout.addWidget(self.latency_label)
+        outliers_layout = QtWidgets.QHBoxLayout()
+        outliers_layout.addWidget(self.outlier_table, 1)
+        outliers_layout.addWidget(self.latency_canvas, 2)
+        latency_layout.addLayout(outliers_layout)
+        latency_tab = QtWidgets.QWidget()
+        latency_tab.setLayout(latency_layout)
+
+        self.tabs = QtWidgets.QTabWidget()
+        self.tabs.addTab(timing_tab, "Message timing")
+        self.tabs.addTab(latency_tab, "Latency")
+        layout = QtWidgets.QVBoxLayout()
+        layout.addWidget(self.tabs)
+        self.setLayout(layout)
+        self.resize(1100, 700)
+
+    def show_statistics(self, dh:DataHandler):
+        """Shows the statistics of the log loaded in a DataHandler
+        """
+        self.dh = dh
+        self.table.setModel(StatisticsModel(dh.get_id_statistics()))
+        self.table.resizeColumnsToContents()
+        self.update_bus_load()
+
+        measurement_text = self.measurement_selector.currentText()
+        self.measurement_selector.clear()
+        for measurement in dh.measurements:
+            self.measurement_selector.addItem(measurement["name"], measurement)
+        self.measurement_selector.setCurrentText(measurement_text)
+        if measurement_text:
+            self.update_latency()
+
+    def update_bus_load(self, *args):
+        if self.dh is None:
+            return
+        series = self.dh.get_bus_load(self.window_box.value(), self.bitrates[self.bitrate_selector.currentText()])
+        self.bus_load_canvas.show_bus_load(series)
+        summary = "%d messages, %d IDs" % (len(self.dh.log_data), self.table.model().rowCount(None))
+        if len(series["time"]):
+            summary += ", peak %.0f messages/s" % series["frames_per_second"].max()
+        if "load" in series and len(series["time"]):
+            summary += ", peak load %.1f%%" % (series["load"].max()*100)
+        self.summary_label.setText(summary)
+
+    def update_latency(self):
+        """Measures the latency selected or typed in, listing the longest pairs as outliers
+        """
+        text = self.measurement_selector.currentText().strip()
+        if self.dh is None or not text:
+            return
+        index = self.measurement_selector.findText(text)
+        measurement = self.measurement_selector.itemData(index) if index >= 0 else text
+        try:
+            result = self.dh.measure_latency(measurement)
+        except ValueError as e:
+            self.latency_label.setText(str(e))
+            self.outlier_table.setRowCount(0)
+            self.latency_canvas.show_latency(np.zeros(0))
+            return
+
+        summary = "%d pairs, %d start edges without an end edge" % (result["count"], len(result["unpaired_rows"]))
+        if len(result["unpaired_rows"]):
+            summary += " (first at line %d)" % (result["unpaired_rows"][0] + 1)
+        if result["count"]:
+            summary += "\nmin %.2f   median %.2f   mean %.2f   p99 %.2f   max %.2f ms" % (
+                result["min"], result["median"], result["mean"], result["p99"], result["max"])
+            summary += "\n%d outliers above %s" % (result["outlier_count"], "the 99th percentile" if result["limit"] is None else "%g ms" % result["limit"])
+        self.latency_label.setText(summary)
+
+        outliers = result["outliers"]
+        self.outlier_table.setRowCount(len(outliers["latency"]))
+        for row, (start_row, end_row, latency) in enumerate(zip(outliers["start_row"], outliers["end_row"], outliers["latency"])):
+            for column, text in enumerate(("%d" % (start_row + 1), "%d" % (end_row + 1), "%.2f" % latency)):
+                item = QtWidgets.QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight)
+                self.outlier_table.setItem(row, column, item)
+        self.latency_canvas.show_latency(result["latency"], result["p99"])
+
+
+class LoadWorkerSignals(QtCore.QObject):
+    """Signals of a LoadWorker. They are delivered to the GUI thread, so widgets are only touched from there
+    """
+    progress = QtCore.pyqtSignal(int, float, str)
+    status = QtCore.pyqtSignal(str)
+    done = QtCore.pyqtSignal(int)
+
+
+class LoadWorker(QtCore.QRunnable):
+    def __init__(self, job_index:int, dh:DataHandler, filenames:list[str] = None, log_name:str = ""):
+        """Loads files into a DataHandler on a thread pool thread, e.g. a log file which is then filtered and traced.
+        Each worker has its own DataHandler, so several logs can be loaded in parallel
 
         Args:
-            callback_type (str): name of the callback function
-            callback_function (callable): function that should be called
-        """        
-        self.linked_callbacks[callback_type] = callback_function
-
-    def open_file(self):
-        """Callback function for Open button on toolbar
-        """        
-        func = self.linked_callbacks.get("open_file", None)
-        if func:
-            func()
-
-    def save_log(self):
-        """Callback function for Save button on toolbar
-        """        
-        func = self.linked_callbacks.get("save_log", None)
-        if func:
-            func()
-
-    def _icon(self, name):
+            job_index (int): position of this worker among the ones started together
+            dh (DataHandler): DataHandler to load into, with filters and trace configuration already loaded
+            filenames (list[str], optional): files to load in order. If empty, the log already in dh is annotated again. Defaults to None.
+            log_name (str, optional): name the log is shown with. Defaults to the last file name without extension.
         """
-        Re-implementation of matplotlib toolbar method to bypass built-in icons and replace them with application specific ones
-        Construct a `.QIcon` from an image file *name*. Name must already include file type extension
+        super(LoadWorker, self).__init__()
+        self.setAutoDelete(False)
+        self.job_index = job_index
+        self.dh = dh
+        self.filenames = filenames if filenames else []
+        self.log_name = log_name if log_name or not self.filenames else os.path.splitext(os.path.basename(self.filenames[-1]))[0]
+        #One of ["finished", "cancelled", "failed"] once done
+        self.outcome = None
+        self.signals = LoadWorkerSignals()
+        self.dh.set_status_output_destination(self.signals.status.emit)
+        self.dh.set_progress_output_destination(lambda fraction, progress_text: self.signals.progress.emit(job_index, fraction, progress_text))
+
+    def run(self):
+        try:
+            for filename in self.filenames:
+                self.dh.load_file(filename)
+            if not self.filenames:
+                self.dh.annotate()
+            if self.dh.log_file_loaded:
+                #Build the search index and select filtered rows here rather than in the GUI thread
+                self.dh.get_log_index()
+                self.dh.get_visible_rows()
+            self.outcome = "finished"
+        except LoadCancelled:
+            self.outcome = "cancelled"
+        except Exception as e:
+            self.signals.status.emit("Failed to load %s: %s" % (self.log_name, e))
+            self.outcome = "failed"
+        self.signals.done.emit(self.job_index)
+
+
+class LiveCaptureWorker(QtCore.QRunnable):
+    def __init__(self, dh:DataHandler, source, poll_interval:int = 10):
+        """Reads messages from a live source into the live log of a DataHandler on a thread pool thread until stopped
+
+        Args:
+            dh (DataHandler): DataHandler with a live capture started
+            source: CanViewLogTail, CanViewReplay or PythonCanSource
+            poll_interval (int, optional): time in ms to wait when the source has no new messages. Defaults to 10.
         """
-        path_to_icon = resolve_path("images" + os.path.sep + name)
-        return QtGui.QIcon(path_to_icon)
+        super(LiveCaptureWorker, self).__init__()
+        self.setAutoDelete(False)
+        self.dh = dh
+        self.source = source
+        self.poll_interval = poll_interval
+        self.stop_requested = False
+        #One of ["finished", "failed"] once done
+        self.outcome = None
+        self.signals = LoadWorkerSignals()
+
+    def run(self):
+        try:
+            while not self.stop_requested:
+                frames = self.source.poll()
+                if frames is None or len(frames) == 0:
+                    QtCore.QThread.msleep(self.poll_interval)
+                else:
+                    self.dh.ingest_frames(frames)
+            self.outcome = "finished"
+        except Exception as e:
+            self.signals.status.emit("Live capture stopped: %s" % e)
+            self.outcome = "failed"
+        finally:
+            self.source.close()
+        self.signals.done.emit(0)
+
+    def stop(self):
+        self.stop_requested = True
 
 
 class MainWindow(QtWidgets.QMainWindow):
@@ -472,29 +623,45 @@ class MainWindow(QtWidgets.QMainWindow):
         self.default_trace_config_file_path = resolve_path("config" + os.path.sep + "trace_config_default.json", False)
         self.current_file_name = ""
 
-        self.dh = DataHandler(["Time", "Delta", "Description", "ID", "D0", "D1", "D2", "D3", "D4", "D5", "D6", "D7", "Colour"])
-
-        #TODO: handle multiple log files loaded at once
-
-
-
-
-
-        #Set up matplotlib canvas widget
-        self.mpl_canvas = MplCanvas(self, width=5, height=4, dpi=100)
-        #Must set focus policy for keyboard events to be propagated
-        self.mpl_canvas.setFocusPolicy(QtCore.Qt.FocusPolicy.StrongFocus) 
-
-
-
-
-        #self.snap_cursor = SnappingCursor(self.mpl_canvas.axes, line)
-        self.mpl_canvas.mpl_connect('motion_notify_event', self.mpl_canvas.on_mouse_move)
-        self.mpl_canvas.mpl_connect('button_press_event', self.mpl_canvas.on_mouse_click)
-        self.mpl_canvas.mpl_connect('key_press_event', self.mpl_canvas.on_press)
-
-
-
+        self.dh = DataHandler(COLUMN_NAMES)
+        try:
+            #Reopening a log with the same filter and trace configuration is served from the cache
+            self.dh.enable_log_cache()
+        except OSError:
+            print("Log cache disabled: cache directory is not writable")
+        #--workers N evaluates filters and traces of large logs on N processes, see DataHandler.worker_count
+        if "--workers" in sys.argv[1:-1]:
+            try:
+                self.dh.worker_count = max(1, int(sys.argv[sys.argv.index("--workers") + 1]))
+            except ValueError:
+                print("--workers needs a number of processes")
+
+        #Logs that have been loaded as [(name, DataHandler)]. They share the message dictionary of self.dh, so their filters and
+        #traces are evaluated once per distinct message. One of them is shown in the table, the plot can show all of them
+        self.loaded_logs = []
+        #"aligned" or "stacked" while the plot shows every loaded log, see show_session_plot
+        self.session_plot_mode = ""
+        #Background loading in progress
+        self.load_jobs = []
+        self.load_progress = []
+        #Default filter and trace configuration are loaded in the background at startup. Files opened before then wait for them
+        self.default_configuration = None
+        self.pending_files = []
+
+        #Live capture in progress. The table and plot are refreshed from the live log every live_refresh_interval ms
+        self.live_worker = None
+        self.pending_live_source = None
+        self.live_refresh_interval = 100
+        self.live_timer = QtCore.QTimer(self)
+        self.live_timer.setInterval(self.live_refresh_interval)
+        self.live_timer.timeout.connect(self.refresh_live_view)
+        #(low, high) each signal of the live capture is plotted with. Widened, but never narrowed, as values arrive
+        self.live_signal_ranges = []
+
+        #The matplotlib canvas is added in load_plotting_stack once the window is shown
+        self.mpl_canvas = None
+        self.plot_placeholder = QtWidgets.QLabel("Loading plot...")
+        self.plot_placeholder.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         #Set up table widget
         self.table = TableView()
@@ -505,25 +672,55 @@ class MainWindow(QtWidgets.QMainWindow):
         #Resize table to fit contents
         self.resize_table_to_contents()
 
-        # Create toolbar, passing canvas as first parameter, parent (self, the MainWindow) as second.
-        toolbar = MplNavigationToolbar(self.mpl_canvas, self)
-        toolbar.set_callback_function("open_file", self.load_file_dialog)
-        toolbar.set_callback_function("save_log", self.save_log_dialog)
-
         self.embnote_editor = QtWidgets.QPlainTextEdit()
         self.embnote_editor.setMaximumHeight(50)
 
+        #Selects which of the loaded logs is shown. Hidden unless more than one log is loaded
+        self.log_selector = QtWidgets.QComboBox()
+        self.log_selector.setVisible(False)
+        self.log_selector.currentIndexChanged.connect(self.show_selected_log)
+
+        #Search box with previous/next buttons. Enter or F3 jumps to the next match, Shift+F3 to the previous one
+        self.search_box = QtWidgets.QLineEdit()
+        self.search_box.setPlaceholderText("Search ID (0011FF??), description or trace (S5 Ready+)")
+        self.search_box.setClearButtonEnabled(True)
+        self.search_box.returnPressed.connect(self.find_next)
+        self.search_box.textChanged.connect(lambda text: self.search_result_label.setText(""))
+        self.search_result_label = QtWidgets.QLabel("")
+        search_previous_button = QtWidgets.QPushButton("Previous")
+        search_previous_button.clicked.connect(lambda: self.find_next(backwards = True))
+        search_next_button = QtWidgets.QPushButton("Next")
+        search_next_button.clicked.connect(lambda: self.find_next())
+        search_layout = QtWidgets.QHBoxLayout()
+        search_layout.addWidget(self.search_box)
+        search_layout.addWidget(self.search_result_label)
+        search_layout.addWidget(search_previous_button)
+        search_layout.addWidget(search_next_button)
+
+        #Row filter choosing which lines the table shows, e.g. to hide heartbeats. Applied to every loaded log
+        self.row_filter_box = QtWidgets.QLineEdit()
+        self.row_filter_box.setPlaceholderText('Show rows: 0011FF?? -id:00010010 desc:ready colour:red trace:"S5 Ready"=1 time:1000..5000')
+        self.row_filter_box.setClearButtonEnabled(True)
+        self.row_filter_box.returnPressed.connect(self.apply_row_filter)
+        self.row_filter_box.textChanged.connect(lambda text: self.apply_row_filter() if not text else None)
+        self.row_filter_label = QtWidgets.QLabel("")
+        row_filter_layout = QtWidgets.QHBoxLayout()
+        row_filter_layout.addWidget(self.row_filter_box)
+        row_filter_layout.addWidget(self.row_filter_label)
+
         #Lay eveything out in the window
-        left_panel_layout = QtWidgets.QVBoxLayout()
-        left_panel_layout.addWidget(toolbar)
-        left_panel_layout.addWidget(self.mpl_canvas)
+        self.left_panel_layout = QtWidgets.QVBoxLayout()
+        self.left_panel_layout.addWidget(self.plot_placeholder)
 
         right_panel_layout = QtWidgets.QVBoxLayout()
+        right_panel_layout.addWidget(self.log_selector)
         right_panel_layout.addWidget(self.embnote_editor)
+        right_panel_layout.addLayout(search_layout)
+        right_panel_layout.addLayout(row_filter_layout)
         right_panel_layout.addWidget(self.table)
 
         main_layout = QtWidgets.QHBoxLayout()
-        main_layout.addLayout(left_panel_layout)
+        main_layout.addLayout(self.left_panel_layout)
         main_layout.addLayout(right_panel_layout)
 
         # Create a placeholder widget to hold left and right panels.
@@ -539,8 +736,26 @@ class MainWindow(QtWidgets.QMainWindow):
         self.snapline_label = QtWidgets.QLabel("Line:      t = ")
         self.statusbar.addWidget(self.snapline_label)
         self.statusbar.addPermanentWidget(self.hexdec_label)
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setMaximumWidth(300)
+        self.progress_bar.setVisible(False)
+        self.cancel_button = QtWidgets.QPushButton("Cancel")
+        self.cancel_button.setVisible(False)
+        self.cancel_button.clicked.connect(self.cancel_loading)
+        self.live_button = QtWidgets.QPushButton("Live")
+        self.live_button.setCheckable(True)
+        self.live_button.setToolTip("Follow a CanView log while it is being written")
+        self.live_button.clicked.connect(self.toggle_live_capture)
+        self.statusbar.addPermanentWidget(self.live_button)
+        #Created when first shown, once the plotting stack is loaded
+        self.statistics_window = None
+        statistics_button = QtWidgets.QPushButton("Statistics")
+        statistics_button.setToolTip("Period, jitter and rate of each message ID and bus load over time")
+        statistics_button.clicked.connect(self.show_statistics_window)
+        self.statusbar.addPermanentWidget(statistics_button)
+        self.statusbar.addPermanentWidget(self.progress_bar)
+        self.statusbar.addPermanentWidget(self.cancel_button)
         self.table.set_status_label(self.hexdec_label)
-        self.mpl_canvas.set_status_label(self.snapline_label)
 
         selection_model = self.table.selectionModel()
         selection_model.selectionChanged.connect(self.table.get_selected_hexdec)
@@ -548,9 +763,95 @@ class MainWindow(QtWidgets.QMainWindow):
         self.dh.set_status_output_destination(self.print_to_status_label)
 
         self.showMaximized()
+        report_startup("window shown")
+
+        self.load_default_configuration()
+        #Continue once the window has been drawn
+        QtCore.QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        self.load_plotting_stack()
+
+        live_source = self.open_live_source_argument()
+        if live_source:
+            self.start_live_capture(*live_source)
+        else:
+            #Open dialog to load one or more files
+            self.load_file_dialog()
+
+    def open_live_source_argument(self) -> tuple:
+        """Opens a live source given on the command line:
+        --live-log FILE follows a log while it is being written, --live-replay FILE plays back a log in real time and
+        --live-can INTERFACE:CHANNEL receives from a CAN interface through python-can, e.g. socketcan:vcan0
+
+        Returns:
+            tuple: (source, name) or None if no live source is given
+        """
+        options = {"--live-log": CanViewLogTail, "--live-replay": CanViewReplay, "--live-can": None}
+        for position, argument in enumerate(sys.argv[1:-1], start=1):
+            if argument not in options:
+                continue
+            value = sys.argv[position + 1]
+            try:
+                if argument == "--live-can":
+                    interface, _, channel = value.partition(":")
+                    return PythonCanSource(interface, channel), value
+                return options[argument](value), os.path.splitext(os.path.basename(value))[0]
+            except Exception as e:
+                self.print_to_status_label("Failed to open %s: %s" % (value, e))
+                return None
+        return None
+
+    def load_plotting_stack(self):
+        """Imports matplotlib and replaces the plot placeholder with the canvas and its toolbar
+        """
+        QtWidgets.QApplication.processEvents()
+        from PlotCanvas import MplCanvas, MplNavigationToolbar
+
+        #Set up matplotlib canvas widget
+        self.mpl_canvas = MplCanvas(self, width=5, height=4, dpi=100)
+        #Must set focus policy for keyboard events to be propagated
+        self.mpl_canvas.setFocusPolicy(QtCore.Qt.FocusPolicy.StrongFocus)
+        self.mpl_canvas.mpl_connect('motion_notify_event', self.mpl_canvas.on_mouse_move)
+        self.mpl_canvas.mpl_connect('button_press_event', self.mpl_canvas.on_mouse_click)
+        self.mpl_canvas.mpl_connect('key_press_event', self.mpl_canvas.on_press)
+        self.mpl_canvas.set_callback_function("highlight_row", self.highlightRow)
+        self.mpl_canvas.set_status_label(self.snapline_label)
+
+        # Create toolbar, passing canvas as first parameter, parent (self, the MainWindow) as second.
+        toolbar = MplNavigationToolbar(self.mpl_canvas, self)
+        toolbar.set_callback_function("open_file", self.load_file_dialog)
+        toolbar.set_callback_function("save_log", self.save_log_dialog)
+
+        self.left_panel_layout.removeWidget(self.plot_placeholder)
+        self.plot_placeholder.deleteLater()
+        self.left_panel_layout.addWidget(toolbar)
+        self.left_panel_layout.addWidget(self.mpl_canvas)
+        report_startup("plotting stack loaded")
 
-        #Open dialog to load one or more files
-        self.load_file_dialog()
+        #A log may have been loaded while the plot was not there yet
+        if len(self.dh.log_data) > 1:
+            self.add_traces_to_canvas()
+
+    def load_default_configuration(self):
+        """Loads the default filter and trace configuration on a background thread
+        """
+        self.default_loader = LoadWorker(0, DataHandler(COLUMN_NAMES), [self.default_filter_file_path, self.default_trace_config_file_path])
+        self.default_loader.signals.status.connect(self.print_to_status_label)
+        self.default_loader.signals.done.connect(self.finish_loading_default_configuration)
+        QtCore.QThreadPool.globalInstance().start(self.default_loader)
+
+    def finish_loading_default_configuration(self, job_index:int):
+        self.default_configuration = self.default_loader.dh
+        report_startup("default configuration loaded")
+        if self.pending_live_source:
+            live_source = self.pending_live_source
+            self.pending_live_source = None
+            self.start_live_capture(*live_source)
+        if self.pending_files:
+            filenames = self.pending_files
+            self.pending_files = []
+            self.load_files(filenames)
 
     def resize_table_to_contents(self):
         """Resize TableView to fit contents. Call after loading a new log file
@@ -564,12 +865,338 @@ class MainWindow(QtWidgets.QMainWindow):
     def load_file_dialog(self):
         loaded_files, _ = QtWidgets.QFileDialog.getOpenFileNames(self,"Open log file, filter file or trace configuration", "","All files (*);;Logs or filters (*.txt);;Trace configurations (*.json)")
         if len(loaded_files) > 0:
-            for loaded_file in loaded_files:
-                file_type = self.dh.load_file(loaded_file)
-                if file_type == "log_file":
-                    self.current_file_name = os.path.splitext(os.path.basename(loaded_file))[0]
-                    self.setWindowTitle("".join(["CAN Analyze v", version, " - ", self.current_file_name]))
-            self.process_loaded_file()
+            self.load_files(loaded_files)
+
+    def load_files(self, filenames:list[str]):
+        """Loads filters and trace configurations right away, then loads log files in the background, each on its own thread.
+        If no log files are given, the logs that are already loaded are annotated again with the new configuration
+
+        Args:
+            filenames (list[str]): paths to log files, filters and trace configurations
+        """
+        if self.load_jobs:
+            self.print_to_status_label("Already loading, wait or cancel first")
+            return
+        if self.live_worker:
+            self.print_to_status_label("Stop live capture first")
+            return
+        if self.default_configuration is None:
+            self.pending_files += filenames
+            return
+
+        configuration = self.dh.copy_configuration()
+        configuration.set_status_output_destination(self.print_to_status_label)
+        log_files = []
+        for filename in filenames:
+            if configuration.get_file_type(filename) == "log_file":
+                log_files.append(filename)
+            else:
+                configuration.load_file(filename, annotate = False)
+
+        self.apply_default_configuration(configuration)
+
+        if log_files:
+            self.load_jobs = [LoadWorker(i, configuration.copy_configuration(), [filename]) for i, filename in enumerate(log_files)]
+        elif self.loaded_logs:
+            #Only the configuration changed. Apply it to every loaded log
+            jobs = []
+            for i, (log_name, dh) in enumerate(self.loaded_logs):
+                annotated = dh.copy_configuration(include_log = True)
+                annotated.filter_list, annotated.filter_loaded = configuration.filter_list, configuration.filter_loaded
+                annotated.traces, annotated.trace_config_loaded = configuration.traces, configuration.trace_config_loaded
+                annotated.signals, annotated.measurements = configuration.signals, configuration.measurements
+                jobs.append(LoadWorker(i, annotated, log_name = log_name))
+            self.load_jobs = jobs
+        else:
+            self.process_loaded_file(configuration)
+            return
+
+        self.load_progress = [0.0] * len(self.load_jobs)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.cancel_button.setVisible(True)
+        for job in self.load_jobs:
+            job.signals.progress.connect(self.show_load_progress)
+            job.signals.status.connect(self.print_to_status_label)
+            job.signals.done.connect(self.finish_loading)
+            QtCore.QThreadPool.globalInstance().start(job)
+
+    def apply_default_configuration(self, configuration:DataHandler):
+        """Check if any filters or traces have been loaded. If not, then use defaults
+        """
+        defaults = self.default_configuration
+        if len(configuration.filter_list) == 0:
+            configuration.filter_list, configuration.filter_loaded = defaults.filter_list, defaults.filter_loaded
+        if len(configuration.traces) == 0 and len(configuration.signals) == 0:
+            configuration.traces, configuration.trace_config_loaded = defaults.traces, defaults.trace_config_loaded
+            configuration.signals = defaults.signals
+            #Measurements may be loaded on their own to measure the default traces
+            if len(configuration.measurements) == 0:
+                configuration.measurements = defaults.measurements
+
+    def toggle_live_capture(self, checked:bool):
+        if not checked:
+            self.stop_live_capture()
+            return
+        filename, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Follow log file", "", "Logs (*.txt);;All files (*)")
+        if filename:
+            self.start_live_capture(CanViewLogTail(filename), os.path.splitext(os.path.basename(filename))[0])
+        else:
+            self.live_button.setChecked(False)
+
+    def start_live_capture(self, source, log_name:str):
+        """Shows messages from a live source as they arrive, filtered and traced with the current configuration
+
+        Args:
+            source: CanViewLogTail, CanViewReplay or PythonCanSource
+            log_name (str): name the live log is shown with
+        """
+        if self.load_jobs or self.live_worker:
+            self.print_to_status_label("Already loading, wait or cancel first")
+            self.live_button.setChecked(self.live_worker is not None)
+            source.close()
+            return
+        if self.default_configuration is None:
+            self.pending_live_source = (source, log_name)
+            return
+
+        dh = self.dh.copy_configuration()
+        self.apply_default_configuration(dh)
+        dh.start_live_capture()
+        self.dh = dh
+        self.dh.set_status_output_destination(self.print_to_status_label)
+        self.current_file_name = log_name
+        self.setWindowTitle("".join(["CAN Analyze v", version, " - ", self.current_file_name, " (live)"]))
+        self.show_table()
+        self.embnote_editor.setPlainText("")
+        self.add_traces_to_canvas()
+        if self.mpl_canvas:
+            self.mpl_canvas.start_live_view()
+        self.live_signal_ranges = [None]*len(self.dh.signals)
+
+        self.live_worker = LiveCaptureWorker(self.dh, source)
+        self.live_worker.signals.status.connect(self.print_to_status_label)
+        self.live_worker.signals.done.connect(self.finish_live_capture)
+        QtCore.QThreadPool.globalInstance().start(self.live_worker)
+        self.live_timer.start()
+        self.live_button.setChecked(True)
+        self.print_to_status_label("Live capture started: %s" % log_name)
+
+    def refresh_live_view(self):
+        """Shows messages added to the live log since the last refresh. The table keeps following the newest message
+        if it was scrolled to the end, and so does the plot if the newest message was in view
+        """
+        rows_before = len(self.dh.log_data)
+        added, dropped = self.dh.update_live_view()
+        if added == 0:
+            return
+        scroll_bar = self.table.verticalScrollBar()
+        at_end = scroll_bar.value() == scroll_bar.maximum()
+        self.model.append_rows(self.dh.log_data, dropped, self.dh.live_first_row, self.dh.get_visible_rows())
+        self.show_row_count()
+        if rows_before == 0:
+            self.resize_table_to_contents()
+        if at_end:
+            self.table.scrollToBottom()
+        if self.mpl_canvas:
+            new_rows = min(added, len(self.dh.log_data))
+            rows = slice(len(self.dh.log_data) - new_rows, None)
+            plot_values = [self.trace_plot_values(i, rows) for i in range(len(self.dh.traces))]
+            rescaled = []
+            for signal_index in range(len(self.dh.signals)):
+                signal_range = self.widen_live_signal_range(signal_index, self.dh.signal_data[rows, signal_index])
+                if signal_range != self.live_signal_ranges[signal_index]:
+                    #Values outside the range plotted so far scale the whole signal again
+                    self.live_signal_ranges[signal_index] = signal_range
+                    rescaled.append(signal_index)
+                    plot_values.append(self.signal_plot_values(signal_index, signal_range = signal_range))
+                else:
+                    #Signals without any values yet are NaN and plotted with the default range
+                    plot_values.append(self.signal_plot_values(signal_index, rows, signal_range or value_range(np.zeros(0))))
+            self.mpl_canvas.append_live_data(self.dh.log_data.time, new_rows, dropped, plot_values, self.dh.log_data.trace_data, self.dh.signal_data)
+            for signal_index in rescaled:
+                self.mpl_canvas.set_trace_label(len(self.dh.traces) + signal_index, self.signal_label(signal_index, self.live_signal_ranges[signal_index]))
+            if rescaled:
+                #Labels are drawn with the axes
+                self.mpl_canvas.draw_idle()
+
+    def widen_live_signal_range(self, signal_index:int, values:np.ndarray) -> tuple:
+        """Returns the range a signal of the live capture is plotted with, widened to include new values
+        """
+        signal_range = self.live_signal_ranges[signal_index]
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return signal_range
+        if signal_range is not None:
+            if signal_range[0] <= values.min() and values.max() <= signal_range[1]:
+                return signal_range
+            values = np.append(values, signal_range)
+        return value_range(values)
+
+    def stop_live_capture(self):
+        if self.live_worker:
+            self.live_worker.stop()
+
+    def finish_live_capture(self, job_index:int):
+        """Shows the last messages of a stopped live capture and adds them to the loaded logs
+        """
+        self.live_timer.stop()
+        self.refresh_live_view()
+        self.dh.stop_live_capture()
+        if self.mpl_canvas:
+            self.mpl_canvas.stop_live_view()
+        self.live_worker = None
+        self.live_button.setChecked(False)
+        self.setWindowTitle("".join(["CAN Analyze v", version, " - ", self.current_file_name]))
+
+        log_names = [log_name for log_name, _ in self.loaded_logs]
+        if self.current_file_name in log_names:
+            self.loaded_logs[log_names.index(self.current_file_name)] = (self.current_file_name, self.dh)
+        else:
+            self.loaded_logs.append((self.current_file_name, self.dh))
+            log_names.append(self.current_file_name)
+        self.update_log_selector(log_names, self.current_file_name)
+
+    def update_log_selector(self, log_names:list[str], shown_name:str):
+        self.log_selector.blockSignals(True)
+        self.log_selector.clear()
+        self.log_selector.addItems(log_names)
+        if len(log_names) > 1:
+            self.log_selector.addItems(list(SESSION_PLOTS))
+        self.log_selector.setVisible(len(log_names) > 1)
+        self.log_selector.setCurrentIndex(log_names.index(shown_name))
+        self.log_selector.blockSignals(False)
+
+    def show_load_progress(self, job_index:int, fraction:float, progress_text:str):
+        self.load_progress[job_index] = fraction
+        self.progress_bar.setValue(int(100 * sum(self.load_progress) / len(self.load_progress)))
+        self.progress_bar.setFormat(progress_text + " %p%")
+
+    def cancel_loading(self):
+        for job in self.load_jobs:
+            job.dh.cancel_loading()
+
+    def finish_loading(self, job_index:int):
+        """Shows loaded logs once all background loading has finished
+        """
+        if any(job.outcome is None for job in self.load_jobs):
+            return
+        jobs = self.load_jobs
+        self.load_jobs = []
+        self.progress_bar.setVisible(False)
+        self.cancel_button.setVisible(False)
+
+        loaded = [job for job in jobs if job.outcome == "finished" and job.dh.log_file_loaded]
+        if any(job.outcome == "cancelled" for job in jobs):
+            self.print_to_status_label("Loading cancelled")
+        if not loaded:
+            return
+
+        #Logs loaded again replace the ones with the same name
+        log_names = [log_name for log_name, _ in self.loaded_logs]
+        for job in loaded:
+            if job.log_name in log_names:
+                self.loaded_logs[log_names.index(job.log_name)] = (job.log_name, job.dh)
+            else:
+                self.loaded_logs.append((job.log_name, job.dh))
+                log_names.append(job.log_name)
+
+        #Show the last loaded log, or the one that was shown before annotating again
+        shown = loaded[-1] if jobs[0].filenames else next((job for job in loaded if job.log_name == self.current_file_name), loaded[-1])
+        self.update_log_selector(log_names, shown.log_name)
+        session_plot_mode = self.session_plot_mode
+        if not jobs[0].filenames and shown.log_name == self.current_file_name and not session_plot_mode:
+            self.update_annotations(shown.dh)
+        else:
+            self.process_loaded_file(shown.dh, shown.log_name)
+        if session_plot_mode and not jobs[0].filenames:
+            #Keep showing every log after annotating them again
+            self.log_selector.setCurrentIndex(len(log_names) + list(SESSION_PLOTS.values()).index(session_plot_mode))
+
+    def update_annotations(self, dh:DataHandler):
+        """Shows a re-annotated version of the current log, updating only the table columns and plot lines that changed
+
+        Args:
+            dh (DataHandler): DataHandler with the current log annotated with a new filter or trace configuration
+        """
+        if dh.log_data.shape != self.dh.log_data.shape or len(dh.signals) != len(self.dh.signals) or self.mpl_canvas is None:
+            #Traces or signals were added or removed, show everything again
+            self.process_loaded_file(dh)
+            return
+        self.dh = dh
+        self.dh.set_status_output_destination(self.print_to_status_label)
+        self.dh.set_progress_output_destination(None)
+        self.model.update_data(self.dh.log_data, self.dh.column_names, self.dh.changed_columns)
+        #Descriptions, colours and traces the row filter looks at may have changed
+        self.model.set_rows(self.dh.get_visible_rows())
+        self.show_row_count()
+
+        trace_offset = self.dh.initial_column_count
+        changed_traces = [column - trace_offset for column in self.dh.changed_columns if column >= trace_offset]
+        for trace_index in changed_traces:
+            self.mpl_canvas.update_step_trace(trace_index, self.dh.log_data.time, self.trace_plot_values(trace_index))
+        for trace_index, trace in enumerate(self.dh.traces):
+            self.mpl_canvas.set_trace_label(trace_index, trace["name"])
+        for signal_index in self.dh.changed_signals:
+            self.mpl_canvas.update_step_trace(len(self.dh.traces) + signal_index, self.dh.log_data.time, self.signal_plot_values(signal_index))
+        for signal_index in range(len(self.dh.signals)):
+            self.mpl_canvas.set_trace_label(len(self.dh.traces) + signal_index, self.signal_label(signal_index))
+        self.mpl_canvas.set_signal_readout(self.signal_readout_names(), self.dh.signal_data)
+        if changed_traces or self.dh.changed_signals:
+            self.mpl_canvas.update_snap_points(self.dh.log_data.time, self.dh.log_data.trace_data, self.dh.signal_data)
+        self.mpl_canvas.draw_idle()
+        self.update_statistics_window()
+
+    def show_selected_log(self, index:int):
+        if self.live_worker:
+            return
+        if 0 <= index < len(self.loaded_logs):
+            log_name, dh = self.loaded_logs[index]
+            self.process_loaded_file(dh, log_name)
+        elif index >= len(self.loaded_logs):
+            self.show_session_plot(list(SESSION_PLOTS.values())[index - len(self.loaded_logs)])
+
+    def show_session_plot(self, mode:str):
+        """Plots the traces of every loaded log on one time axis, each log in a colour of its own. Traces are matched
+        across logs by name. The table and cursor keep showing the log that was shown last
+
+        Args:
+            mode (str): "aligned" draws the same trace of every log on the same level to compare runs,
+                "stacked" draws the traces of each log on levels of their own below those of the previous log
+        """
+        if self.mpl_canvas is None or not self.loaded_logs:
+            return
+        self.session_plot_mode = mode
+        trace_names = [trace["name"] for trace in self.dh.traces]
+        bands = len(self.loaded_logs) if mode == "stacked" else 1
+        levels = len(trace_names)*bands
+
+        self.mpl_canvas.remove_traces()
+        legend_lines = []
+        legend_names = []
+        max_time = 0
+        for log_index, (log_name, dh) in enumerate(self.loaded_logs):
+            band = log_index if mode == "stacked" else 0
+            log_traces = dh.column_names[dh.initial_column_count:]
+            for trace_index, trace_name in enumerate(trace_names):
+                if trace_name not in log_traces:
+                    continue
+                level = band*len(trace_names) + trace_index
+                values = dh.log_data.trace_data[:,log_traces.index(trace_name)].astype(int) + 2*(levels - level)
+                line = self.mpl_canvas.add_step_trace(dh.log_data.time, values, trace_name)
+                line.set_color("C%d" % (log_index % 10))
+                if log_name not in legend_names:
+                    legend_lines.append(line)
+                    legend_names.append(log_name)
+            if len(dh.log_data):
+                max_time = max(max_time, np.nanmax(dh.log_data.time))
+
+        self.mpl_canvas.set_plot_title("%d logs, %s" % (len(self.loaded_logs), mode))
+        self.mpl_canvas.initialize_cursor_snapping(self.dh.log_data.time, self.dh.log_data.trace_data)
+        self.mpl_canvas.set_trace_labels(trace_names*bands)
+        self.mpl_canvas.reset_time_axis(max_time)
+        self.mpl_canvas.set_log_legend(legend_lines, legend_names)
+        self.mpl_canvas.draw_idle()
 
     def save_log_dialog(self):
         filename, _ = QtWidgets.QFileDialog.getSaveFileName(self,"Save log file","","Log files(*.txt);;All Files(*)")
@@ -577,54 +1204,161 @@ class MainWindow(QtWidgets.QMainWindow):
             self.dh.save_canview_log(filename, self.embnote_editor.toPlainText())
             self.current_file_name = os.path.splitext(os.path.basename(filename))[0]
             self.setWindowTitle("".join(["CAN Analyze v", version, " - ", self.current_file_name]))
-            self.mpl_canvas.set_plot_title(self.current_file_name)
+            if self.mpl_canvas:
+                self.mpl_canvas.set_plot_title(self.current_file_name)
             return True
         else:
             return False
 
 
-    def process_loaded_file(self):
-        #Check if any filters or traces have been loaded. If not, then load defaults
-        if len(self.dh.filter_list) == 0:
-            self.dh.load_file(self.default_filter_file_path)
-        if len(self.dh.traces) == 0:
-            self.dh.load_file(self.default_trace_config_file_path)
-        
+    def process_loaded_file(self, dh:DataHandler = None, log_name:str = ""):
+        """Shows the loaded log in the plot and table
+
+        Args:
+            dh (DataHandler, optional): DataHandler returned by background loading, replaces the current one. Defaults to None.
+            log_name (str, optional): name of the log shown in the title. Defaults to "".
+        """
+        if dh is not None:
+            self.dh = dh
+            self.dh.set_status_output_destination(self.print_to_status_label)
+            self.dh.set_progress_output_destination(None)
+        if log_name:
+            self.current_file_name = log_name
+            self.setWindowTitle("".join(["CAN Analyze v", version, " - ", self.current_file_name]))
+
         #Check that some log data is actually present before doing anything else
         if len(self.dh.log_data) > 1:
             #Add traces
             self.add_traces_to_canvas()
 
             #Add data to table
-            self.model = TableModel((self.dh.log_data, self.dh.column_names))
-            self.table.setModel(self.model)
-            selection_model = self.table.selectionModel()
-            selection_model.selectionChanged.connect(self.table.get_selected_hexdec)
-            self.resize_table_to_contents()
+            self.show_table()
 
             self.embnote_editor.setPlainText("\n".join(self.dh.embnote))
+            self.update_statistics_window()
+
+    def show_table(self):
+        """Shows the current log in a new table model
+        """
+        self.model = TableModel((self.dh.log_data, self.dh.column_names), self.dh.get_visible_rows())
+        self.table.setModel(self.model)
+        selection_model = self.table.selectionModel()
+        selection_model.selectionChanged.connect(self.table.get_selected_hexdec)
+        self.resize_table_to_contents()
+        self.show_row_count()
+
+    def apply_row_filter(self):
+        """Shows only the lines chosen by the row filter box in the table of every loaded log, keeping the selected line in view
+        """
+        if self.load_jobs:
+            self.print_to_status_label("Already loading, wait or cancel first")
+            return
+        current_index = self.table.currentIndex()
+        selected_row = self.model.log_row(current_index.row()) if current_index.isValid() else -1
+        try:
+            self.dh.set_row_filter(self.row_filter_box.text())
+        except ValueError as e:
+            self.print_to_status_label("Invalid row filter: %s" % e)
+            return
+        for _, dh in self.loaded_logs:
+            if dh is not self.dh:
+                dh.set_row_filter(self.dh.row_filter)
+        self.model.set_rows(self.dh.get_visible_rows())
+        self.show_row_count()
+        if selected_row >= 0:
+            self.highlightRow(selected_row)
+
+    def show_row_count(self):
+        visible_rows = self.dh.get_visible_rows()
+        self.row_filter_label.setText("" if visible_rows is None else "%d of %d lines" % (len(visible_rows), len(self.dh.log_data)))
 
     def add_traces_to_canvas(self):
         """Clears matplotlib canvas and adds each of the currently defined traces to the canvas
         """
+        if self.mpl_canvas is None:
+            return
+        self.session_plot_mode = ""
         self.mpl_canvas.remove_traces()
-        for trace in self.dh.traces:
-            #Plot time on x axis and each trace on y with an offset to match order in trace_config file
-            line, = self.mpl_canvas.axes.step(x = self.dh.log_data[:,0],
-                                              y = self.dh.log_data[:,self.dh.column_names.index(trace["name"])] + 2*(len(self.dh.traces) - self.dh.traces.index(trace)),
-                                              label = trace["name"],
-                                              where = 'post'
-                                              )
+        for trace_index, trace in enumerate(self.dh.traces):
+            self.mpl_canvas.add_step_trace(self.dh.log_data.time, self.trace_plot_values(trace_index), trace["name"])
+        for signal_index in range(len(self.dh.signals)):
+            self.mpl_canvas.add_step_trace(self.dh.log_data.time, self.signal_plot_values(signal_index), self.signal_label(signal_index))
         self.mpl_canvas.set_plot_title(self.current_file_name)
-        self.mpl_canvas.initialize_cursor_snapping()
+        self.mpl_canvas.initialize_cursor_snapping(self.dh.log_data.time, self.dh.log_data.trace_data, self.dh.signal_data)
+        self.mpl_canvas.set_signal_readout(self.signal_readout_names(), self.dh.signal_data)
   
+    def trace_plot_values(self, trace_index:int, rows = slice(None)):
+        """Returns y values of a trace, of every line of the log unless rows are given. Time is plotted on x axis and
+        each trace on y with an offset to match order in trace_config file
+        """
+        return self.dh.log_data.trace_data[rows,trace_index].astype(int) + 2*(len(self.dh.traces) + len(self.dh.signals) - trace_index)
+
+    def signal_plot_values(self, signal_index:int, rows = slice(None), signal_range:tuple = None):
+        """Returns y values of a signal, of every line of the log unless rows are given, scaled to the height of a
+        trace. Signals are plotted below the traces
+
+        Args:
+            signal_index (int): index of the signal
+            rows (optional): rows of the log. Defaults to every row.
+            signal_range (tuple, optional): (low, high) scaled to the height of a trace. Defaults to the range of the signal's values.
+        """
+        values = self.dh.signal_data[rows,signal_index]
+        low, high = signal_range if signal_range else value_range(self.dh.signal_data[:,signal_index])
+        return (values - low)/(high - low) + 2*(len(self.dh.signals) - signal_index)
+
+    def signal_label(self, signal_index:int, signal_range:tuple = None) -> str:
+        """Returns the y axis label of a signal: its name and the range of values plotted, see signal_plot_values
+        """
+        signal = self.dh.signals[signal_index]
+        low, high = signal_range if signal_range else value_range(self.dh.signal_data[:,signal_index])
+        return ("%s\n%g..%g %s" % (signal["name"], low, high, signal["unit"])).rstrip()
+
+    def signal_readout_names(self) -> list[str]:
+        return [signal["name"].replace("\n", " ") for signal in self.dh.signals]
+
     def highlightRow(self,row):
         """
-        Used to highlight row in QTableView after the corresponding point is clicked on the plot
+        Used to highlight row in QTableView after the corresponding point is clicked on the plot. row is a line of the log,
+        if the row filter hides it the closest shown line before it is highlighted
         """  
+        row = self.model.table_row(row)
         self.table.selectRow(row)
         self.table.scrollTo(self.table.model().index(row, 0),QtWidgets.QAbstractItemView.ScrollHint.PositionAtCenter)
 
+    def show_statistics_window(self):
+        if self.mpl_canvas is None:
+            return
+        if self.statistics_window is None:
+            self.statistics_window = StatisticsWindow(self.highlightRow)
+        self.statistics_window.show_statistics(self.dh)
+        self.statistics_window.show()
+        self.statistics_window.raise_()
+        self.statistics_window.activateWindow()
+
+    def update_statistics_window(self):
+        """Shows statistics of the current log if the statistics window is open
+        """
+        if self.statistics_window is not None and self.statistics_window.isVisible():
+            self.statistics_window.show_statistics(self.dh)
+
+    def find_next(self, backwards:bool = False):
+        """Jumps to the next (or previous) row matching the search box, starting from the selected row
+        """
+        query = self.search_box.text().strip()
+        if not query:
+            return
+        rows = self.dh.search(query)
+        #Only lines shown in the table are found
+        if self.dh.get_visible_rows() is not None:
+            rows = np.intersect1d(rows, self.dh.get_visible_rows(), assume_unique=True)
+        if len(rows) == 0:
+            self.search_result_label.setText("No matches")
+            return
+        current_index = self.table.currentIndex()
+        row = self.dh.get_log_index().next_match(rows, self.model.log_row(current_index.row()) if current_index.isValid() else -1, backwards)
+        self.highlightRow(row)
+        self.search_result_label.setText("%d of %d" % (np.searchsorted(rows, row) + 1, len(rows)))
+
     def keyPressEvent(self, event):
         """Reimplement Qt method"""
         #print("MainWindow keypress: %s" % event.key())
@@ -632,6 +1366,16 @@ class MainWindow(QtWidgets.QMainWindow):
             print("Ctrl + O in MainWindow")
             self.load_file_dialog()
             event.accept()
+        elif event.matches(QtGui.QKeySequence.StandardKey.Find):
+            self.search_box.setFocus()
+            self.search_box.selectAll()
+            event.accept()
+        elif event.matches(QtGui.QKeySequence.StandardKey.FindNext):
+            self.find_next()
+            event.accept()
+        elif event.matches(QtGui.QKeySequence.StandardKey.FindPrevious):
+            self.find_next(backwards = True)
+            event.accept()
         else:
             QtWidgets.QMainWindow.keyPressEvent(self, event)
 
@@ -644,12 +1388,14 @@ class MainWindow(QtWidgets.QMainWindow):
     def dropEvent(self, event):
         dropped_files = [u.toLocalFile() for u in event.mimeData().urls()]
         if len(dropped_files) > 0:
-            for dropped_file in dropped_files:
-                file_type = self.dh.load_file(dropped_file)
-                if file_type == "log_file":
-                    self.current_file_name = os.path.splitext(os.path.basename(dropped_file))[0]
-                    self.setWindowTitle("".join(["CAN Analyze v", version, " - ", self.current_file_name]))
-            self.process_loaded_file()
+            self.load_files(dropped_files)
+
+    def closeEvent(self, event):
+        #Stop background loading and live capture before the window goes away
+        self.cancel_loading()
+        self.stop_live_capture()
+        QtCore.QThreadPool.globalInstance().waitForDone()
+        QtWidgets.QMainWindow.closeEvent(self, event)
 
     def print_to_status_label(self, status_text:str):
         """Used to print status or debug messages by objects / widgets to the main window status bar
@@ -665,30 +1411,15 @@ class MainWindow(QtWidgets.QMainWindow):
         else:
             print(status_text)
 
-def resolve_path(path:str, freeze_path:bool = True) -> str:
-    """A helper function to convert relative paths to absolute paths for correct resource location both when program is run as a script or bundled as an executable
-
-    Args:
-        path (str): relative path to desired resource
-        freeze_path (bool, optional): in a bundled executable look for resource in the un-bundle location (instead of executable directory). Defaults to True.
-
-    Returns:
-        str: runtime absolute path to desired resource
-    """     
-    if getattr(sys, "frozen", False) and freeze_path:
-        # If the 'frozen' flag is set, we are in bundled app mode
-        resolved_path = os.path.abspath(os.path.join(sys._MEIPASS, path))
-    else:
-        # Normal development mode
-        resolved_path = os.path.abspath(os.path.join(os.getcwd(), path))
-
-    return resolved_path
-
-if sys.platform.startswith("win32"):
-    appid = u'cananalyze.cananalyze.v'+version # application ID for Windows to set correct icon
-    ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(appid)
-
-app = QtWidgets.QApplication(sys.argv)
-clipboard = app.clipboard()
-w = MainWindow()
-app.exec()
\ No newline at end of file
+if __name__ == "__main__":
+    #Worker processes of a frozen application start by running it again
+    multiprocessing.freeze_support()
+    if sys.platform.startswith("win32"):
+        appid = u'cananalyze.cananalyze.v'+version # application ID for Windows to set correct icon
+        ctypes.windll.shell32.SetCurrentProcessExplicitAppUserModelID(appid)
+
+    app = QtWidgets.QApplication(sys.argv)
+    clipboard = app.clipboard()
+    report_startup("Qt started")
+    w = MainWindow()
+    app.exec()
@@ -0,0 +1,186 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from DataHandler import DataHandler
+
+COLUMN_NAMES = ["Time", "Delta", "Description", "ID", "D0", "D1", "D2", "D3", "D4", "D5", "D6", "D7", "Colour"]
+OUTPUT_EXTENSIONS = {"canview": ".txt", "npz": ".npz"}
+
+
+def find_logs(inputs:list[str]) -> list[str]:
+    """Expands directories and glob patterns to a sorted list of files
+
+    Args:
+        inputs (list[str]): files, directories or glob patterns
+
+    Returns:
+        list[str]: paths to files, each listed once
+    """
+    filenames = []
+    for path in inputs:
+        if os.path.isdir(path):
+            filenames += [os.path.join(path, name) for name in sorted(os.listdir(path)) if os.path.isfile(os.path.join(path, name))]
+        else:
+            filenames += sorted(glob.glob(path)) if glob.has_magic(path) else [path]
+    return list(dict.fromkeys(filenames))
+
+
+def output_paths(filenames:list[str], output_dir:str, output_format:str) -> dict:
+    """Works out where each log is exported to. Logs keep their path relative to the directory all of them are in, so
+    logs with the same name in different directories don't overwrite each other. Names that still clash get a number
+
+    Returns:
+        dict: {filename: output path}, or None for logs whose output would overwrite one of the logs
+    """
+    def same_file_key(path:str) -> str:
+        return os.path.normcase(os.path.realpath(path))
+
+    directories = [os.path.dirname(os.path.abspath(filename)) for filename in filenames]
+    try:
+        root = os.path.commonpath(directories)
+    except ValueError:
+        #Logs on different drives keep their whole path
+        root = None
+    inputs = set(same_file_key(filename) for filename in filenames)
+    used = set()
+    outputs = dict()
+    for filename, directory in zip(filenames, directories):
+        if root is None:
+            drive, directory = os.path.splitdrive(directory)
+            directory = os.path.join(drive.strip(":\\/"), directory.lstrip("\\/"))
+        else:
+            directory = os.path.relpath(directory, root)
+        name = os.path.join(output_dir, directory, os.path.splitext(os.path.basename(filename))[0])
+        output = os.path.normpath(name + OUTPUT_EXTENSIONS[output_format])
+        number = 1
+        while same_file_key(output) in used:
+            number += 1
+            output = os.path.normpath("%s_%d%s" % (name, number, OUTPUT_EXTENSIONS[output_format]))
+        used.add(same_file_key(output))
+        outputs[filename] = None if same_file_key(output) in inputs else output
+    return outputs
+
+
+def format_latency(result:dict) -> str:
+    """One line summary of a latency measurement returned by DataHandler.measure_latency, with line numbers of outliers
+    """
+    if result["count"] == 0:
+        return "%s: no pairs, %d unpaired" % (result["name"], len(result["unpaired_rows"]))
+    summary = "%s: %d pairs, %d unpaired, min %.2f  median %.2f  p99 %.2f  max %.2f ms" % (
+        result["name"], result["count"], len(result["unpaired_rows"]), result["min"], result["median"], result["p99"], result["max"])
+    if result["outlier_count"]:
+        outliers = ", ".join("%d (%.2f ms)" % (row + 1, latency) for row, latency in zip(result["outliers"]["start_row"], result["outliers"]["latency"]))
+        summary += ", %d outliers at lines %s" % (result["outlier_count"], outliers)
+    return summary
+
+
+def process_log(filename:str, filter_file:str, trace_config_file:str, output:str, output_format:str, use_cache:bool, measurements:list[str] = None, log_workers:int = 1) -> dict:
+    """Loads, annotates and exports one log. Runs in a worker process
+
+    Returns:
+        dict: "file", "output", "lines", "timings" of each stage in seconds and "latency" summaries of the measurements
+            in the trace configuration and those given, or "error" if the file could not be processed
+    """
+    result = {"file": filename, "output": "", "lines": 0, "timings": {}, "latency": []}
+    timings = result["timings"]
+    dh = DataHandler(COLUMN_NAMES)
+    dh.set_status_output_destination(lambda status_text: None)
+    dh.worker_count = log_workers
+    if use_cache:
+        try:
+            dh.enable_log_cache()
+        except OSError:
+            pass
+    try:
+        started = time.perf_counter()
+        if filter_file:
+            dh.load_file(filter_file)
+        if trace_config_file:
+            dh.load_file(trace_config_file)
+        timings["config"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if dh.get_file_type(filename) != "log_file":
+            result["error"] = "not a CanView log"
+            return result
+        dh.log_file_loaded = dh.load_canview_log(filename)
+        timings["load"] = time.perf_counter() - started
+        if not dh.log_file_loaded:
+            result["error"] = "incomplete CanView header"
+            return result
+        result["lines"] = len(dh.log_data)
+
+        if dh.filter_loaded:
+            started = time.perf_counter()
+            dh.apply_filters()
+            timings["filter"] = time.perf_counter() - started
+        if dh.trace_config_loaded:
+            started = time.perf_counter()
+            dh.add_trace_points()
+            timings["trace"] = time.perf_counter() - started
+        if dh.measurements or measurements:
+            started = time.perf_counter()
+            result["latency"] = [format_latency(dh.measure_latency(measurement)) for measurement in dh.measurements + (measurements or [])]
+            timings["latency"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        if output_format == "npz":
+            dh.export_columns(output)
+        else:
+            dh.save_canview_log(output, "\n".join(dh.embnote) if dh.embnote else "Exported by CAN-Analyze")
+        timings["save"] = time.perf_counter() - started
+        result["output"] = output
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+
+def main(argv:list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Decode, filter and export CanView logs without the GUI")
+    parser.add_argument("logs", nargs="+", help="log files, directories or glob patterns")
+    parser.add_argument("-f", "--filter", default="", help="CanView filter file to apply")
+    parser.add_argument("-t", "--trace-config", default="", help="trace configuration (.json) to add trace columns")
+    parser.add_argument("-o", "--output-dir", default="annotated", help="directory to write exported logs to. Defaults to ./annotated")
+    parser.add_argument("--format", choices=sorted(OUTPUT_EXTENSIONS), default="canview", help="canview: annotated log via save_canview_log, npz: named NumPy columns")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count(), help="number of worker processes. Defaults to the number of CPUs")
+    parser.add_argument("-m", "--measure", action="append", default=[], help='latency between trace edges, e.g. "S5 Ready+ -> C0 Sheet exit+". May be given several times')
+    parser.add_argument("--log-workers", type=int, default=1, help="processes the filters and traces of each large log are split across. Useful for a few very large logs. Defaults to 1")
+    parser.add_argument("--no-cache", action="store_true", help="don't read or write the log cache")
+    args = parser.parse_args(argv)
+
+    filenames = find_logs(args.logs)
+    if not filenames:
+        print("No log files found")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    failed = 0
+    started = time.perf_counter()
+    outputs = output_paths(filenames, args.output_dir, args.format)
+    for filename in [filename for filename in filenames if outputs[filename] is None]:
+        failed += 1
+        print("FAILED %s: output would overwrite a log, choose another output directory" % filename)
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = [executor.submit(process_log, filename, args.filter, args.trace_config, outputs[filename], args.format, not args.no_cache, args.measure, max(1, args.log_workers))
+                   for filename in filenames if outputs[filename] is not None]
+        for future in as_completed(futures):
+            result = future.result()
+            timings = "  ".join("%s %.3fs" % (stage, seconds) for stage, seconds in result["timings"].items())
+            if "error" in result:
+                failed += 1
+                print("FAILED %s: %s" % (result["file"], result["error"]))
+            else:
+                print("%s: %d lines -> %s  %s" % (result["file"], result["lines"], result["output"], timings))
+            for summary in result["latency"]:
+                print("    " + summary)
+    print("Processed %d files (%d failed) in %.3fs" % (len(filenames), failed, time.perf_counter() - started))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
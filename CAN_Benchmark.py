@@ -0,0 +1,425 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from DataHandler import DataHandler
+from LogStore import LogStore
+from ResourcePaths import resolve_path
+
+COLUMN_NAMES = ["Time", "Delta", "Description", "ID", "D0", "D1", "D2", "D3", "D4", "D5", "D6", "D7", "Colour"]
+COLOURS = ["RED", "GREEN", "BLUE", "YELLOW", "GREY", "PURPLE", "ORANGE", "PINK"]
+#Filter and trace configuration used for each bundled sample, by the product name in the sample's file name
+SAMPLE_CONFIGS = {"VFX": ("filters/filter_VFX_XCAN.txt", "config/trace_config_default_VFX.json"),
+                  "Pro_XL": ("filters/filter_Pro_XL_XCAN.txt", "config/trace_config_Pro_XL.json")}
+#Stages that need PyQt6 and matplotlib, skipped with --no-gui
+GUI_STAGES = ["table", "plot", "redraw"]
+
+
+def synthetic_name(lines:int, id_count:int, filter_depth:int, payload_values:int) -> str:
+    return "synthetic_%d_ids%d_depth%d_values%d" % (lines, id_count, filter_depth, payload_values)
+
+
+def signal_id_count(id_count:int) -> int:
+    """Returns how many of the synthetic IDs are signals: messages that only switch D0 between 00 and 01, used by traces
+    """
+    return max(1, min(16, id_count // 4))
+
+
+def synthetic_ids(id_count:int, seed:int = 0) -> np.ndarray:
+    """Returns distinct 29 bit message IDs. The same seed always gives the same IDs
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.unique(rng.integers(0, 1 << 29, id_count*2, dtype=np.uint32))[:id_count]
+    return rng.permutation(ids)
+
+
+def generate_log(filename:str, lines:int, id_count:int, payload_values:int, seed:int = 0):
+    """Writes a synthetic CanView log. Message IDs are drawn from id_count IDs, the first four data bytes take
+    payload_values different values and the rest are zero, so that the number of distinct messages can be controlled.
+    The last signal_id_count IDs are signals for the synthetic traces
+
+    Args:
+        filename (str): path to file to be written
+        lines (int): number of messages
+        id_count (int): number of distinct message IDs
+        payload_values (int): number of values each of the first four data bytes takes
+        seed (int, optional): seed of the random generator. Defaults to 0.
+    """
+    rng = np.random.default_rng(seed + 1)
+    message_ids = synthetic_ids(id_count, seed)
+    #Rounded to the 0.1 ms resolution of CanView logs
+    delta = np.round(rng.exponential(1.0, lines), 1)
+    delta[0] = 0.0
+    payload = np.zeros((lines, 8), dtype=np.uint8)
+    payload[:,:4] = rng.integers(0, payload_values, (lines, 4), dtype=np.uint8)
+    dlc = np.where(rng.random(lines) < 0.9, 8, 4).astype(np.uint8)
+    ids = message_ids[rng.integers(0, id_count, lines)]
+    signals = np.isin(ids, message_ids[-signal_id_count(id_count):])
+    payload[signals,0] &= 1
+    payload[signals,1:] = 0
+    dlc[signals] = 8
+    log = LogStore(np.cumsum(delta), delta, ids, payload, dlc)
+
+    dh = DataHandler(list(COLUMN_NAMES))
+    dh.set_status_output_destination(lambda status_text: None)
+    dh.set_log_data(log, [])
+    dh.save_canview_log(filename, "Synthetic log: %d lines, %d IDs" % (lines, id_count))
+
+
+def generate_filter(filename:str, id_count:int, filter_depth:int, payload_values:int, seed:int = 0):
+    """Writes a CanView filter for a synthetic log. Half of the IDs have a filter line, each linking to a chain of
+    filter_depth - 1 subfilters which match one data byte each
+
+    Args:
+        filename (str): path to file to be written
+        id_count (int): number of distinct message IDs of the log
+        filter_depth (int): number of filter levels a message passes through, at most 5
+        payload_values (int): number of values each of the first four data bytes takes
+        seed (int, optional): seed the log was generated with. Defaults to 0.
+    """
+    message_ids = synthetic_ids(id_count, seed)
+    #DataHandler.get_file_type looks for the filter marker on the second line
+    lines = ["//" + "-"*75, "// CanView Filter", "// Synthetic filter, depth %d" % filter_depth, "", "FILTERS:"]
+    link = "{s2}" if filter_depth > 1 else ""
+    for i, message_id in enumerate(message_ids[:max(1, id_count // 2)]):
+        lines.append('%08X x xx xx xx xx xx xx xx xx "ID_%d.%s"\t%s' % (message_id, i, link, COLOURS[i % len(COLOURS)]))
+    for level in range(2, filter_depth + 1):
+        lines += ["", "SUBFILTERS_%d:" % level]
+        link = "{s%d}" % (level + 1) if level < filter_depth else ""
+        for value in range(payload_values):
+            data = ["xx"]*8
+            data[level - 2] = "%02X" % value
+            lines.append('xxxxxxxx x %s "D%d_%02X.%s"\t%s' % (" ".join(data), level - 2, value, link, COLOURS[value % len(COLOURS)]))
+    with open(filename, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def generate_trace_config(filename:str, id_count:int, trace_count:int, seed:int = 0):
+    """Writes a trace configuration for a synthetic log. Every third trace is a pulse, the others are set by a
+    signal with D0 = 01 and reset by the same signal with D0 = 00
+    """
+    signal_ids = synthetic_ids(id_count, seed)[-signal_id_count(id_count):]
+    traces = []
+    for i in range(trace_count):
+        message_id = "%08X" % signal_ids[i % len(signal_ids)]
+        traces.append({"name": "T%d\n%s" % (i, message_id),
+                       "high_msg": message_id + "01000000" + "00"*4,
+                       "low_msg": "next" if i % 3 == 2 else message_id + "00000000" + "00"*4})
+    with open(filename, "w") as f:
+        json.dump(traces, f, indent=4)
+
+
+def bundled_samples() -> list[tuple]:
+    """Returns (log, filter, trace configuration) of each log in samples/
+    """
+    sample_dir = resolve_path("samples")
+    benchmarks = []
+    for name in sorted(os.listdir(sample_dir)):
+        for product, (filter_file, trace_config_file) in SAMPLE_CONFIGS.items():
+            if product in name:
+                benchmarks.append((os.path.join(sample_dir, name), resolve_path(filter_file), resolve_path(trace_config_file)))
+                break
+    return benchmarks
+
+
+def synthetic_logs(work_dir:str, sizes:list[int], id_count:int, filter_depth:int, payload_values:int, trace_count:int) -> list[tuple]:
+    """Generates synthetic logs with their filter and trace configuration, reusing files generated by earlier runs
+
+    Returns:
+        list[tuple]: (log, filter, trace configuration) of each size
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    config_name = os.path.join(work_dir, synthetic_name(0, id_count, filter_depth, payload_values))
+    filter_file = config_name + ".filter.txt"
+    trace_config_file = config_name + ".traces%d.json" % trace_count
+    generate_filter(filter_file, id_count, filter_depth, payload_values)
+    generate_trace_config(trace_config_file, id_count, trace_count)
+    benchmarks = []
+    for lines in sizes:
+        log_file = os.path.join(work_dir, synthetic_name(lines, id_count, filter_depth, payload_values) + ".txt")
+        if not os.path.exists(log_file):
+            print("Generating %s" % log_file)
+            generate_log(log_file + ".tmp", lines, id_count, payload_values)
+            os.replace(log_file + ".tmp", log_file)
+        benchmarks.append((log_file, filter_file, trace_config_file))
+    return benchmarks
+
+
+class Pipeline():
+    def __init__(self, log_file:str, filter_file:str, trace_config_file:str, output_dir:str, gui:bool, worker_count:int = 1):
+        """Runs the stages of loading, annotating, saving and showing one log, see stages
+
+        Args:
+            log_file (str): CanView log
+            filter_file (str): CanView filter
+            trace_config_file (str): trace configuration
+            output_dir (str): directory the log is saved to by the save stage
+            gui (bool): include the table and plot stages
+            worker_count (int, optional): processes filters and traces are evaluated on, see DataHandler.worker_count. Defaults to 1.
+        """
+        self.log_file = log_file
+        self.filter_file = filter_file
+        self.trace_config_file = trace_config_file
+        self.output_file = os.path.join(output_dir, "saved_" + os.path.basename(log_file))
+        self.gui = gui
+        self.worker_count = worker_count
+        self.dh = None
+        self.canvas = None
+
+    def stages(self) -> list[tuple]:
+        """Returns (name, function) of each stage in the order they have to run
+        """
+        stages = [("config", self.load_config),
+                  ("load", self.load_log),
+                  ("filter", self.apply_filters),
+                  ("trace", self.add_trace_points),
+                  ("index", self.build_index),
+                  ("save", self.save_log)]
+        if self.gui:
+            stages += [("table", self.show_table), ("plot", self.plot_traces), ("redraw", self.redraw_zoomed)]
+        return stages
+
+    def load_config(self):
+        self.dh = DataHandler(list(COLUMN_NAMES))
+        self.dh.set_status_output_destination(lambda status_text: None)
+        self.dh.worker_count = self.worker_count
+        self.dh.load_file(self.filter_file, False)
+        self.dh.load_file(self.trace_config_file, False)
+
+    def load_log(self):
+        self.dh.log_file_loaded = self.dh.load_canview_log(self.log_file)
+        if not self.dh.log_file_loaded:
+            raise ValueError("%s is not a complete CanView log" % self.log_file)
+
+    def apply_filters(self):
+        self.dh.apply_filters()
+
+    def add_trace_points(self):
+        self.dh.add_trace_points()
+
+    def build_index(self):
+        self.dh.get_log_index()
+
+    def save_log(self):
+        self.dh.save_canview_log(self.output_file)
+        os.remove(self.output_file)
+
+    def show_table(self, pages:int = 100, page_rows:int = 40):
+        """Fetches what a table view shows while scrolling through the log: display strings and backgrounds of
+        page_rows rows at a time, at pages positions spread over the log
+        """
+        from PyQt6.QtCore import Qt
+        from CAN_Analyze import TableModel
+        model = TableModel((self.dh.log_data, self.dh.column_names))
+        rows = len(self.dh.log_data)
+        for first_row in np.linspace(0, max(0, rows - page_rows), pages).astype(int):
+            for row in range(first_row, min(first_row + page_rows, rows)):
+                for column in range(model.columnCount(None)):
+                    index = model.index(row, column)
+                    model.data(index, Qt.ItemDataRole.DisplayRole)
+                    model.data(index, Qt.ItemDataRole.BackgroundRole)
+
+    def plot_traces(self):
+        """Plots the traces the way MainWindow does and draws the whole log
+        """
+        from PlotCanvas import MplCanvas
+        if self.canvas is None:
+            self.canvas = MplCanvas(width=16, height=9)
+            self.canvas.resize(1600, 900)
+        log = self.dh.log_data
+        self.canvas.remove_traces()
+        trace_count = len(self.dh.traces)
+        for trace_index, trace in enumerate(self.dh.traces):
+            values = log.trace_data[:,trace_index].astype(int) + 2*(trace_count - trace_index)
+            self.canvas.add_step_trace(log.time, values, trace["name"])
+        self.canvas.initialize_cursor_snapping(log.time, log.trace_data)
+        self.canvas.update_level_of_detail()
+        self.canvas.draw()
+
+    def redraw_zoomed(self, steps:int = 10):
+        """Zooms in to a tenth of the log and pans through it, drawing at each step
+        """
+        x_min, x_max = self.canvas.axes.get_xlim()
+        width = (x_max - x_min)/10
+        for step in range(steps):
+            self.canvas.axes.set_xlim(x_min + step*width, x_min + (step + 1)*width)
+            self.canvas.update_level_of_detail()
+            self.canvas.draw()
+
+    def run(self, trace_memory:bool = False) -> dict:
+        """Runs every stage once
+
+        Args:
+            trace_memory (bool, optional): record the peak memory allocated by each stage with tracemalloc instead of timing it. Defaults to False.
+
+        Returns:
+            dict: seconds (or peak bytes) of each stage
+        """
+        measurements = dict()
+        for name, stage in self.stages():
+            gc.collect()
+            if trace_memory:
+                tracemalloc.start()
+                stage()
+                measurements[name] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            else:
+                started = time.perf_counter()
+                stage()
+                measurements[name] = time.perf_counter() - started
+        return measurements
+
+
+def benchmark_log(log_file:str, filter_file:str, trace_config_file:str, output_dir:str, repeat:int, gui:bool, trace_memory:bool, worker_count:int = 1) -> list[dict]:
+    """Runs the pipeline on one log repeat times, plus once more with memory tracing
+
+    Returns:
+        list[dict]: one result per stage with the best of the timed runs
+    """
+    runs = []
+    for i in range(repeat):
+        pipeline = Pipeline(log_file, filter_file, trace_config_file, output_dir, gui, worker_count)
+        runs.append(pipeline.run())
+    lines = len(pipeline.dh.log_data)
+    distinct_messages = len(np.unique(pipeline.dh.get_message_index()))
+    memory = Pipeline(log_file, filter_file, trace_config_file, output_dir, gui, worker_count).run(True) if trace_memory else dict()
+
+    results = []
+    for stage in runs[0]:
+        timings = [run[stage] for run in runs]
+        results.append({"log": os.path.basename(log_file),
+                        "lines": lines,
+                        "distinct_messages": distinct_messages,
+                        "stage": stage,
+                        "seconds": min(timings),
+                        "runs": timings,
+                        "peak_memory": memory.get(stage)})
+    return results
+
+
+def git_version() -> str:
+    """Returns git describe of the source tree, or an empty string if it isn't a git checkout
+    """
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def peak_rss() -> int:
+    """Returns the peak resident memory of the process in bytes, or None where the resource module is not available
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #ru_maxrss is in bytes on macOS and in KB elsewhere
+    return peak if sys.platform == "darwin" else peak*1024
+
+
+def compare_results(results:list[dict], baseline_file:str, threshold:float) -> int:
+    """Prints how much slower or faster each stage is than in an earlier results file
+
+    Returns:
+        int: number of stages that are slower than threshold times the baseline
+    """
+    with open(baseline_file, "r") as f:
+        baseline = {(result["log"], result["stage"]): result for result in json.load(f)["results"]}
+    regressions = 0
+    print("Compared to %s:" % baseline_file)
+    for result in results:
+        previous = baseline.get((result["log"], result["stage"]))
+        if previous is None or previous["seconds"] <= 0:
+            continue
+        ratio = result["seconds"]/previous["seconds"]
+        regressed = ratio > threshold
+        regressions += regressed
+        print("  %-45s %-7s %8.4fs -> %8.4fs  x%.2f%s" % (result["log"], result["stage"], previous["seconds"], result["seconds"],
+                                                        ratio, "  SLOWER" if regressed else ""))
+    return regressions
+
+
+def main(argv:list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time each stage of loading, annotating, saving and showing CanView logs")
+    parser.add_argument("--logs", nargs="*", default=None, help="logs to benchmark instead of the bundled samples, with --filter and --trace-config")
+    parser.add_argument("-f", "--filter", default="filters/filter_default.txt", help="CanView filter used with --logs")
+    parser.add_argument("-t", "--trace-config", default="config/trace_config_default.json", help="trace configuration used with --logs")
+    parser.add_argument("--no-samples", action="store_true", help="don't benchmark the bundled samples")
+    parser.add_argument("--synthetic", nargs="*", type=int, default=[10000, 100000, 1000000], metavar="LINES",
+                        help="sizes of synthetic logs to generate and benchmark. Defaults to 10k, 100k and 1M lines, pass none to skip")
+    parser.add_argument("--ids", type=int, default=200, help="number of distinct message IDs in synthetic logs. Defaults to 200")
+    parser.add_argument("--filter-depth", type=int, default=3, choices=range(1, 6), help="filter levels of the synthetic filter. Defaults to 3")
+    parser.add_argument("--payload-values", type=int, default=4, help="values each of the first four data bytes takes in synthetic logs. Defaults to 4")
+    parser.add_argument("--traces", type=int, default=10, help="number of traces in the synthetic trace configuration. Defaults to 10")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "CAN-Analyze-benchmark"),
+                        help="directory synthetic logs are generated in and kept for later runs")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="timed runs per log, the fastest is reported. Defaults to 3")
+    parser.add_argument("--no-memory", action="store_true", help="skip the extra run that records peak memory of each stage")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="processes filters and traces of large logs are evaluated on. Defaults to 1")
+    parser.add_argument("--no-gui", action="store_true", help="skip the table and plot stages")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="file to write results to. Defaults to benchmark_results.json")
+    parser.add_argument("--compare", default="", help="earlier results file to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown reported as a regression by --compare. Defaults to 1.2")
+    args = parser.parse_args(argv)
+
+    gui = not args.no_gui
+    if gui:
+        #The table and plot are drawn without showing a window
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        try:
+            from PyQt6 import QtWidgets
+            app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv[:1])
+        except ImportError:
+            print("PyQt6 is not available, skipping %s" % ", ".join(GUI_STAGES))
+            gui = False
+
+    benchmarks = []
+    if args.logs is not None:
+        benchmarks += [(log_file, args.filter, args.trace_config) for log_file in args.logs]
+    elif not args.no_samples:
+        benchmarks += bundled_samples()
+    if args.synthetic:
+        benchmarks += synthetic_logs(args.work_dir, args.synthetic, args.ids, args.filter_depth, args.payload_values, args.traces)
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        for log_file, filter_file, trace_config_file in benchmarks:
+            log_results = benchmark_log(log_file, filter_file, trace_config_file, output_dir, max(1, args.repeat), gui, not args.no_memory, max(1, args.workers))
+            print("%s: %d lines, %d distinct messages" % (log_file, log_results[0]["lines"], log_results[0]["distinct_messages"]))
+            for result in log_results:
+                memory = "" if result["peak_memory"] is None else "  peak %.1f MB" % (result["peak_memory"]/1024**2)
+                print("  %-7s %8.4fs%s" % (result["stage"], result["seconds"], memory))
+            results += log_results
+
+    report = {"version": git_version(),
+              "date": datetime.datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(),
+              "numpy": np.__version__,
+              "platform": platform.platform(),
+              "cpu_count": os.cpu_count(),
+              "parameters": vars(args),
+              "peak_rss": peak_rss(),
+              "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Results written to %s" % args.output)
+
+    if args.compare:
+        return 1 if compare_results(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
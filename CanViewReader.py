@@ -0,0 +1,406 @@
+import mmap
+import os
+import numpy as np
+from itertools import chain, islice
+from FilterEngine import HEX_UPPER_LOOKUP, decode_message_strings
+from LogStore import LogStore
+
+#Bytes of a mapped file searched for line breaks at once
+INDEX_WINDOW = 1 << 24
+
+
+def is_canview_log(first_line:str) -> bool:
+    """Checks the first line of a file for the CanView log header
+    """
+    return "HEADER_BEGIN" in first_line
+
+
+def get_column_spacing(col_header:list[int]) -> list[tuple]:
+    """Works out the fixed width field positions of a CanView log body
+
+    Args:
+        col_header (list[int]): widths from the 3rd row of the header: delta time, description, message ID, data byte
+
+    Returns:
+        list[tuple]: (start, end) of the Delta, Description, ID and D0..D7 fields
+    """
+    data_start = 2 + col_header[0] + col_header[1] + col_header[2]
+    column_spacing = [
+        (3, 2 + col_header[0]), #Delta time
+        (2 + col_header[0], 2 + col_header[0] + col_header[1]), #Description
+        (2 + col_header[0] + col_header[1], data_start), #Message ID
+        ]
+    column_spacing += [(data_start + i*col_header[3], data_start + i*col_header[3] + 2) for i in range(8)]
+    return column_spacing
+
+
+def accumulate_time(delta:np.ndarray, time_carry:float = 0.0) -> tuple:
+    """Works out the cumulative time of messages from their deltas, continuing from the time of a previous message
+
+    Args:
+        delta (np.ndarray): time since previous message in ms, NaN where the log has no delta
+        time_carry (float, optional): time of the message before the first one. Defaults to 0.0.
+
+    Returns:
+        tuple: (time, time_carry) where time is NaN for messages without a delta and time_carry is the running time
+            after the last message
+    """
+    time = np.cumsum(np.concatenate([[time_carry], np.nan_to_num(delta)]))[1:]
+    if len(time):
+        time_carry = time[-1]
+    time[np.isnan(delta)] = np.nan
+    return time, time_carry
+
+
+class CanViewReader():
+    def __init__(self, filename:str, chunk_size:int = 65536):
+        """Reads a CanView log in a single pass over the file, decoding the fixed width body in chunks of lines
+
+        Args:
+            filename (str): path to file to be read
+            chunk_size (int, optional): number of lines decoded at once. Limits memory used for temporary strings. Defaults to 65536.
+        """
+        self.filename = filename
+        self.chunk_size = chunk_size
+        self.embnote = []
+        self.column_spacing = []
+
+    def read(self, progress:callable = None) -> LogStore:
+        """Reads the log
+
+        Args:
+            progress (callable, optional): called with the fraction of the file read after each chunk. Defaults to None.
+
+        Returns:
+            LogStore: the loaded log, or None if the file is not a CanView log or the header is incomplete
+        """
+        file_size = max(1, os.path.getsize(self.filename))
+        characters_read = 0
+        with open(self.filename, "r", encoding="utf-8", errors="replace") as log_file:
+            if not self.read_header(log_file):
+                return None
+
+            #Time is accumulated across chunks by continuing the running sum from the last row of the previous chunk
+            time_carry = 0.0
+            row_count = 0
+            chunks = []
+            irregular = dict()
+            description_codes = dict()
+            description_categories = [""]
+            while True:
+                lines = list(islice(log_file, self.chunk_size))
+                if not lines:
+                    break
+                if progress:
+                    #Characters are close enough to bytes for progress reporting
+                    characters_read += sum(len(line) for line in lines)
+                    progress(min(1.0, characters_read/file_size))
+                chunk = self.decode_lines(lines)
+                if chunk is None:
+                    continue
+                delta, descriptions, message_id, payload, dlc, chunk_irregular = chunk
+
+                time, time_carry = accumulate_time(delta, time_carry)
+
+                #Map descriptions found in this chunk onto the description categories of the whole log
+                chunk_categories, chunk_codes = np.unique(descriptions, return_inverse=True)
+                for category in chunk_categories:
+                    if category not in description_codes and category != "":
+                        description_codes[category] = len(description_categories)
+                        description_categories.append(category)
+                remap = np.array([description_codes.get(category, 0) for category in chunk_categories], dtype=np.int32)
+
+                irregular.update({row_count + row: strings for row, strings in chunk_irregular.items()})
+                chunks.append((time, delta, message_id, payload, dlc, remap[chunk_codes.reshape(-1)]))
+                row_count += len(delta)
+
+        if chunks:
+            columns = [np.concatenate(column) for column in zip(*chunks)]
+        else:
+            columns = [np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.uint32), np.zeros((0, 8), dtype=np.uint8), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int32)]
+        log = LogStore(columns[0], columns[1], columns[2], columns[3], columns[4], irregular = irregular)
+        log.set_descriptions(columns[5], np.array(description_categories, dtype=object))
+        return log
+
+    def read_header(self, lines) -> int:
+        """Reads the header from an iterator over log lines (e.g. an open log file), leaving it positioned at the first line of the body
+
+        Returns:
+            int: number of lines consumed, or 0 if a complete CanView header was not found
+        """
+        first_line = next(lines, "")
+        if not is_canview_log(first_line):
+            return 0
+        header = [first_line] + [next(lines, "") for _ in range(3)]
+        #Get the 3rd row of the header which contains column spacing for this file
+        col_header = [int(i) for i in header[3].split(",")]
+        self.column_spacing = get_column_spacing(col_header)
+
+        #Find end of header, collecting the embedded note on the way
+        self.embnote = []
+        embnote_found = False
+        consumed = len(header)
+        for line in lines:
+            consumed += 1
+            line = line.rstrip("\r\n")
+            if "</EMBNOTE>" in line:
+                embnote_found = False
+            if embnote_found:
+                self.embnote.append(line)
+            if "<EMBNOTE>" in line:
+                embnote_found = True
+            if "HEADER_END" in line:
+                #The line after the end of header is a divider
+                next(lines, "")
+                return consumed + 1
+        return 0
+
+    def decode_lines(self, lines:list[str]) -> tuple:
+        """Decodes a chunk of fixed width body lines into typed arrays
+
+        Returns:
+            tuple: (delta, descriptions, message_id, payload, dlc, irregular) or None if the chunk has no messages
+        """
+        lines = [line.rstrip("\r\n") for line in lines]
+        if not lines:
+            return None
+        width = self.column_spacing[-1][1]
+        codes = np.array(lines, dtype="U%d" % width).view(np.uint32).reshape(len(lines), width)
+
+        fields = [self.field_strings(codes, start, end) for start, end in self.column_spacing]
+        #Lines with nothing inside the fixed width fields (e.g. a lone ">" at the end of the log) are not messages
+        has_content = np.any(np.stack([field != "" for field in fields]), axis=0)
+        if not np.all(has_content):
+            fields = [field[has_content] for field in fields]
+            if len(fields[0]) == 0:
+                return None
+        rows = len(fields[0])
+
+        delta_text = np.char.replace(np.char.replace(fields[0], "-", "0"), "ms", "")
+        delta = np.full(rows, np.nan)
+        has_delta = delta_text != ""
+        delta[has_delta] = delta_text[has_delta].astype(np.float64)
+
+        byte_columns = np.stack(fields[3:], axis=1)
+        message_id, payload, dlc, regular = decode_message_strings(fields[2], byte_columns)
+        irregular = {int(row): [str(fields[2][row])] + [str(b) for b in byte_columns[row]] for row in np.flatnonzero(~regular)}
+        return delta, fields[1], message_id, payload, dlc, irregular
+
+    def field_strings(self, codes:np.ndarray, start:int, end:int) -> np.ndarray:
+        """Cuts a fixed width field out of a block of line characters and strips surrounding whitespace
+        """
+        if end <= start:
+            return np.full(len(codes), "", dtype="U1")
+        field = np.ascontiguousarray(codes[:,start:end]).view("U%d" % (end - start)).reshape(len(codes))
+        return np.char.strip(field)
+
+
+class MappedCanViewReader(CanViewReader):
+    def __init__(self, filename:str, chunk_size:int = 32768, load_descriptions:bool = True):
+        """Reads a CanView log through a memory map of the file. A line offset index is built over the mapped bytes
+        and fixed width fields are decoded from it in vectorized slabs of lines, so the file is never held in memory as text.
+        Field positions are counted in bytes, which matches the character positions for ASCII logs
+
+        Args:
+            filename (str): path to file to be read
+            chunk_size (int, optional): number of lines decoded per slab. Defaults to 32768.
+            load_descriptions (bool, optional): materialize the description column. Can be skipped when filters
+                will replace descriptions anyway. Defaults to True.
+        """
+        super(MappedCanViewReader, self).__init__(filename, chunk_size)
+        self.load_descriptions = load_descriptions
+
+    def read(self, progress:callable = None) -> LogStore:
+        """Reads the log
+
+        Args:
+            progress (callable, optional): called with the fraction of lines decoded after each slab. Defaults to None.
+
+        Returns:
+            LogStore: the loaded log, or None if the file is not a CanView log or the header is incomplete
+        """
+        with open(self.filename, "rb") as log_file:
+            try:
+                mapped = mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                #Empty files can't be mapped
+                return None
+        buffer = np.frombuffer(mapped, dtype=np.uint8)
+        error = None
+        try:
+            line_starts = self.index_lines(buffer)
+            header_lines = (bytes(buffer[start:end]).decode("utf-8", errors="replace") for start, end in zip(line_starts, chain(line_starts[1:], [len(buffer)])))
+            consumed = self.read_header(header_lines)
+            if not consumed:
+                return None
+            line_starts = line_starts[consumed:]
+
+            slabs = []
+            irregular = dict()
+            description_codes = dict()
+            description_categories = [""]
+            row_count = 0
+            for start in range(0, len(line_starts), self.chunk_size):
+                if progress:
+                    progress(start/len(line_starts))
+                slab_starts = line_starts[start:start + self.chunk_size]
+                slab_end = int(line_starts[start + self.chunk_size]) if start + self.chunk_size < len(line_starts) else len(buffer)
+                try:
+                    slab = self.decode_slab(buffer, slab_starts, slab_end)
+                except ValueError as e:
+                    #The traceback holds views of the map, which can't be closed until it is gone
+                    error = "Line %d: %s" % (consumed + start + self.find_bad_line(buffer, slab_starts, slab_end) + 1, e)
+                    break
+                if slab is None:
+                    continue
+                delta, descriptions, message_id, payload, dlc, slab_irregular = slab
+
+                codes = np.zeros(len(delta), dtype=np.int32)
+                if descriptions is not None:
+                    #Map descriptions found in this slab onto the description categories of the whole log
+                    slab_categories, slab_codes = np.unique(descriptions, return_inverse=True)
+                    for category in slab_categories:
+                        category = category.decode("utf-8", errors="replace")
+                        if category not in description_codes and category != "":
+                            description_codes[category] = len(description_categories)
+                            description_categories.append(category)
+                    remap = np.array([description_codes.get(c.decode("utf-8", errors="replace"), 0) for c in slab_categories], dtype=np.int32)
+                    codes = remap[slab_codes.reshape(-1)]
+
+                irregular.update({row_count + row: strings for row, strings in slab_irregular.items()})
+                slabs.append((delta, message_id, payload, dlc, codes))
+                row_count += len(delta)
+        finally:
+            del buffer
+            mapped.close()
+        if error:
+            raise ValueError(error)
+
+        if slabs:
+            delta, message_id, payload, dlc, codes = [np.concatenate(column) for column in zip(*slabs)]
+        else:
+            delta, message_id, payload, dlc, codes = np.zeros(0), np.zeros(0, dtype=np.uint32), np.zeros((0, 8), dtype=np.uint8), np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int32)
+        time = np.cumsum(np.nan_to_num(delta))
+        time[np.isnan(delta)] = np.nan
+        log = LogStore(time, delta, message_id, payload, dlc, irregular = irregular)
+        log.set_descriptions(codes, np.array(description_categories, dtype=object))
+        return log
+
+    def index_lines(self, buffer:np.ndarray) -> np.ndarray:
+        """Builds the line offset index of the mapped file. Line breaks are searched for one window of the file at a
+        time, so no temporary array as large as the file is needed
+
+        Returns:
+            np.ndarray: byte offset of the start of each line
+        """
+        line_starts = [np.zeros(1, dtype=np.int64)]
+        for offset in range(0, len(buffer), INDEX_WINDOW):
+            line_starts.append(np.flatnonzero(buffer[offset:offset + INDEX_WINDOW] == ord("\n")) + (offset + 1))
+        line_starts = np.concatenate(line_starts)
+        if line_starts[-1] == len(buffer):
+            #The file ends with a line break
+            line_starts = line_starts[:-1]
+        return line_starts
+
+    def line_ends(self, buffer:np.ndarray, line_starts:np.ndarray, slab_end:int) -> np.ndarray:
+        """Works out where lines end from where the next ones start
+
+        Args:
+            buffer (np.ndarray): bytes of the mapped file
+            line_starts (np.ndarray): byte offset of the start of each line of a slab
+            slab_end (int): byte offset of the line after the slab, or the file size
+
+        Returns:
+            np.ndarray: byte offset of the end of each line, excluding the line break
+        """
+        line_ends = np.append(line_starts[1:], slab_end)
+        line_ends -= buffer[line_ends - 1] == ord("\n")
+        line_ends -= (line_ends > line_starts) & (buffer[np.maximum(line_ends - 1, 0)] == ord("\r"))
+        return line_ends
+
+    def find_bad_line(self, buffer:np.ndarray, line_starts:np.ndarray, slab_end:int) -> int:
+        """Finds the first line of a slab that can't be decoded by bisecting it
+
+        Returns:
+            int: index of the line in the slab
+        """
+        good, bad = 0, len(line_starts)
+        while bad - good > 1:
+            middle = (good + bad)//2
+            try:
+                self.decode_slab(buffer, line_starts[:middle], int(line_starts[middle]))
+                good = middle
+            except ValueError:
+                bad = middle
+        return good
+
+    def decode_slab(self, buffer:np.ndarray, line_starts:np.ndarray, slab_end:int) -> tuple:
+        """Decodes the fixed width fields of a slab of lines straight from the mapped bytes
+
+        Args:
+            buffer (np.ndarray): bytes of the mapped file
+            line_starts (np.ndarray): byte offset of the start of each line of the slab
+            slab_end (int): byte offset of the line after the slab, or the file size
+
+        Returns:
+            tuple: (delta, descriptions, message_id, payload, dlc, irregular) or None if the slab has no messages.
+                descriptions are bytes, or None if they are not loaded
+        """
+        line_ends = self.line_ends(buffer, line_starts, slab_end)
+        width = self.column_spacing[-1][1]
+        positions = line_starts[:,None] + np.arange(width)
+        #Anything past the end of a line reads as a space
+        codes = np.where(positions < line_ends[:,None], buffer[np.minimum(positions, len(buffer) - 1)], ord(" ")).astype(np.uint8)
+        del positions
+
+        field_mask = np.zeros(width, dtype=bool)
+        for start, end in self.column_spacing:
+            field_mask[start:end] = True
+        has_content = np.any((codes != ord(" ")) & (codes != ord("\t")) & field_mask, axis=1)
+        codes = codes[has_content]
+        rows = len(codes)
+        if rows == 0:
+            return None
+
+        delta_text = self.field_bytes(codes, *self.column_spacing[0])
+        delta_text = np.char.replace(np.char.replace(delta_text, b"-", b"0"), b"ms", b"")
+        delta = np.full(rows, np.nan)
+        has_delta = delta_text != b""
+        delta[has_delta] = delta_text[has_delta].astype(np.float64)
+
+        descriptions = self.field_bytes(codes, *self.column_spacing[1]) if self.load_descriptions else None
+
+        #Regular messages have an 8 digit upper case hex ID followed by spaces and 2 digit bytes or blanks
+        id_start, id_end = self.column_spacing[2]
+        id_nibbles = HEX_UPPER_LOOKUP[codes[:,id_start:min(id_end, id_start + 8)]].astype(np.uint32)
+        regular = np.all(id_nibbles < 16, axis=1) & (id_end - id_start >= 8)
+        regular &= np.all(codes[:,id_start + 8:id_end] == ord(" "), axis=1)
+        message_id = np.zeros(rows, dtype=np.uint32)
+        for i in range(id_nibbles.shape[1]):
+            message_id = (message_id << np.uint32(4)) | (id_nibbles[:,i] & np.uint32(15))
+
+        byte_codes = np.stack([codes[:,start:end] for start, end in self.column_spacing[3:]], axis=1)
+        byte_nibbles = HEX_UPPER_LOOKUP[byte_codes]
+        present = np.all(byte_nibbles < 16, axis=2)
+        blank = np.all(byte_codes == ord(" "), axis=2)
+        dlc = np.sum(present, axis=1).astype(np.uint8)
+        regular &= np.all(present | blank, axis=1) & np.all(present == (np.arange(8) < dlc[:,None]), axis=1)
+        payload = np.where(present, ((byte_nibbles[:,:,0] & 15) << 4) | (byte_nibbles[:,:,1] & 15), 0).astype(np.uint8)
+
+        #Anything else is decoded from the stripped field strings, the same way as the streaming reader does it
+        irregular = dict()
+        other = np.flatnonzero(~regular)
+        if len(other):
+            id_column = self.field_bytes(codes[other], id_start, id_end).astype(str)
+            byte_columns = np.stack([self.field_bytes(codes[other], start, end).astype(str) for start, end in self.column_spacing[3:]], axis=1)
+            message_id[other], payload[other], dlc[other], other_regular = decode_message_strings(id_column, byte_columns)
+            irregular = {int(other[i]): [str(id_column[i])] + [str(b) for b in byte_columns[i]] for i in np.flatnonzero(~other_regular)}
+        return delta, descriptions, message_id, payload, dlc, irregular
+
+    def field_bytes(self, codes:np.ndarray, start:int, end:int) -> np.ndarray:
+        """Cuts a fixed width field out of a block of line bytes and strips surrounding whitespace
+        """
+        if end <= start:
+            return np.full(len(codes), b"", dtype="S1")
+        field = np.ascontiguousarray(codes[:,start:end]).view("S%d" % (end - start)).reshape(len(codes))
+        return np.char.strip(field)
@@ -1,7 +1,23 @@
+import copy
 import numpy as np
-import pandas as pd
 import json
+import os
 from fnmatch import fnmatch
+from FilterEngine import CompiledFilter, MessageDictionary, MessageTable, evaluate_trace_states
+from LogStore import BASE_COLUMN_COUNT, BYTE_STRINGS, COLOUR_COLUMN, DESCRIPTION_COLUMN, LogStore, encode_categories
+from CanViewReader import CanViewReader, MappedCanViewReader, is_canview_log
+from LogCache import LogCache, hash_config, hash_file
+from LiveCapture import LiveLog, LiveWindow
+from LogIndex import LogIndex, normalize_trace_name
+from RowFilter import check_row_filter, parse_row_filter, select_rows
+import ParallelEvaluation
+from BusStatistics import bus_load, id_statistics
+from SignalDecoder import decode_signal, hold_values, is_signal_definition, load_signal
+from EdgeLatency import is_measurement_definition, load_measurement, measure_latency, parse_edge, trace_edges
+
+
+class LoadCancelled(Exception):
+    """Raised inside DataHandler.load_file when loading is cancelled with DataHandler.cancel_loading"""
 
 
 class DataHandler():
@@ -15,10 +31,19 @@ class DataHandler():
         self.column_names = col_names
         self.initial_column_count = len(self.column_names)
 
-        #A Numpy array containing loaded and processed CAN data along with trace values
-        self.log_data = np.full((1,self.initial_column_count),"")
+        #Typed columnar storage of loaded and processed CAN data along with trace values
+        self.log_data = LogStore.empty()
         self.log_file_loaded = False
         self.embnote = []
+        #Number of log lines decoded at once when reading a CanView log
+        self.log_chunk_size = 65536
+        #"stream" reads logs as text, "mmap" decodes them from a memory map of the file, "auto" uses mmap for files larger than mmap_threshold bytes
+        self.log_load_mode = "auto"
+        self.mmap_threshold = 64*1024*1024
+        #Number of processes filters and traces are evaluated on, see ParallelEvaluation. With 1, or for fewer than
+        #parallel_threshold distinct messages or log rows, they are evaluated in this process
+        self.worker_count = 1
+        self.parallel_threshold = 500000
 
         #A list of filters to be applied to the CAN log
         #columns = ["Level", "Filter", "Description", "Subfilter", "Colour"]
@@ -28,40 +53,320 @@ class DataHandler():
         #A list of dicts containing trace name, high message, low message
         self.traces = []
         self.trace_config_loaded = False
+        #Numeric signals decoded from data bytes, loaded from the trace configuration along with traces. See SignalDecoder.load_signal
+        self.signals = []
+        #Latency measurements between trace edges, loaded from the trace configuration. See EdgeLatency.load_measurement
+        self.measurements = []
+
+        #Distinct messages of loaded logs along with filter and trace results evaluated on them. Shared with DataHandlers
+        #created by copy_configuration, so messages common to several logs are only evaluated once
+        self.message_dictionary = MessageDictionary()
+        #Index into message_dictionary of the message on each row of the loaded log. Built on first use and kept until another log is loaded
+        self.message_index = None
+
+        #Inputs the derived columns of the loaded log were computed from, so that only columns whose inputs change are recomputed.
+        #Hash of the filter list behind descriptions and colours, and (high_msg, low_msg) of each trace column
+        self.applied_filter = ""
+        self.applied_traces = []
+        #Indices of columns recomputed by the last call to annotate
+        self.changed_columns = []
+        #Value of each signal on each row of the loaded log, one column per signal. NaN before the first message of a signal
+        self.signal_data = np.zeros((0, 0))
+        #Definitions the signal columns were decoded from and indices of signals decoded again by the last call to annotate
+        self.applied_signals = []
+        self.changed_signals = []
+        #Search index of the annotated log, see get_log_index
+        self.log_index = None
+        #Timing statistics of each message ID of the loaded log, see get_id_statistics
+        self.timing_statistics = None
+        #Predicates choosing the rows shown in the table, see RowFilter.select_rows, and the rows of the annotated log they select
+        self.row_filter = dict()
+        self.visible_rows = None
+
+        #Ring buffer of messages received from a live source, see start_live_capture, and the messages of it shown in log_data
+        self.live_log = None
+        self.live_window = None
+        self.live_capacity = 200000
+        #Number of captured messages that had been dropped from the ring buffer when log_data was last updated
+        self.live_first_row = 0
+        self.live_total_rows = 0
+
+        #Optional on-disk cache of parsed logs and their filter/trace results, see enable_log_cache
+        self.log_cache = None
+        self.log_file_hash = ""
+
+        #Progress of long operations is reported as (fraction, text). Cancelling is checked whenever progress is reported
+        self.status_output = None
+        self.progress_output = None
+        self.cancel_requested = False
+
+    def copy_configuration(self, include_log:bool = False):
+        """Creates a new DataHandler with the same filters, trace configuration and load settings. Used to load files
+        in the background without touching the data shown in the GUI
+
+        Args:
+            include_log (bool, optional): also share the loaded log. The copy can re-annotate it without changing this one. Defaults to False.
+
+        Returns:
+            DataHandler: the new DataHandler
+        """
+        dh = DataHandler(self.column_names[:self.initial_column_count])
+        dh.filter_list = self.filter_list
+        dh.filter_loaded = self.filter_loaded
+        dh.traces = self.traces
+        dh.trace_config_loaded = self.trace_config_loaded
+        dh.signals = self.signals
+        dh.measurements = self.measurements
+        dh.row_filter = self.row_filter
+        dh.log_chunk_size = self.log_chunk_size
+        dh.log_load_mode = self.log_load_mode
+        dh.mmap_threshold = self.mmap_threshold
+        dh.worker_count = self.worker_count
+        dh.parallel_threshold = self.parallel_threshold
+        dh.live_capacity = self.live_capacity
+        dh.message_dictionary = self.message_dictionary
+        dh.log_cache = self.log_cache
+        if include_log:
+            #Annotating replaces whole columns, so a shallow copy keeps this log unchanged
+            dh.set_log_data(copy.copy(self.log_data), self.embnote)
+            dh.log_file_loaded = self.log_file_loaded
+            dh.log_file_hash = self.log_file_hash
+            dh.message_index = self.message_index
+            dh.column_names = list(self.column_names)
+            dh.applied_filter = self.applied_filter
+            dh.applied_traces = list(self.applied_traces)
+            dh.signal_data = self.signal_data
+            dh.applied_signals = list(self.applied_signals)
+        return dh
+
+    def get_file_type(self, filename:str) -> str:
+        """Determines whether the file is a CanView log or CanView filter or trace configuration
 
-    def load_file(self, filename:str) -> str:
+        Args:
+            filename (str): path to file
+
+        Returns:
+            str: ["trace_config", "log_file", "filter", ""]
+        """
+        if fnmatch(filename,"*.json"):
+            return "trace_config"
+        #Only the first two lines are needed to recognize the file type
+        with open(filename, "r", encoding="utf-8", errors="replace") as f:
+            file_header = [f.readline(), f.readline()]
+        if is_canview_log(file_header[0]):
+            return "log_file"
+        elif "// CanView Filter" in file_header[1]:
+            return "filter"
+        return ""
+
+    def load_file(self, filename:str, annotate:bool = True) -> str:
         """Determines whether the file is a CanView log or CanView filter or trace configuration and then loads it appropriately
         Args:
             filename (str): path to file to be loaded
+            annotate (bool, optional): apply filters and traces to the loaded log afterwards. Defaults to True.
 
         Returns:
             str: file type that was loaded ["trace_config", "log_file", "filter", ""]
         """        
         self.print_status("Loading %s" % filename)
-        file_type = ""
-        if fnmatch(filename,"*.json"):
-            file_type = "trace_config"
+        self.cancel_requested = False
+        file_type = self.get_file_type(filename)
+        if file_type == "trace_config":
             self.trace_config_loaded = self.load_trace_config(filename)
+        elif file_type == "log_file":
+            self.log_file_loaded = self.load_canview_log(filename)
+        elif file_type == "filter":
+            self.filter_loaded = self.load_canview_filter(filename)
         else:
-            file_header = open(filename, "r").read().splitlines()
-            if "HEADER_BEGIN" in file_header[0]:
-                file_type = "log_file"
-                self.log_file_loaded = self.load_canview_log(filename)
-            elif "// CanView Filter" in file_header[1]:
-                file_type = "filter"
-                self.filter_loaded = self.load_canview_filter(filename)
-            else:
-                self.print_status("File type not recognized")
+            self.print_status("File type not recognized")
+
+        if annotate:
+            self.annotate()
+        return file_type
 
+    def annotate(self):
+        """Applies the loaded filter and trace configuration to the loaded log. Only columns whose filter or trace
+        definition changed are recomputed, their indices are listed in changed_columns
+        """
+        self.changed_columns = []
+        self.changed_signals = []
+        self.log_index = None
+        self.visible_rows = None
         if self.log_file_loaded:
             if self.filter_loaded:
+                self.report_progress(0.7, "Applying filters")
                 self.apply_filters()
             if self.trace_config_loaded:
+                self.report_progress(0.9, "Adding traces")
                 self.add_trace_points()
-
-        return file_type
+                self.decode_signals()
+            self.report_progress(1.0, "Done")
 
     def load_canview_log(self, filename:str):
+        """Loads CAN message log in CanView format, reading the file once and decoding it in chunks
+        Args:
+            filename (str): path to file to be loaded
+        """
+        if self.log_cache:
+            self.log_file_hash = hash_file(filename)
+            #A log cached without descriptions can only be used if a filter will replace them
+            cached = self.log_cache.load_log(self.log_file_hash, True) or (self.filter_loaded and self.log_cache.load_log(self.log_file_hash, False))
+            if cached:
+                self.set_log_data(*cached)
+                self.print_status("CanView log loaded from cache: %d lines" % len(self.log_data))
+                return True
+        else:
+            self.log_file_hash = ""
+
+        use_mmap = self.log_load_mode == "mmap" or (self.log_load_mode == "auto" and os.path.getsize(filename) > self.mmap_threshold)
+        if use_mmap:
+            #Descriptions in the file would be replaced by the loaded filter anyway, so they are only decoded if there is no filter
+            reader = MappedCanViewReader(filename, load_descriptions = not self.filter_loaded)
+        else:
+            reader = CanViewReader(filename, self.log_chunk_size)
+        #Reading the log is the first 70% of loading it
+        log_data = reader.read(lambda fraction: self.report_progress(0.7*fraction, "Reading log"))
+        if log_data is not None:
+            self.set_log_data(log_data, reader.embnote)
+            if self.log_cache:
+                self.log_cache.save_log(self.log_file_hash, log_data, reader.embnote, getattr(reader, "load_descriptions", True))
+            self.print_status("CanView log loaded: %d lines" % len(self.log_data))
+            return True
+
+        self.print_status("Failed to load CanView log")
+        return False
+
+    def set_log_data(self, log_data:LogStore, embnote:list[str]):
+        """Replaces the loaded log and drops everything that was derived from the previous one
+        """
+        self.log_data = log_data
+        self.embnote = embnote
+        self.message_index = None
+        self.log_index = None
+        self.timing_statistics = None
+        self.visible_rows = None
+        self.applied_filter = ""
+        self.applied_traces = []
+        self.signal_data = np.zeros((len(log_data), 0))
+        self.applied_signals = []
+
+    def start_live_capture(self, capacity:int = None):
+        """Starts a live log. Messages passed to ingest_frames are filtered and traced as they arrive and kept in a
+        ring buffer of the latest messages, which update_live_view adds to log_data
+
+        Args:
+            capacity (int, optional): number of messages kept. Defaults to live_capacity.
+        """
+        traces = self.traces if self.trace_config_loaded else []
+        capacity = capacity if capacity else self.live_capacity
+        self.live_log = LiveLog(capacity, self.filter_list if self.filter_loaded else None, traces)
+        self.live_window = LiveWindow(capacity)
+        self.live_first_row = 0
+        self.live_total_rows = 0
+        self.column_names = self.column_names[:self.initial_column_count] + [trace["name"] for trace in traces]
+        log_data = LogStore.empty()
+        log_data.set_trace_data(np.zeros((0, len(traces))))
+        self.set_log_data(log_data, [])
+        self.signal_data = np.zeros((0, len(self.signals)))
+        #The live log is annotated with the loaded configuration as messages arrive
+        self.applied_filter = hash_config(self.filter_list) if self.live_log.compiled_filter else ""
+        self.applied_traces = [(trace["high_msg"], trace["low_msg"]) for trace in traces]
+        self.applied_signals = self.signal_inputs()
+        self.log_file_loaded = True
+        self.log_file_hash = ""
+
+    def ingest_frames(self, frames:LogStore):
+        """Filters and traces a block of messages from a live source and adds it to the live log. Can be called from a
+        thread other than the one calling update_live_view
+        """
+        self.live_log.append(frames)
+
+    def update_live_view(self) -> tuple:
+        """Adds messages that arrived in the live log since the last call to the end of log_data and drops those the
+        live log no longer keeps from its start. Signals, the message index and the rows chosen by the row filter are
+        only worked out for the new messages
+
+        Returns:
+            tuple: (added, dropped) number of messages added to the end and dropped from the start of log_data
+        """
+        frames, first_row, total_rows = self.live_log.take_new(self.live_total_rows)
+        added = total_rows - self.live_total_rows
+        dropped = first_row - self.live_first_row
+        if added == 0:
+            return 0, 0
+        #Rows of log_data that are kept, followed by the new ones
+        kept = len(self.log_data) - min(dropped, len(self.log_data))
+        columns = {"time": frames.time, "delta": frames.delta, "message_id": frames.message_id, "payload": frames.payload,
+                   "dlc": frames.dlc, "description_codes": frames.description_codes, "colour_codes": frames.colour_codes,
+                   "trace_data": frames.trace_data, "signal_data": self.decode_live_signals(frames, first_row > self.live_total_rows)}
+        if self.message_index is not None:
+            if "message_index" not in self.live_window.columns:
+                self.live_window.set_column("message_index", self.message_index)
+            messages = MessageTable(*frames.packed_messages(), frames.message_string)
+            columns["message_index"] = self.message_dictionary.add(messages).astype(np.int32)[messages.index]
+        if self.visible_rows is not None:
+            kept_rows = self.visible_rows[np.searchsorted(self.visible_rows, min(dropped, len(self.log_data))):]
+            new_rows = select_rows(frames, self.column_names[self.initial_column_count:], self.row_filter)
+            self.visible_rows = np.concatenate([kept_rows - (len(self.log_data) - kept), new_rows + kept])
+
+        self.live_window.update(first_row, columns, frames.irregular)
+        self.show_live_window(frames.description_categories, frames.colour_categories)
+        self.live_first_row = first_row
+        self.live_total_rows = total_rows
+        return added, dropped
+
+    def decode_live_signals(self, frames:LogStore, restart:bool) -> np.ndarray:
+        """Decodes signals of messages from a live log, holding the values of the last message in log_data
+
+        Args:
+            frames (LogStore): new messages
+            restart (bool): True if messages were missed since the last message in log_data, so no values are held
+
+        Returns:
+            np.ndarray: matrix of signal values, one column per signal
+        """
+        signal_data = np.zeros((len(frames), len(self.signals)))
+        held = self.signal_data[-1] if len(self.signal_data) and not restart else np.full(len(self.signals), np.nan)
+        for signal_index, signal in enumerate(self.signals):
+            values = decode_signal(frames.message_id, frames.payload, frames.dlc, signal, frames.irregular)
+            signal_data[:,signal_index] = hold_values(np.concatenate([[held[signal_index]], values]))[1:]
+        return signal_data
+
+    def show_live_window(self, description_categories:np.ndarray, colour_categories:np.ndarray, copy:bool = False):
+        """Points log_data and the columns derived from it at the messages in the live window
+
+        Args:
+            description_categories (np.ndarray): description categories of the live log
+            colour_categories (np.ndarray): colour categories of the live log
+            copy (bool, optional): copy the messages out of the window. Defaults to False (views of it).
+        """
+        self.log_data = self.live_window.log_store(description_categories, colour_categories, copy)
+        self.signal_data = self.live_window.column("signal_data", copy)
+        if "message_index" in self.live_window.columns:
+            self.message_index = self.live_window.column("message_index", copy)
+        self.log_index = None
+        self.timing_statistics = None
+
+    def stop_live_capture(self):
+        """Stops the live log. The messages shown last stay in log_data
+        """
+        if self.live_window is not None and len(self.live_window):
+            self.show_live_window(self.log_data.description_categories, self.log_data.colour_categories, copy=True)
+        self.live_log = None
+        self.live_window = None
+
+    def enable_log_cache(self, cache_dir:str = None, max_size:int = 2*1024**3, max_age_days:float = 30):
+        """Keeps parsed logs and their filter and trace results in a cache directory, so that reopening a log with
+        unchanged filter and trace configuration doesn't parse or evaluate anything
+
+        Args:
+            cache_dir (str, optional): directory to keep cached files in. Defaults to a per-user cache directory.
+            max_size (int, optional): total size of cached files in bytes before the least recently used ones are evicted. Defaults to 2 GB.
+            max_age_days (float, optional): cached files not used for this many days are evicted. Defaults to 30.
+        """
+        self.log_cache = LogCache(cache_dir, max_size, max_age_days)
+
+    def load_canview_log_legacy(self, filename:str):
         """Loads CAN message log in CanView format
         Args:
             filename (str): path to file to be loaded
@@ -107,6 +412,8 @@ class DataHandler():
 
             if header_end_found:
                 #self.print_status("Header end found on line %d" % i)
+                #pandas is only needed by this parser, so it is not imported unless it is used
+                import pandas as pd
                 df = pd.read_fwf(filename,colspecs=column_spacing, skiprows=i+1, dtype=str, names=column_names, index_col=False)
 
                 #Remove units from delta time and add a new column with cumulative time
@@ -114,8 +421,10 @@ class DataHandler():
                 df["Delta"] = df["Delta"].str.replace("ms","").astype("float")
                 df.insert(loc=0,column="Time",value=0.0)
                 df["Time"] = df["Delta"].cumsum()
-                df["Colour"] = ""
-                self.log_data = df.replace(np.nan,"").to_numpy()
+                df = df.replace(np.nan,"")
+                self.set_log_data(LogStore.from_strings(df["Time"].to_numpy(), df["Delta"].to_numpy(), df["Description"].to_numpy(),
+                                                        df["ID"].to_numpy(), df[column_names[3:]].to_numpy()), self.embnote)
+                self.log_file_hash = ""
                 self.print_status("CanView log loaded: %d lines" % len(self.log_data))
                 return True
         
@@ -123,7 +432,8 @@ class DataHandler():
         return False
 
     def save_canview_log(self, filename:str, embnote:str = "Exported by CAN-Analyze"):
-        """Saves CAN message log with descriptions and embedded notes in CanView format
+        """Saves CAN message log with descriptions and embedded notes in CanView format. Rows are formatted in chunks of
+        log_chunk_size and written as they are formatted
         Args:
             filename (str): path to file to be written
             embnote (str): a plain text note/comment to embed in the log file
@@ -131,10 +441,19 @@ class DataHandler():
         lines_to_write = ["HEADER_BEGIN-------------------------------------------------------------",
                 "WARNING ! Do not remove or change anything in this header.",
                 "Exported by CanView 1.23"]
-        
-        delta_field_length = len(str(max(self.log_data[:,1]))) + 6
-        description_field_length = len(max(self.log_data[:,2], key = len)) + 1
-        
+
+        log = self.log_data
+        #Fields are as wide as the largest delta and the longest description. Like max() over the column, a NaN in the first row is taken as the largest delta and other NaNs are ignored
+        if len(log) == 0:
+            max_delta = 0.0
+        elif np.isnan(log.delta[0]):
+            max_delta = log.delta[0]
+        else:
+            max_delta = np.nanmax(log.delta)
+        used_descriptions = log.description_categories[np.bincount(log.description_codes, minlength=len(log.description_categories)) > 0]
+        delta_field_length = len(str(float(max_delta))) + 6
+        description_field_length = max((len(description) for description in used_descriptions), default=0) + 1
+
         lines_to_write.append(f"{delta_field_length - 2},{description_field_length},12,4")
         if embnote:
             lines_to_write.append("<EMBNOTE>")
@@ -143,18 +462,51 @@ class DataHandler():
         lines_to_write.append("HEADER_END---------------------------------------------------------------")
         lines_to_write.append("")
 
-        #["Delta", "Description", "ID", "D0", "D1", "D2", "D3", "D4", "D5", "D6", "D7"]
-        for row in self.log_data[:,1:12]:
-            temp = row[0]
-            row[0] = f"> +{row[0]:.1f}ms"
-            line = '{:{delta_field_length}}{:{description_field_length}}{:12}{:4}{:4}{:4}{:4}{:4}{:4}{:4}{:4}'.format(*row, delta_field_length = delta_field_length, description_field_length = description_field_length)
-            lines_to_write.append(line)
-            row[0] = temp
+        #Descriptions, deltas and IDs are formatted once per distinct value. Data bytes are looked up from padded hex strings
+        padded_descriptions = np.array([description.ljust(description_field_length) for description in log.description_categories], dtype=str)
+        padded_bytes = np.array([byte.ljust(4) for byte in BYTE_STRINGS], dtype=str)
 
         with open(filename, 'w') as f:
             f.write("\n".join(lines_to_write))
-            f.close()
+            #["Delta", "Description", "ID", "D0", "D1", "D2", "D3", "D4", "D5", "D6", "D7"]
+            for start in range(0, len(log), self.log_chunk_size):
+                rows = slice(start, start + self.log_chunk_size)
+                deltas, delta_index = np.unique(log.delta[rows], return_inverse=True)
+                lines = np.char.ljust(np.char.mod("> +%.1fms", deltas), delta_field_length)[delta_index]
+                lines = np.char.add(lines, padded_descriptions[log.description_codes[rows]])
+                message_ids, id_index = np.unique(log.message_id[rows], return_inverse=True)
+                lines = np.char.add(lines, np.char.mod("%08X    ", message_ids)[id_index])
+                for byte in range(8):
+                    lines = np.char.add(lines, padded_bytes[np.where(log.dlc[rows] > byte, log.payload[rows, byte].astype(np.int32), 256)])
+                lines = lines.tolist()
+                #Rows that can't be represented by the typed columns are formatted from their original strings
+                for row in log.irregular:
+                    if start <= row < start + len(lines):
+                        lines[row - start] = '{:{delta_field_length}}{:{description_field_length}}{:12}{:4}{:4}{:4}{:4}{:4}{:4}{:4}{:4}'.format(
+                            f"> +{log.delta[row]:.1f}ms", *log[row, DESCRIPTION_COLUMN:COLOUR_COLUMN], delta_field_length = delta_field_length, description_field_length = description_field_length)
+                f.write("\n")
+                f.write("\n".join(lines))
+
+    def export_columns(self, filename:str):
+        """Saves the annotated log as named NumPy columns in a .npz file
 
+        Args:
+            filename (str): path to file to be written
+        """
+        log = self.log_data
+        np.savez(filename,
+                 time = log.time,
+                 delta = log.delta,
+                 message_id = log.message_id,
+                 payload = log.payload,
+                 dlc = log.dlc,
+                 description = log.column(DESCRIPTION_COLUMN).astype(str),
+                 colour = log.column(COLOUR_COLUMN).astype(str),
+                 trace_names = np.array(self.column_names[self.initial_column_count:], dtype=str),
+                 trace_data = log.trace_data,
+                 signal_names = np.array([signal["name"] for signal in self.signals], dtype=str),
+                 signal_data = self.signal_data,
+                 embnote = np.array("\n".join(self.embnote)))
 
     def load_canview_filter(self, filename:str):
         """Loads a filter file which contains definitions and colours to be applied to CAN messages
@@ -201,13 +553,20 @@ class DataHandler():
         
 
     def load_trace_config(self, filename:str):
-        """Loads a JSON file containing names of traces to be plotted as well as messages which toggle "high" or "low" value
+        """Loads a JSON file containing names of traces to be plotted as well as messages which toggle "high" or "low" value.
+        It may also define numeric signals decoded from the data bytes, see SignalDecoder.load_signal, and latency
+        measurements between trace edges, see EdgeLatency.load_measurement
         Args:
             filename (str): path to file to be loaded
         """
         with open(filename, "r") as read_file:
-            self.traces = json.load(read_file)
-        
+            entries = json.load(read_file)
+        #Entries with a start bit are numeric signals, those with a start and an end edge are latency measurements and
+        #the others are traces switched by a high and a low message
+        self.traces = [entry for entry in entries if not is_signal_definition(entry) and not is_measurement_definition(entry)]
+        self.signals = [load_signal(entry) for entry in entries if is_signal_definition(entry)]
+        self.measurements = [load_measurement(entry) for entry in entries if is_measurement_definition(entry)]
+
         #Clean up message definitions by leaving only valid hex characters
         chars_to_remove = 'ghijklmnopqrstuvwxyzGHIJKLMNOPQRSTUVWXYZ!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~ \t\n\r\x0b\x0c'
         table = str.maketrans(dict.fromkeys(chars_to_remove))
@@ -218,7 +577,7 @@ class DataHandler():
             else:
                 trace["low_msg"] = trace["low_msg"].translate(table)
 
-        self.print_status("Trace configuration loaded: %d traces" % len(self.traces))
+        self.print_status("Trace configuration loaded: %d traces, %d signals" % (len(self.traces), len(self.signals)))
         #self.save_trace_config("debug.json")
         return True
 
@@ -229,7 +588,7 @@ class DataHandler():
             filename (str): path to file to be saved
         """
         with open(filename, "w") as write_file:
-            json.dump(self.traces, write_file)
+            json.dump(self.traces + self.signals + self.measurements, write_file)
 
 
     def add_trace_points(self):
@@ -238,71 +597,308 @@ class DataHandler():
         
         #Trim the columns to the initial length to delete any columns that may have been added previously
         self.column_names = self.column_names[:self.initial_column_count]
-        self.log_data = self.log_data[:,:self.initial_column_count]
-        datalines = len(self.log_data)
         for trace in self.traces:
-            #Add each trace to the column name list and add an empty column to the log
             self.column_names.append(trace["name"])
-            self.log_data = np.concatenate([self.log_data,np.zeros((datalines,1), dtype=np.int8)],axis=1)
-            col_index = self.column_names.index(trace["name"])
-            #Go through log row by row and set trace value at each row to 1 if there is a match
-            #print(trace["name"])
-            #print(trace["high_msg"])
-            for row in range(datalines):
-                test_string = self.log_data[row][3:12].sum()[:len(trace["high_msg"])]
-                if test_string == trace["high_msg"] and self.log_data[row-1][col_index] == 0:
-                    self.log_data[row][col_index] = 1
-                    continue
-                if trace["low_msg"] == "next":
-                    self.log_data[row][col_index] = 0
-                    continue
-                if test_string == trace["low_msg"]:
-                    self.log_data[row][col_index] = 0
-                    continue
-                self.log_data[row][col_index] = self.log_data[row-1][col_index]
 
+        #A trace column only depends on the high and low message, so columns of traces that are only renamed or moved are kept
+        trace_inputs = [(trace["high_msg"], trace["low_msg"]) for trace in self.traces]
+        previous_columns = {inputs: column for column, inputs in enumerate(self.applied_traces)}
+        previous_data = self.log_data.trace_data
+        self.changed_columns += [BASE_COLUMN_COUNT + i for i, inputs in enumerate(trace_inputs)
+                                 if i >= len(self.applied_traces) or self.applied_traces[i] != inputs]
+        self.applied_traces = trace_inputs
+
+        config_hash = hash_config(self.traces)
+        cached = self.load_cached_result("trace", config_hash)
+        if cached is not None:
+            self.log_data.set_trace_data(cached["trace_data"])
+            return
+
+        datalines = len(self.log_data)
+        trace_data = np.zeros((datalines, len(self.traces)), dtype=np.int8)
+        evaluated = []
+        for trace_index, trace in enumerate(self.traces):
+            if trace_inputs[trace_index] in previous_columns:
+                trace_data[:,trace_index] = previous_data[:,previous_columns[trace_inputs[trace_index]]]
+            else:
+                evaluated.append(trace_index)
+
+        if self.use_workers(datalines) and evaluated:
+            #Messages are matched once per distinct message here, the state machines run on chunks of rows in the workers
+            self.report_progress(0.9, "Adding %d traces on %d processes" % (len(evaluated), self.worker_count))
+            matches = [self.match_trace_distinct_messages(self.traces[trace_index]) for trace_index in evaluated]
+            pulse = [self.traces[trace_index]["low_msg"] == "next" for trace_index in evaluated]
+            trace_data[:,evaluated] = ParallelEvaluation.evaluate_traces(self.get_message_index(), np.array([high for high, _ in matches]),
+                                                                         np.array([low for _, low in matches]), pulse, self.worker_count)
+        else:
+            for trace_index in evaluated:
+                trace = self.traces[trace_index]
+                self.report_progress(0.9 + 0.1*trace_index/len(self.traces), "Adding trace %s" % trace["name"])
+                #Evaluate values of each trace for the whole log
+                high_match, low_match = self.match_trace_messages(trace)
+                trace_data[:,trace_index] = evaluate_trace_states(high_match, low_match, trace["low_msg"] == "next")
+
+        #Add all trace columns to the log at once
+        self.log_data.set_trace_data(trace_data)
+        self.save_cached_result("trace", config_hash, {"trace_data": trace_data})
+
+    def decode_signals(self):
+        """Decodes the value of each signal on every row of the log, holding it until the next message of the signal.
+        Signals whose definition didn't change since the last call are kept
+        """
+        signal_inputs = self.signal_inputs()
+        previous_columns = {inputs: column for column, inputs in enumerate(self.applied_signals)}
+        previous_data = self.signal_data
+        self.changed_signals = [i for i, inputs in enumerate(signal_inputs) if i >= len(self.applied_signals) or self.applied_signals[i] != inputs]
+        self.applied_signals = signal_inputs
+
+        log = self.log_data
+        signal_data = np.zeros((len(log), len(self.signals)))
+        for signal_index, signal in enumerate(self.signals):
+            if signal_inputs[signal_index] in previous_columns:
+                signal_data[:,signal_index] = previous_data[:,previous_columns[signal_inputs[signal_index]]]
+            else:
+                signal_data[:,signal_index] = hold_values(decode_signal(log.message_id, log.payload, log.dlc, signal, log.irregular))
+        self.signal_data = signal_data
+
+    def signal_inputs(self) -> list:
+        """Returns a hash of the definition of each signal. Name and unit don't change the values
+        """
+        return [hash_config({key: value for key, value in signal.items() if key not in ("name", "unit")}) for signal in self.signals]
+
+    def match_trace_messages(self, trace:dict) -> tuple:
+        """Finds log rows that match the high and low message of a trace
+
+        Args:
+            trace (dict): trace definition with "high_msg" and "low_msg"
+
+        Returns:
+            tuple: (high_match, low_match) bool arrays with one value per log row
+        """
+        high_match, low_match = self.match_trace_distinct_messages(trace)
+        message_index = self.get_message_index()
+        return high_match[message_index], low_match[message_index]
+
+    def match_trace_distinct_messages(self, trace:dict) -> tuple:
+        """Finds messages in message_dictionary that match the high and low message of a trace
+
+        Returns:
+            tuple: (high_match, low_match) bool arrays with one value per message in message_dictionary
+        """
+        high_msg = trace["high_msg"]
+        low_msg = trace["low_msg"]
+        return self.cached_evaluation(("trace", high_msg, low_msg), lambda messages: messages.match_trace(high_msg, low_msg))
 
     def apply_filters(self):
         """Checks CAN data for matches with filter. Adds description and colour values to the log data
-        """        
-        for row in range(len(self.log_data)):
-            #Format row into a single string without NaNs
-            test_string = self.log_data[row][3:12].sum()
-            #Clear any existing description
-            self.log_data[row][2] = ""
-            filter_level = 1
-            while filter_level>0:
-                #Create a subfilter at the current level
-                sf = [item for item in self.filter_list if item[0]==filter_level]
-                #Check each row of the dataframe against filter
-                for filter_row in range(len(sf)):
-                    filter_string = sf[filter_row][1]
-                    match = False
-                    for char_index in range(len(test_string)):
-                        if filter_string[char_index] == "?":
-                            match = True
-                            continue
-                        elif test_string[char_index] != filter_string[char_index]:
-                            match = False
-                            break
-                        else:
-                            match = True
-
-                    if match:
-                        #If there is a match append filter description to the dataframe
-                        self.log_data[row][2] += sf[filter_row][2]
-
-                        #Also add colour
-                        self.log_data[row][12] = sf[filter_row][4]
-
-                        #Set filter level to the next one
-                        filter_level = sf[filter_row][3]
-                        #Stop checking for further filters at this level
-                        break
-
-                    if filter_row == len(sf)-1:
-                        #Didn't find a match in the entire filter frame / subfilter frame
-                        filter_level = 0
+        """
+        config_hash = hash_config(self.filter_list)
+        if config_hash == self.applied_filter:
+            #Descriptions and colours are already those of this filter list
+            return
+        result = self.load_cached_result("filter", config_hash)
+        if result is None:
+            #Filters are evaluated once per distinct message and the results are looked up for each row
+            filter_key = ("filter", tuple(tuple(f) for f in self.filter_list))
+            descriptions, colours, matched = self.cached_evaluation(filter_key, self.evaluate_filter)
+            message_index = self.get_message_index()
+            #The dictionary may hold messages of other logs. Categories are only made of the messages in this one
+            used = np.flatnonzero(np.bincount(message_index, minlength=len(descriptions)) > 0)
+            description_codes = np.zeros(len(descriptions), dtype=np.int32)
+            colour_codes = np.zeros(len(colours), dtype=np.int32)
+            description_codes[used], description_categories = encode_categories(descriptions[used])
+            colour_codes[used], colour_categories = encode_categories(colours[used])
+            result = {"description_codes": description_codes[message_index],
+                      "description_categories": description_categories.astype(str),
+                      "colour_codes": colour_codes[message_index],
+                      "colour_categories": colour_categories.astype(str),
+                      "matched": matched[message_index]}
+            self.save_cached_result("filter", config_hash, result)
+
+        self.log_data.set_descriptions(result["description_codes"], result["description_categories"].astype(object))
+
+        #Colour is only replaced in rows where at least one filter matched
+        previous_categories = self.log_data.colour_categories
+        new_categories = result["colour_categories"].astype(object)
+        colour_codes, colour_categories = encode_categories(np.concatenate([previous_categories, new_categories]))
+        previous_codes = colour_codes[:len(previous_categories)][self.log_data.colour_codes]
+        new_codes = colour_codes[len(previous_categories):][result["colour_codes"]]
+        self.log_data.set_colours(np.where(result["matched"], new_codes, previous_codes), colour_categories)
+        self.applied_filter = config_hash
+        self.changed_columns += [DESCRIPTION_COLUMN, COLOUR_COLUMN]
+
+    def evaluate_filter(self, messages:MessageTable) -> tuple:
+        """Runs distinct messages through the filter list, on worker processes if there are enough of them
+
+        Returns:
+            tuple: (descriptions, colours, matched) for each distinct message, see MessageTable.evaluate_filter
+        """
+        if self.use_workers(len(messages)):
+            self.report_progress(0.7, "Applying filters on %d processes" % self.worker_count)
+            return ParallelEvaluation.evaluate_filter(messages, self.filter_list, self.worker_count)
+        return messages.evaluate_filter(CompiledFilter(self.filter_list))
+
+    def use_workers(self, rows:int) -> bool:
+        """Worker processes are only worth starting and copying data to for large logs
+        """
+        return self.worker_count > 1 and rows >= self.parallel_threshold
+
+    def load_cached_result(self, kind:str, config_hash:str) -> dict:
+        """Loads filter or trace results of the current log from the log cache, if it is enabled
+
+        Returns:
+            dict: cached arrays, or None if they are not cached
+        """
+        if self.log_cache and self.log_file_hash:
+            return self.log_cache.load_result(self.log_file_hash, kind, config_hash)
+        return None
+
+    def save_cached_result(self, kind:str, config_hash:str, arrays:dict):
+        """Saves filter or trace results of the current log to the log cache, if it is enabled
+        """
+        if self.log_cache and self.log_file_hash:
+            self.log_cache.save_result(self.log_file_hash, kind, config_hash, arrays)
+
+    def get_message_index(self) -> np.ndarray:
+        """Returns the index into message_dictionary of the message on each row of the loaded log, adding the distinct
+        messages of the log to the dictionary if necessary
+        """
+        if self.message_index is None:
+            messages = MessageTable(*self.log_data.packed_messages(), self.log_data.message_string)
+            self.message_index = self.message_dictionary.add(messages).astype(np.int32)[messages.index]
+        return self.message_index
+
+    def get_log_index(self) -> LogIndex:
+        """Returns the search index of the loaded log by message ID, description word and trace transition, building it if necessary
+        """
+        if self.log_index is None:
+            self.log_index = LogIndex(self.log_data, self.column_names[self.initial_column_count:])
+        return self.log_index
+
+    def search(self, query:str) -> np.ndarray:
+        """Finds rows of the loaded log matching a query, see LogIndex.search
+
+        Args:
+            query (str): e.g. "0011FF10", "id:0011FF??", "sheet exit" or "trace:S5 Ready+"
+
+        Returns:
+            np.ndarray: sorted row numbers
+        """
+        return self.get_log_index().search(query)
+
+    def find_next(self, query:str, row:int = -1, backwards:bool = False) -> int:
+        """Finds the next (or previous) row after a row that matches a query, wrapping around at the end of the log
+
+        Args:
+            query (str): see search
+            row (int, optional): row to start from. Defaults to -1 (the top of the log).
+            backwards (bool, optional): find the previous match instead. Defaults to False.
+
+        Returns:
+            int: row of the match, or -1 if nothing matches
+        """
+        return self.get_log_index().next_match(self.search(query), row, backwards)
+
+    def set_row_filter(self, row_filter):
+        """Chooses the rows of the log shown in the table
+
+        Args:
+            row_filter: dict of predicates, see RowFilter.select_rows, or text such as "-id:00010010 desc:ready", see
+                RowFilter.parse_row_filter. Empty to show every row
+        """
+        if isinstance(row_filter, str):
+            row_filter = parse_row_filter(row_filter)
+        elif row_filter:
+            check_row_filter(row_filter)
+        self.row_filter = row_filter
+        self.visible_rows = None
+
+    def get_visible_rows(self) -> np.ndarray:
+        """Returns the rows of the annotated log chosen by the row filter, selecting them if necessary
+
+        Returns:
+            np.ndarray: sorted row numbers, or None if there is no row filter and every row is shown
+        """
+        if not self.row_filter:
+            return None
+        if self.visible_rows is None:
+            self.visible_rows = select_rows(self.log_data, self.column_names[self.initial_column_count:], self.row_filter)
+        return self.visible_rows
+
+    def get_id_statistics(self) -> dict:
+        """Returns timing statistics of each message ID in the loaded log: count, rate, min/mean/median/max period,
+        jitter percentiles and the longest gap. See BusStatistics.id_statistics
+
+        Returns:
+            dict: arrays with one value per ID, sorted by ID, along with "description" of the first message of each ID
+        """
+        log = self.log_data
+        if self.timing_statistics is None:
+            #IDs of irregular rows were only partially decoded
+            irregular_rows = np.fromiter(log.irregular, dtype=np.int64, count=len(log.irregular))
+            self.timing_statistics = id_statistics(log.time, log.message_id, irregular_rows)
+        #Descriptions change with the filter, so they aren't kept with the statistics
+        statistics = dict(self.timing_statistics)
+        statistics["description"] = log.description_categories[log.description_codes[statistics["first_row"]]]
+        return statistics
+
+    def get_bus_load(self, window:float = 1000.0, bitrate:float = None) -> dict:
+        """Returns the message rate and, if the bitrate is known, the bus load of the loaded log over time
+
+        Args:
+            window (float, optional): width of the windows messages are counted in, in ms. Defaults to 1000.0.
+            bitrate (float, optional): bitrate of the bus in bit/s. Defaults to None.
+
+        Returns:
+            dict: "time", "frames_per_second" and "load" series, see BusStatistics.bus_load
+        """
+        log = self.log_data
+        return bus_load(log.time, log.message_id, log.dlc, window, bitrate)
+
+    def get_trace_edges(self, edge_definition:str) -> np.ndarray:
+        """Returns the rows where a trace of the annotated log changes value
+
+        Args:
+            edge_definition (str): trace name followed by "+" or "rising", "-" or "falling", or nothing for any change
+
+        Returns:
+            np.ndarray: sorted row numbers
+        """
+        trace, edge = parse_edge(edge_definition)
+        trace_names = [normalize_trace_name(name) for name in self.column_names[self.initial_column_count:]]
+        if normalize_trace_name(trace) not in trace_names:
+            raise ValueError("Unknown trace %s" % trace)
+        return trace_edges(self.log_data.trace_data[:,trace_names.index(normalize_trace_name(trace))], edge)
+
+    def measure_latency(self, measurement, max_outliers:int = 20) -> dict:
+        """Measures the latency from every start edge of a measurement to the end edge answering it in the annotated log
+
+        Args:
+            measurement: "start -> end" string such as "S5 Ready+ -> C0 Sheet exit+" or a definition, see EdgeLatency.load_measurement
+            max_outliers (int, optional): number of outliers listed, longest first. Defaults to 20.
+
+        Returns:
+            dict: "name" and "limit" of the measurement along with the distribution and outliers, see EdgeLatency.measure_latency
+        """
+        measurement = load_measurement(measurement)
+        result = measure_latency(self.log_data.time, self.get_trace_edges(measurement["start"]), self.get_trace_edges(measurement["end"]),
+                                 measurement["limit"], max_outliers)
+        result["name"], result["limit"] = measurement["name"], measurement["limit"]
+        return result
+
+    def cached_evaluation(self, key:tuple, evaluate:callable) -> tuple:
+        """Returns a result evaluated on the distinct messages in message_dictionary, which include those of the loaded log.
+        Results are cached in the dictionary and only evaluated for messages that haven't been evaluated before
+
+        Args:
+            key (tuple): a hashable description of the inputs of the evaluation
+            evaluate (callable): function taking a MessageTable and returning a tuple of arrays with one value per distinct message
+
+        Returns:
+            tuple: arrays with one value per message in message_dictionary, to be looked up through get_message_index
+        """
+        self.get_message_index()
+        return self.message_dictionary.evaluate(key, evaluate)
 
     def set_status_output_destination(self, status_function:callable):
         self.status_output = status_function
@@ -311,4 +907,22 @@ class DataHandler():
         if self.status_output:
             self.status_output(status_text)
         else:
-            print(status_text)
\ No newline at end of file
+            print(status_text)
+
+    def set_progress_output_destination(self, progress_function:callable):
+        """Sets a function that receives progress of loading as (fraction, text)
+        """
+        self.progress_output = progress_function
+
+    def report_progress(self, fraction:float, progress_text:str):
+        """Reports progress of loading and stops it by raising LoadCancelled if cancel_loading was called
+        """
+        if self.cancel_requested:
+            raise LoadCancelled()
+        if self.progress_output:
+            self.progress_output(fraction, progress_text)
+
+    def cancel_loading(self):
+        """Requests loading to stop. Can be called from another thread, load_file raises LoadCancelled at the next progress report
+        """
+        self.cancel_requested = True
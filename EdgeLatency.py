@@ -0,0 +1,132 @@
+import re
+import numpy as np
+
+#Words that may follow a trace name instead of "+" or "-"
+EDGE_WORDS = {"rising": "rising", "falling": "falling", "any": "any"}
+
+
+def is_measurement_definition(entry:dict) -> bool:
+    """Entries of a trace configuration with a start and an end edge are latency measurements
+    """
+    return "start" in entry and "end" in entry
+
+
+def parse_edge(text:str) -> tuple:
+    """Splits an edge such as "S5 Ready+", "S5 Ready rising" or "S5 Ready" into the trace name and the edge
+
+    Returns:
+        tuple: (trace name, "rising", "falling" or "any")
+    """
+    text = text.strip()
+    if text[-1:] in ("+", "-"):
+        return text[:-1].strip(), "rising" if text[-1] == "+" else "falling"
+    name, _, last_word = text.rpartition(" ")
+    if name and last_word.lower() in EDGE_WORDS:
+        return name.strip(), EDGE_WORDS[last_word.lower()]
+    return text, "any"
+
+
+def load_measurement(entry) -> dict:
+    """Checks a measurement definition and fills in defaults
+
+    Args:
+        entry: "start -> end" string, e.g. "S5 Ready rising -> C0 Sheet exit rising", or a dict with "start", "end" and
+            optionally "name" and "limit" (latency in ms above which pairs are reported as outliers)
+
+    Returns:
+        dict: "name", "start", "end" and "limit" (None to report pairs above the 99th percentile)
+    """
+    if isinstance(entry, str):
+        edges = re.split(r"->|→", entry)
+        if len(edges) != 2:
+            raise ValueError("Measurement %s must be written as start -> end" % entry)
+        entry = {"start": edges[0].strip(), "end": edges[1].strip()}
+    if not is_measurement_definition(entry):
+        raise ValueError("Measurement %s needs a start and an end edge" % entry.get("name", ""))
+    for edge in ("start", "end"):
+        if not parse_edge(entry[edge])[0]:
+            raise ValueError("Measurement %s has no trace for its %s edge" % (entry.get("name", ""), edge))
+    measurement = {"name": "%s -> %s" % (entry["start"], entry["end"]), "limit": None}
+    measurement.update(entry)
+    return measurement
+
+
+def trace_edges(values:np.ndarray, edge:str = "any") -> np.ndarray:
+    """Finds rows where a trace column changes value
+
+    Args:
+        values (np.ndarray): value of the trace on each row
+        edge (str, optional): "rising", "falling" or "any". Defaults to "any".
+
+    Returns:
+        np.ndarray: sorted row numbers
+    """
+    step = np.diff(values.astype(np.int8))
+    if edge == "rising":
+        return np.flatnonzero(step > 0) + 1
+    if edge == "falling":
+        return np.flatnonzero(step < 0) + 1
+    return np.flatnonzero(step) + 1
+
+
+def pair_edges(start_rows:np.ndarray, end_rows:np.ndarray) -> tuple:
+    """Pairs each start edge with the first end edge on the same or a later row. A start edge followed by another
+    start edge before any end edge is left unpaired, so every end edge answers at most one start edge
+
+    Args:
+        start_rows (np.ndarray): sorted rows of start edges
+        end_rows (np.ndarray): sorted rows of end edges
+
+    Returns:
+        tuple: (paired, end) where paired marks start edges that have an end edge and end holds its row
+    """
+    next_end = np.searchsorted(end_rows, start_rows, side="left")
+    paired = next_end < len(end_rows)
+    end = np.full(len(start_rows), -1, dtype=np.int64)
+    end[paired] = end_rows[next_end[paired]]
+    next_start = np.append(start_rows[1:], np.iinfo(np.int64).max)
+    paired &= end < next_start
+    return paired, end
+
+
+def measure_latency(time:np.ndarray, start_rows:np.ndarray, end_rows:np.ndarray, limit:float = None, max_outliers:int = 20) -> dict:
+    """Latency from every start edge to the end edge answering it, see pair_edges
+
+    Args:
+        time (np.ndarray): time of each row in ms
+        start_rows (np.ndarray): sorted rows of start edges
+        end_rows (np.ndarray): sorted rows of end edges
+        limit (float, optional): latency in ms above which pairs are outliers. Defaults to None (above the 99th percentile).
+        max_outliers (int, optional): number of outliers listed, longest first. Defaults to 20.
+
+    Returns:
+        dict: "count", "min", "median", "mean", "p99", "max" of the latencies in ms (NaN without pairs),
+            "latency", "start_row" and "end_row" of every pair, "unpaired_rows" of start edges without an end edge,
+            "outlier_count" and "outliers" as a dict of "start_row", "end_row" and "latency" arrays
+    """
+    start_rows = np.asarray(start_rows, dtype=np.int64)
+    end_rows = np.asarray(end_rows, dtype=np.int64)
+    paired, end = pair_edges(start_rows, end_rows)
+    latency = time[end[paired]] - time[start_rows[paired]]
+    #Rows without a time can't be measured
+    measured = np.isfinite(latency)
+    result = {"latency": latency[measured],
+              "start_row": start_rows[paired][measured],
+              "end_row": end[paired][measured],
+              "unpaired_rows": start_rows[~paired]}
+    latency = result["latency"]
+    result["count"] = len(latency)
+    if len(latency):
+        low, median, p99, high = np.percentile(latency, (0, 50, 99, 100))
+        result.update({"min": low, "median": median, "mean": latency.mean(), "p99": p99, "max": high})
+        outlier_rows = np.flatnonzero(latency > (p99 if limit is None else limit))
+    else:
+        result.update({"min": np.nan, "median": np.nan, "mean": np.nan, "p99": np.nan, "max": np.nan})
+        outlier_rows = np.zeros(0, dtype=np.int64)
+    result["outlier_count"] = len(outlier_rows)
+    #Longest first, earliest first among equal latencies
+    outlier_rows = outlier_rows[np.argsort(-latency[outlier_rows], kind="stable")][:max_outliers]
+    result["outliers"] = {"start_row": result["start_row"][outlier_rows],
+                          "end_row": result["end_row"][outlier_rows],
+                          "latency": latency[outlier_rows]}
+    return result
@@ -0,0 +1,511 @@
+import threading
+import numpy as np
+from collections import OrderedDict
+
+#Lookup tables converting ASCII codes of hex digits to their nibble value. Anything else maps to 255 (invalid)
+#CanView writes hex in upper case, so filter and trace patterns are only matched against upper case digits
+HEX_UPPER_LOOKUP = np.full(256, 255, dtype=np.uint8)
+HEX_LOOKUP = np.full(256, 255, dtype=np.uint8)
+for _i, _c in enumerate("0123456789ABCDEF"):
+    HEX_UPPER_LOOKUP[ord(_c)] = _i
+    HEX_LOOKUP[ord(_c)] = _i
+    HEX_LOOKUP[ord(_c.lower())] = _i
+
+#Number of hex characters in a fully populated message: 8 for the ID and 2 for each of the 8 data bytes
+MESSAGE_CHARS = 24
+
+#Masks of the valid bits in the packed words for each DLC
+HI_MASK_BY_DLC = np.array([0xFFFFFFFF00000000 | (0xFFFFFFFF00000000 >> (8*min(dlc, 4)) & 0xFFFFFFFF) for dlc in range(9)], dtype=np.uint64)
+LO_MASK_BY_DLC = np.array([(0xFFFFFFFF00000000 >> (8*max(dlc - 4, 0))) & 0xFFFFFFFF for dlc in range(9)], dtype=np.uint64)
+
+
+def decode_hex_chars(codes:np.ndarray, upper_case_only:bool = False) -> np.ndarray:
+    """Converts an array of character codes to nibble values
+
+    Args:
+        codes (np.ndarray): integer array of character codes (e.g. a view of a unicode or bytes array)
+        upper_case_only (bool, optional): treat lower case hex digits as invalid. Defaults to False.
+
+    Returns:
+        np.ndarray: uint8 array of the same shape with nibble values, 255 where the character is not a hex digit
+    """
+    codes = np.asarray(codes)
+    nibbles = np.full(codes.shape, 255, dtype=np.uint8)
+    in_range = codes < 256
+    nibbles[in_range] = (HEX_UPPER_LOOKUP if upper_case_only else HEX_LOOKUP)[codes[in_range]]
+    return nibbles
+
+
+def pack_message_words(message_id:np.ndarray, payload:np.ndarray, dlc:np.ndarray) -> tuple:
+    """Packs message ID and data bytes into two 64 bit words along with masks of the valid bits
+
+    Args:
+        message_id (np.ndarray): uint32 message IDs
+        payload (np.ndarray): uint8 matrix of data bytes D0..D7, one row per message
+        dlc (np.ndarray): number of valid data bytes in each message
+
+    Returns:
+        tuple: (hi, lo, hi_mask, lo_mask, nchars) where hi holds ID + D0..D3, lo holds D4..D7 and nchars is the length of the message as a hex string
+    """
+    rows = len(message_id)
+    dlc = np.minimum(np.asarray(dlc, dtype=np.int64), 8)
+    #Bytes past the DLC are zeroed so they don't take part in comparisons
+    payload = np.where(np.arange(8) < dlc[:,None], np.asarray(payload, dtype=np.uint8).reshape(rows, 8), 0).astype(np.uint8)
+    hi = (np.asarray(message_id, dtype=np.uint64) << np.uint64(32)) | np.ascontiguousarray(payload[:,:4]).view(">u4").reshape(rows).astype(np.uint64)
+    lo = np.ascontiguousarray(payload[:,4:]).view(">u4").reshape(rows).astype(np.uint64)
+    hi_mask = HI_MASK_BY_DLC[dlc]
+    lo_mask = LO_MASK_BY_DLC[dlc]
+    nchars = 8 + 2*dlc
+    return hi, lo, hi_mask, lo_mask, nchars
+
+
+def decode_message_strings(id_column:np.ndarray, byte_columns:np.ndarray) -> tuple:
+    """Decodes ID and data byte columns holding hex strings (as loaded from a CanView log) into typed arrays
+
+    Args:
+        id_column (np.ndarray): message IDs as hex strings
+        byte_columns (np.ndarray): matrix of data bytes D0..D7 as hex strings, empty string where a byte is absent
+
+    Returns:
+        tuple: (message_id, payload, dlc, regular) where regular is False for rows with IDs that are not 8 upper case
+            hex digits or with malformed bytes. Such rows can't be represented exactly by the typed arrays
+    """
+    rows = len(id_column)
+    ids = np.asarray(id_column).astype(str).reshape(rows)
+    data = np.asarray(byte_columns).astype(str).reshape(rows, 8)
+
+    id_valid = np.char.str_len(ids) == 8
+    ids = np.ascontiguousarray(ids.astype("U8"))
+    id_nibbles = decode_hex_chars(ids.view(np.uint32).reshape(rows, 8), True).astype(np.uint32)
+    id_valid &= np.all(id_nibbles < 16, axis=1)
+    message_id = np.zeros(rows, dtype=np.uint32)
+    for i in range(8):
+        message_id = (message_id << np.uint32(4)) | (id_nibbles[:,i] & np.uint32(15))
+
+    byte_lengths = np.char.str_len(data)
+    dlc = np.sum(byte_lengths == 2, axis=1).astype(np.uint8)
+    contiguous = np.all((byte_lengths == 2) == (np.arange(8) < dlc[:,None]), axis=1)
+    contiguous &= np.all((byte_lengths == 0) | (byte_lengths == 2), axis=1)
+    data = np.ascontiguousarray(data.astype("U2"))
+    byte_nibbles = decode_hex_chars(data.view(np.uint32).reshape(rows, 8, 2), True)
+    bytes_valid = np.all((byte_nibbles < 16) | (byte_lengths[:,:,None] == 0), axis=(1, 2))
+    payload = (((byte_nibbles[:,:,0] & 15) << 4) | (byte_nibbles[:,:,1] & 15)).astype(np.uint8)
+
+    regular = id_valid & contiguous & bytes_valid
+    return message_id, payload, dlc, regular
+
+
+def pack_message_strings(id_column:np.ndarray, byte_columns:np.ndarray) -> tuple:
+    """Packs ID and data byte columns holding hex strings into 64 bit words
+
+    Returns:
+        tuple: (hi, lo, hi_mask, lo_mask, nchars, packable) as returned by pack_message_words plus a mask of rows
+            that could be packed (see decode_message_strings)
+    """
+    message_id, payload, dlc, packable = decode_message_strings(id_column, byte_columns)
+    return pack_message_words(message_id, payload, dlc) + (packable,)
+
+
+def compile_pattern(pattern:str) -> tuple:
+    """Compiles a hex pattern with "?" wildcards into value and mask words
+
+    Args:
+        pattern (str): pattern covering ID and data bytes, one character per nibble
+
+    Returns:
+        tuple: (hi_value, hi_mask, lo_value, lo_mask, limit) where limit is the longest message (in hex characters)
+            the pattern can match. Characters that are neither a hex digit nor a wildcard can never be matched
+    """
+    hi_value = hi_mask = lo_value = lo_mask = 0
+    limit = len(pattern)
+    for position, char in enumerate(pattern[:MESSAGE_CHARS]):
+        if char == "?":
+            continue
+        nibble = HEX_UPPER_LOOKUP[ord(char)] if ord(char) < 256 else 255
+        if nibble > 15:
+            limit = position
+            break
+        if position < 16:
+            shift = 60 - 4*position
+            hi_value |= int(nibble) << shift
+            hi_mask |= 0xF << shift
+        else:
+            shift = 28 - 4*(position - 16)
+            lo_value |= int(nibble) << shift
+            lo_mask |= 0xF << shift
+    return hi_value, hi_mask, lo_value, lo_mask, limit
+
+
+def match_pattern_string(test_string:str, pattern:str) -> bool:
+    """Character by character comparison of a message string against a pattern with "?" wildcards.
+    Used for messages that can't be packed into words
+
+    Args:
+        test_string (str): message as a string of hex characters
+        pattern (str): pattern to check against
+
+    Returns:
+        bool: True if every character of test_string matches the pattern
+    """
+    if len(test_string) == 0 or len(test_string) > len(pattern):
+        return False
+    for test_char, pattern_char in zip(test_string, pattern):
+        if pattern_char != "?" and test_char != pattern_char:
+            return False
+    return True
+
+
+class FilterLevel():
+    def __init__(self, patterns:list[str], filter_indices:list[int]):
+        """Value/mask table of all the filters defined at a single filter level
+
+        Args:
+            patterns (list[str]): filter patterns in the order they appear in the filter file
+            filter_indices (list[int]): index of each pattern in the compiled filter
+        """
+        compiled = [compile_pattern(pattern) for pattern in patterns]
+        self.hi_value = np.array([c[0] for c in compiled], dtype=np.uint64)
+        self.hi_mask = np.array([c[1] for c in compiled], dtype=np.uint64)
+        self.lo_value = np.array([c[2] for c in compiled], dtype=np.uint64)
+        self.lo_mask = np.array([c[3] for c in compiled], dtype=np.uint64)
+        self.limit = np.array([c[4] for c in compiled], dtype=np.int64)
+        self.filter_indices = np.array(filter_indices, dtype=np.int64)
+        #Keep each batch of the (messages x filters) comparison around a million elements
+        self.batch_size = max(1, (1 << 20) // max(1, len(patterns)))
+
+    def first_match(self, hi:np.ndarray, lo:np.ndarray, hi_mask:np.ndarray, lo_mask:np.ndarray, nchars:np.ndarray) -> np.ndarray:
+        """Finds the first filter at this level that matches each of the messages
+
+        Returns:
+            np.ndarray: index into the compiled filter for each message, -1 where nothing matched
+        """
+        result = np.full(len(hi), -1, dtype=np.int64)
+        for start in range(0, len(hi), self.batch_size):
+            batch = slice(start, start + self.batch_size)
+            match = ((hi[batch,None] ^ self.hi_value) & self.hi_mask & hi_mask[batch,None]) == 0
+            match &= ((lo[batch,None] ^ self.lo_value) & self.lo_mask & lo_mask[batch,None]) == 0
+            match &= nchars[batch,None] <= self.limit
+            first = match.argmax(axis=1)
+            result[batch] = np.where(match[np.arange(len(first)),first], self.filter_indices[first], -1)
+        return result
+
+
+class CompiledFilter():
+    def __init__(self, filter_list:list):
+        """A CanView filter compiled into value/mask tables for each filter level, so that messages can be matched in batches
+
+        Args:
+            filter_list (list): filter list as built by DataHandler.load_canview_filter
+                                [Level, Filter, Description, Subfilter, Colour]
+        """
+        self.descriptions = np.array([f[2] for f in filter_list] + [""], dtype=object)
+        self.colours = np.array([f[4] for f in filter_list] + [""], dtype=object)
+        self.links = np.array([f[3] for f in filter_list] + [0], dtype=np.int64)
+        self.patterns = [f[1] for f in filter_list]
+
+        #Group filters by level while preserving their order in the file, so the first match wins
+        level_members = dict()
+        for index, f in enumerate(filter_list):
+            level_members.setdefault(f[0], []).append(index)
+        self.levels = {level: FilterLevel([self.patterns[i] for i in members], members) for level, members in level_members.items()}
+
+    def evaluate(self, hi:np.ndarray, lo:np.ndarray, hi_mask:np.ndarray, lo_mask:np.ndarray, nchars:np.ndarray) -> tuple:
+        """Runs packed messages through the filter levels starting at level 1 and following subfilter links
+
+        Returns:
+            tuple: (descriptions, colours, matched). Descriptions are concatenated along the matching path, colour is
+                that of the last matching filter and matched is False for messages that didn't match anything
+        """
+        rows = len(hi)
+        descriptions = np.full(rows, "", dtype=object)
+        colours = np.full(rows, "", dtype=object)
+        matched = np.zeros(rows, dtype=bool)
+
+        active = np.flatnonzero(nchars > 0)
+        active_level = np.ones(len(active), dtype=np.int64)
+        #A path can't visit the same level twice without looping forever, so it is never longer than the level count
+        for _ in range(len(self.levels)):
+            if len(active) == 0:
+                break
+            next_active = []
+            next_level = []
+            for level in np.unique(active_level):
+                filter_level = self.levels.get(int(level))
+                if filter_level is None:
+                    continue
+                level_rows = active[active_level == level]
+                found = filter_level.first_match(hi[level_rows], lo[level_rows], hi_mask[level_rows], lo_mask[level_rows], nchars[level_rows])
+                hit = found >= 0
+                level_rows = level_rows[hit]
+                found = found[hit]
+                descriptions[level_rows] = descriptions[level_rows] + self.descriptions[found]
+                colours[level_rows] = self.colours[found]
+                matched[level_rows] = True
+                links = self.links[found]
+                next_active.append(level_rows[links > 0])
+                next_level.append(links[links > 0])
+            active = np.concatenate(next_active) if next_active else np.empty(0, dtype=np.int64)
+            active_level = np.concatenate(next_level) if next_level else np.empty(0, dtype=np.int64)
+
+        return descriptions, colours, matched
+
+    def evaluate_string(self, test_string:str) -> tuple:
+        """Runs a single message string through the filter levels. Used for messages that can't be packed
+
+        Returns:
+            tuple: (description, colour, matched)
+        """
+        description = ""
+        colour = ""
+        matched = False
+        filter_level = 1
+        visited = set()
+        while filter_level > 0 and filter_level in self.levels and filter_level not in visited:
+            visited.add(filter_level)
+            next_level = 0
+            for index in self.levels[filter_level].filter_indices:
+                if match_pattern_string(test_string, self.patterns[index]):
+                    description += self.descriptions[index]
+                    colour = self.colours[index]
+                    matched = True
+                    next_level = self.links[index]
+                    break
+            filter_level = next_level
+        return description, colour, matched
+
+
+class MessageTable():
+    def __init__(self, hi:np.ndarray, lo:np.ndarray, hi_mask:np.ndarray, lo_mask:np.ndarray, nchars:np.ndarray, packable:np.ndarray, row_string:callable):
+        """Table of the distinct messages (ID + data bytes) found in a log. Filters and trace messages are evaluated
+        once per distinct message and the results are scattered back to log rows through the index
+
+        Args:
+            hi, lo, hi_mask, lo_mask, nchars, packable (np.ndarray): packed messages as returned by pack_message_strings
+            row_string (callable): function returning the message string of a log row. Used for rows that can't be packed
+        """
+        #Only the lower 32 bits of lo are used, so the message length fits in the upper half
+        hi_key = np.array(hi, dtype=np.uint64)
+        lo_key = np.asarray(lo, dtype=np.uint64) | (np.asarray(nchars).astype(np.uint64) << np.uint64(32))
+        #Rows that couldn't be packed are never merged with each other, key them by row number instead
+        unpackable_rows = np.flatnonzero(~packable)
+        hi_key[unpackable_rows] = unpackable_rows.astype(np.uint64)
+        lo_key[unpackable_rows] = np.iinfo(np.uint64).max
+
+        order = np.lexsort((lo_key, hi_key))
+        new_message = np.ones(len(order), dtype=bool)
+        new_message[1:] = (np.diff(hi_key[order]) != 0) | (np.diff(lo_key[order]) != 0)
+        first_rows = order[new_message]
+        index = np.empty(len(order), dtype=np.int64)
+        index[order] = np.cumsum(new_message) - 1
+
+        #Index of the distinct message for every log row
+        self.index = index.reshape(-1)
+        self.hi = hi[first_rows]
+        self.lo = lo[first_rows]
+        self.hi_mask = hi_mask[first_rows]
+        self.lo_mask = lo_mask[first_rows]
+        self.nchars = np.asarray(nchars)[first_rows]
+        self.packable = packable[first_rows]
+        self.strings = {int(i): row_string(first_rows[i]) for i in np.flatnonzero(~self.packable)}
+
+    def __len__(self) -> int:
+        return len(self.hi)
+
+    def evaluate_filter(self, compiled_filter:CompiledFilter) -> tuple:
+        """Runs every distinct message through a compiled filter
+
+        Returns:
+            tuple: (descriptions, colours, matched) for each distinct message
+        """
+        descriptions, colours, matched = compiled_filter.evaluate(self.hi, self.lo, self.hi_mask, self.lo_mask, self.nchars)
+        for i, test_string in self.strings.items():
+            descriptions[i], colours[i], matched[i] = compiled_filter.evaluate_string(test_string)
+        return descriptions, colours, matched
+
+    def match_trace_message(self, message:str, prefix_length:int) -> np.ndarray:
+        """Checks which distinct messages start with a trace message. Mirrors comparing message_string[:prefix_length] == message
+
+        Args:
+            message (str): trace message as a string of hex characters
+            prefix_length (int): number of leading characters of each message that are compared
+
+        Returns:
+            np.ndarray: bool for each distinct message
+        """
+        result = np.minimum(self.nchars, prefix_length) == len(message)
+        hi_value, hi_mask, lo_value, lo_mask, limit = compile_pattern(message)
+        if "?" in message or limit < len(message) or len(message) > MESSAGE_CHARS:
+            result[:] = False
+        else:
+            result &= ((self.hi ^ np.uint64(hi_value)) & np.uint64(hi_mask)) == 0
+            result &= ((self.lo ^ np.uint64(lo_value)) & np.uint64(lo_mask)) == 0
+        for i, test_string in self.strings.items():
+            result[i] = test_string[:prefix_length] == message
+        return result
+
+    def match_trace(self, high_msg:str, low_msg:str) -> tuple:
+        """Checks which distinct messages set or reset a trace
+
+        Args:
+            high_msg (str): message that sets the trace
+            low_msg (str): message that resets the trace, or "next" if any following message resets it
+
+        Returns:
+            tuple: (high_match, low_match) bool for each distinct message
+        """
+        high_match = self.match_trace_message(high_msg, len(high_msg))
+        if low_msg == "next":
+            low_match = np.zeros(len(self), dtype=bool)
+        else:
+            #Low message is compared against the same number of characters as the high message
+            low_match = self.match_trace_message(low_msg, len(high_msg))
+        return high_match, low_match
+
+
+class MessageDictionary():
+    def __init__(self, cache_size:int = 32):
+        """Distinct messages of any number of logs. Each log adds the distinct messages of its MessageTable and refers
+        to them by their index here, so that filters and trace messages are evaluated once per message across all the
+        logs sharing the dictionary. Results are cached and only evaluated for messages added since. Logs can be added
+        and evaluated from several threads
+
+        Args:
+            cache_size (int, optional): number of results kept, the least recently used ones are dropped first. Defaults to 32.
+        """
+        self.hi = np.zeros(0, dtype=np.uint64)
+        self.lo = np.zeros(0, dtype=np.uint64)
+        self.hi_mask = np.zeros(0, dtype=np.uint64)
+        self.lo_mask = np.zeros(0, dtype=np.uint64)
+        self.nchars = np.zeros(0, dtype=np.int64)
+        self.packable = np.zeros(0, dtype=bool)
+        #Messages that can't be packed are told apart by their string
+        self.strings = dict()
+        self.string_indices = dict()
+        self.evaluations = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.hi)
+
+    def add(self, messages:MessageTable) -> np.ndarray:
+        """Adds the distinct messages of a log that are not in the dictionary yet
+
+        Args:
+            messages (MessageTable): distinct messages of a log
+
+        Returns:
+            np.ndarray: index in the dictionary of each of the distinct messages
+        """
+        with self.lock:
+            indices = np.empty(len(messages), dtype=np.int64)
+            #Sort known and new packed messages together. A new message that is known sorts right after its known copy
+            known = np.flatnonzero(self.packable)
+            added = np.flatnonzero(messages.packable)
+            hi_key = np.concatenate([self.hi[known], messages.hi[added]])
+            lo_key = np.concatenate([self.lo[known] | (self.nchars[known].astype(np.uint64) << np.uint64(32)),
+                                     messages.lo[added] | (np.asarray(messages.nchars[added]).astype(np.uint64) << np.uint64(32))])
+            order = np.lexsort((lo_key, hi_key))
+            duplicate = np.zeros(len(order), dtype=bool)
+            duplicate[1:] = (np.diff(hi_key[order]) == 0) & (np.diff(lo_key[order]) == 0)
+            is_added = order >= len(known)
+            found = duplicate & is_added
+            indices[added[order[found] - len(known)]] = known[order[np.flatnonzero(found) - 1]]
+            new_messages = list(np.sort(added[order[~duplicate & is_added] - len(known)]))
+
+            #A log keeps every message it can't pack apart, even if their strings are the same
+            new_strings = dict()
+            repeated_strings = []
+            for i, test_string in messages.strings.items():
+                if test_string in self.string_indices:
+                    indices[i] = self.string_indices[test_string]
+                elif test_string in new_strings:
+                    repeated_strings.append((i, new_strings[test_string]))
+                else:
+                    new_strings[test_string] = i
+                    new_messages.append(i)
+
+            new_messages = np.array(new_messages, dtype=np.int64)
+            indices[new_messages] = len(self) + np.arange(len(new_messages))
+            for i, first in repeated_strings:
+                indices[i] = indices[first]
+            for i in new_messages[~messages.packable[new_messages]]:
+                self.strings[int(indices[i])] = messages.strings[int(i)]
+                self.string_indices[messages.strings[int(i)]] = int(indices[i])
+            self.hi = np.concatenate([self.hi, messages.hi[new_messages]])
+            self.lo = np.concatenate([self.lo, messages.lo[new_messages]])
+            self.hi_mask = np.concatenate([self.hi_mask, messages.hi_mask[new_messages]])
+            self.lo_mask = np.concatenate([self.lo_mask, messages.lo_mask[new_messages]])
+            self.nchars = np.concatenate([self.nchars, np.asarray(messages.nchars)[new_messages]])
+            self.packable = np.concatenate([self.packable, messages.packable[new_messages]])
+        return indices
+
+    def evaluate(self, key:tuple, evaluate:callable) -> tuple:
+        """Returns a result for every message in the dictionary, evaluating it only for messages it hasn't been evaluated on
+
+        Args:
+            key (tuple): a hashable description of the inputs of the evaluation
+            evaluate (callable): function taking a MessageTable and returning a tuple of arrays with one value per
+                distinct message of the table, e.g. MessageTable.evaluate_filter
+
+        Returns:
+            tuple: the arrays returned by evaluate, with one value per message in the dictionary
+        """
+        with self.lock:
+            cached = self.evaluations.get(key)
+            evaluated = len(cached[0]) if cached is not None else 0
+            if evaluated < len(self):
+                start = evaluated
+                messages = MessageTable(self.hi[start:], self.lo[start:], self.hi_mask[start:], self.lo_mask[start:], self.nchars[start:],
+                                        self.packable[start:], lambda row: self.strings[start + int(row)])
+                result = tuple(values[messages.index] for values in evaluate(messages))
+                if cached is not None:
+                    result = tuple(np.concatenate([old, new]) for old, new in zip(cached, result))
+                self.evaluations[key] = result
+                while len(self.evaluations) > self.cache_size:
+                    self.evaluations.popitem(last=False)
+            self.evaluations.move_to_end(key)
+            return self.evaluations[key]
+
+
+def evaluate_trace_states(high_match:np.ndarray, low_match:np.ndarray, pulse:bool, initial_value:int = 0) -> np.ndarray:
+    """Evaluates the high/low state machine of a trace over the whole log at once
+
+    A row matching the high message sets the trace if it was low. Otherwise a row matching the low message resets it
+    and any other row keeps the previous value. In pulse mode (low message "next") the trace drops back to low on the
+    row after the one that set it.
+
+    Args:
+        high_match (np.ndarray): bool for each row that matches the high message
+        low_match (np.ndarray): bool for each row that matches the low message
+        pulse (bool): True if the trace is reset by the next message
+        initial_value (int, optional): value of the trace on the row before the first one, e.g. the last value of the
+            previous block when a log is evaluated in blocks. Defaults to 0.
+
+    Returns:
+        np.ndarray: int8 trace value for each row
+    """
+    if initial_value:
+        #A high trace behaves exactly as if the row before had been a lone high message
+        high_match = np.concatenate([[True], high_match])
+        low_match = np.concatenate([[False], low_match])
+        return evaluate_trace_states(high_match, low_match, pulse)[1:]
+    rows = np.arange(len(high_match))
+    if pulse:
+        #A run of consecutive high rows alternates 1, 0, 1... because a high row only sets the trace if it was low
+        run_start = np.maximum.accumulate(np.where(high_match, 0, rows + 1))
+        return (high_match & ((rows - run_start) % 2 == 0)).astype(np.int8)
+
+    #High only always ends up high, low only always ends up low and a row matching both toggles the trace
+    set_event = high_match & ~low_match
+    reset_event = low_match & ~high_match
+    toggle_event = high_match & low_match
+
+    #Forward fill the value of the latest set/reset event and flip it for every toggle since then
+    last_event = np.maximum.accumulate(np.where(set_event | reset_event, rows, -1))
+    has_event = last_event >= 0
+    last_event = np.where(has_event, last_event, 0)
+    value = np.where(has_event, set_event[last_event], False)
+    toggles = np.cumsum(toggle_event)
+    toggles_since_event = toggles - np.where(has_event, toggles[last_event], 0)
+    return (value ^ (toggles_since_event % 2 == 1)).astype(np.int8)
@@ -0,0 +1,354 @@
+import os
+import threading
+import time
+import numpy as np
+from FilterEngine import CompiledFilter, MessageTable, evaluate_trace_states
+from CanViewReader import CanViewReader, accumulate_time
+from LogStore import COLOUR_COLUMN, DESCRIPTION_COLUMN, LogStore
+
+
+class CanViewLogTail():
+    def __init__(self, filename:str, max_read_size:int = 1 << 20):
+        """Follows a CanView log that is still being written, returning the lines appended since the last poll.
+        Waits for the header to be complete before returning anything and starts over if the file is truncated
+
+        Args:
+            filename (str): path to the log
+            max_read_size (int, optional): maximum number of bytes read per poll. Defaults to 1 MB.
+        """
+        self.filename = filename
+        self.max_read_size = max_read_size
+        self.reader = CanViewReader(filename)
+        self.log_file = None
+        #Bytes of a line that hasn't been written completely yet
+        self.partial_line = b""
+        self.time_carry = 0.0
+
+    def open_log(self) -> bool:
+        if not os.path.exists(self.filename):
+            return False
+        log_file = open(self.filename, "rb")
+        if not self.reader.read_header(line.decode("utf-8", errors="replace") for line in log_file):
+            log_file.close()
+            return False
+        self.log_file = log_file
+        self.partial_line = b""
+        self.time_carry = 0.0
+        return True
+
+    def poll(self) -> LogStore:
+        """Reads complete lines appended to the log
+
+        Returns:
+            LogStore: new messages, or None if there are none
+        """
+        if self.log_file is None and not self.open_log():
+            return None
+        data = self.log_file.read(self.max_read_size)
+        if not data:
+            if os.path.getsize(self.filename) < self.log_file.tell():
+                #The log was truncated or written again from the start
+                self.close()
+            return None
+        data = self.partial_line + data
+        end = data.rfind(b"\n") + 1
+        self.partial_line = data[end:]
+        chunk = self.reader.decode_lines(data[:end].decode("utf-8", errors="replace").splitlines())
+        if chunk is None:
+            return None
+        delta, descriptions, message_id, payload, dlc, irregular = chunk
+        log_time, self.time_carry = accumulate_time(delta, self.time_carry)
+        return LogStore(log_time, delta, message_id, payload, dlc, descriptions, irregular)
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+
+class CanViewReplay():
+    def __init__(self, filename:str, speed:float = 1.0):
+        """Plays back a finished CanView log in real time. Used to try out live capture without a CAN interface
+
+        Args:
+            filename (str): path to the log
+            speed (float, optional): playback speed relative to the time in the log. Defaults to 1.0.
+        """
+        self.log = CanViewReader(filename).read()
+        if self.log is None:
+            raise ValueError("%s is not a CanView log" % filename)
+        self.speed = speed
+        #Lines are released once the playback clock passes the time they were logged at
+        self.release_time = np.cumsum(np.nan_to_num(self.log.delta))
+        self.next_row = 0
+        self.started = None
+
+    def poll(self) -> LogStore:
+        """Returns the lines logged since the last poll
+
+        Returns:
+            LogStore: new messages, or None if there are none
+        """
+        if self.started is None:
+            self.started = time.perf_counter()
+        elapsed = (time.perf_counter() - self.started)*1000*self.speed
+        end = int(np.searchsorted(self.release_time, elapsed, side="right"))
+        if end <= self.next_row:
+            return None
+        frames = self.log.take_rows(self.next_row, end)
+        self.next_row = end
+        return frames
+
+    def close(self):
+        pass
+
+
+class PythonCanSource():
+    def __init__(self, interface:str, channel:str, max_batch:int = 4096, timeout:float = 0.05, **kwargs):
+        """Receives frames from a CAN interface supported by python-can, e.g. socketcan on vcan0 or the virtual interface
+
+        Args:
+            interface (str): python-can interface name
+            channel (str): channel of the interface
+            max_batch (int, optional): maximum number of frames returned per poll. Defaults to 4096.
+            timeout (float, optional): time in seconds to wait for the first frame of a poll. Defaults to 0.05.
+            **kwargs: further arguments passed to can.Bus
+        """
+        #python-can is only needed for this source, so it is not a dependency of the application
+        try:
+            import can
+        except ImportError:
+            raise ImportError("Live capture from a CAN interface needs python-can (pip install python-can)")
+        self.bus = can.Bus(interface = interface, channel = channel, **kwargs)
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.first_timestamp = None
+        self.last_timestamp = None
+
+    def poll(self) -> LogStore:
+        """Receives the frames that are waiting on the bus
+
+        Returns:
+            LogStore: new messages, or None if there are none
+        """
+        frames = []
+        frame = self.bus.recv(self.timeout)
+        while frame is not None:
+            if not frame.is_error_frame:
+                frames.append(frame)
+            if len(frames) >= self.max_batch:
+                break
+            frame = self.bus.recv(0)
+        if not frames:
+            return None
+
+        timestamps = np.array([frame.timestamp for frame in frames])
+        if self.first_timestamp is None:
+            self.first_timestamp = self.last_timestamp = timestamps[0]
+        #CanView logs time in ms
+        delta = np.diff(np.concatenate([[self.last_timestamp], timestamps]))*1000
+        self.last_timestamp = timestamps[-1]
+        dlc = np.array([min(len(frame.data), 8) for frame in frames], dtype=np.uint8)
+        payload = np.zeros((len(frames), 8), dtype=np.uint8)
+        for row, frame in enumerate(frames):
+            payload[row,:dlc[row]] = list(frame.data[:8])
+        message_id = np.array([frame.arbitration_id for frame in frames], dtype=np.uint32)
+        return LogStore((timestamps - self.first_timestamp)*1000, delta, message_id, payload, dlc)
+
+    def close(self):
+        self.bus.shutdown()
+
+
+class LiveLog():
+    def __init__(self, capacity:int, filter_list:list = None, traces:list = None):
+        """Fixed capacity ring buffer of captured messages. Filters and trace state machines are applied to each block
+        of messages as it is appended, continuing the trace values from the previous block. Once full, the oldest
+        messages are overwritten. Appending and taking snapshots can be done from different threads
+
+        Args:
+            capacity (int): number of messages kept
+            filter_list (list, optional): filter list as built by DataHandler.load_canview_filter. Defaults to None (descriptions of the source are kept).
+            traces (list, optional): trace definitions as loaded by DataHandler.load_trace_config. Defaults to None.
+        """
+        self.capacity = capacity
+        self.traces = traces if traces else []
+        self.compiled_filter = CompiledFilter(filter_list) if filter_list else None
+
+        self.time = np.zeros(capacity)
+        self.delta = np.zeros(capacity)
+        self.message_id = np.zeros(capacity, dtype=np.uint32)
+        self.payload = np.zeros((capacity, 8), dtype=np.uint8)
+        self.dlc = np.zeros(capacity, dtype=np.uint8)
+        self.description_codes = np.zeros(capacity, dtype=np.int32)
+        self.colour_codes = np.zeros(capacity, dtype=np.int32)
+        self.trace_data = np.zeros((capacity, len(self.traces)), dtype=np.int8)
+        #{message number: [ID, D0..D7]} of irregular messages still in the buffer
+        self.irregular = dict()
+
+        #Categories only grow, so codes of messages already in the buffer stay valid
+        self.description_categories = [""]
+        self.colour_categories = [""]
+        self.category_codes = [{"": 0}, {"": 0}]
+
+        #Value of each trace after the last appended message
+        self.trace_state = np.zeros(len(self.traces), dtype=np.int8)
+        #Number of messages appended since the capture started
+        self.total_rows = 0
+        self.lock = threading.Lock()
+
+    def append(self, frames:LogStore):
+        """Annotates a block of messages and adds it to the buffer
+        """
+        rows = len(frames)
+        if rows == 0:
+            return
+        messages = MessageTable(*frames.packed_messages(), frames.message_string)
+        if self.compiled_filter is not None:
+            descriptions, colours, _ = messages.evaluate_filter(self.compiled_filter)
+            descriptions = descriptions[messages.index]
+            colours = colours[messages.index]
+        else:
+            descriptions = frames.column(DESCRIPTION_COLUMN)
+            colours = frames.column(COLOUR_COLUMN)
+        description_codes = self.encode(descriptions, 0)
+        colour_codes = self.encode(colours, 1)
+
+        trace_data = np.zeros((rows, len(self.traces)), dtype=np.int8)
+        for trace_index, trace in enumerate(self.traces):
+            high_match, low_match = messages.match_trace(trace["high_msg"], trace["low_msg"])
+            trace_data[:,trace_index] = evaluate_trace_states(high_match[messages.index], low_match[messages.index],
+                                                              trace["low_msg"] == "next", self.trace_state[trace_index])
+        self.trace_state = trace_data[-1].copy()
+
+        #Only the newest messages of a block larger than the buffer are kept
+        skipped = max(0, rows - self.capacity)
+        positions = (self.total_rows + np.arange(skipped, rows)) % self.capacity
+        with self.lock:
+            self.time[positions] = frames.time[skipped:]
+            self.delta[positions] = frames.delta[skipped:]
+            self.message_id[positions] = frames.message_id[skipped:]
+            self.payload[positions] = frames.payload[skipped:]
+            self.dlc[positions] = frames.dlc[skipped:]
+            self.description_codes[positions] = description_codes[skipped:]
+            self.colour_codes[positions] = colour_codes[skipped:]
+            self.trace_data[positions] = trace_data[skipped:]
+            self.irregular.update({self.total_rows + row: strings for row, strings in frames.irregular.items() if row >= skipped})
+            self.total_rows += rows
+            first_row = self.total_rows - min(self.total_rows, self.capacity)
+            if self.irregular and min(self.irregular) < first_row:
+                self.irregular = {row: strings for row, strings in self.irregular.items() if row >= first_row}
+
+    def encode(self, values:np.ndarray, kind:int) -> np.ndarray:
+        """Converts description (kind 0) or colour (kind 1) strings of a block to codes of the buffer's categories
+        """
+        categories = self.description_categories if kind == 0 else self.colour_categories
+        codes = self.category_codes[kind]
+        block_categories, block_codes = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+        for category in block_categories:
+            if category not in codes:
+                codes[category] = len(categories)
+                categories.append(category)
+        remap = np.array([codes[category] for category in block_categories], dtype=np.int32)
+        return remap[block_codes.reshape(-1)]
+
+    def take_new(self, seen_rows:int) -> tuple:
+        """Copies the messages appended after the first seen_rows messages that are still in the buffer, oldest first
+
+        Returns:
+            tuple: (log, first_row, total_rows) where first_row is the number of messages dropped from the buffer so
+                far and total_rows the number of messages appended so far
+        """
+        with self.lock:
+            total_rows = self.total_rows
+            first_row = total_rows - min(total_rows, self.capacity)
+            start = max(seen_rows, first_row)
+            order = np.arange(start, total_rows) % self.capacity
+            log = LogStore(self.time[order], self.delta[order], self.message_id[order], self.payload[order], self.dlc[order],
+                           irregular = {row - start: strings for row, strings in self.irregular.items() if row >= start})
+            log.set_descriptions(self.description_codes[order], np.array(self.description_categories, dtype=object))
+            log.set_colours(self.colour_codes[order], np.array(self.colour_categories, dtype=object))
+            log.set_trace_data(self.trace_data[order])
+        return log, first_row, total_rows
+
+    def snapshot(self) -> tuple:
+        """Copies the messages in the buffer, oldest first
+
+        Returns:
+            tuple: (log, first_row) where first_row is the number of messages dropped from the buffer so far
+        """
+        log, first_row, _ = self.take_new(0)
+        return log, first_row
+
+
+class LiveWindow():
+    def __init__(self, capacity:int):
+        """Messages of a live log shown in the GUI. Columns are kept in arrays with room for as many messages again,
+        so that new messages are appended and the oldest ones dropped without copying the others. The remaining
+        messages are moved back to the start of the arrays when the room is used up, at most once per capacity
+        messages appended
+
+        Args:
+            capacity (int): number of messages kept by the live log
+        """
+        self.size = 2*capacity
+        self.columns = dict()
+        self.start = 0
+        self.stop = 0
+        #Number of captured messages dropped before the first one in the window
+        self.first_row = 0
+        #{message number: [ID, D0..D7]} of irregular messages in the window
+        self.irregular = dict()
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def update(self, first_row:int, columns:dict, irregular:dict):
+        """Drops messages the live log no longer keeps and appends new ones. Columns without new values are dropped,
+        as they can't be kept up to date
+
+        Args:
+            first_row (int): number of captured messages dropped so far
+            columns (dict): {name: array} with the values of each column for the new messages
+            irregular (dict): {row of the new messages: [ID, D0..D7]}
+        """
+        self.start = min(self.start + first_row - self.first_row, self.stop)
+        self.first_row = first_row
+        rows = len(columns["time"])
+        if self.stop + rows > self.size:
+            for column in self.columns.values():
+                column[:len(self)] = column[self.start:self.stop]
+            self.stop -= self.start
+            self.start = 0
+        self.columns = {name: self.columns[name] for name in self.columns if name in columns}
+        for name, values in columns.items():
+            if name not in self.columns:
+                self.columns[name] = np.zeros((self.size,) + values.shape[1:], dtype=values.dtype)
+            self.columns[name][self.stop:self.stop + rows] = values
+        if self.irregular and min(self.irregular) < first_row:
+            self.irregular = {row: strings for row, strings in self.irregular.items() if row >= first_row}
+        self.irregular.update({first_row + len(self) + row: strings for row, strings in irregular.items()})
+        self.stop += rows
+
+    def column(self, name:str, copy:bool = False) -> np.ndarray:
+        """Returns the values of a column for the messages in the window, as a view of the arrays unless copied
+        """
+        values = self.columns[name][self.start:self.stop]
+        return values.copy() if copy else values
+
+    def set_column(self, name:str, values:np.ndarray):
+        """Adds a column computed for every message in the window, so that it is kept up to date by update
+        """
+        self.columns[name] = np.zeros((self.size,) + values.shape[1:], dtype=values.dtype)
+        self.columns[name][self.start:self.stop] = values
+
+    def log_store(self, description_categories:np.ndarray, colour_categories:np.ndarray, copy:bool = False) -> LogStore:
+        """Returns the messages in the window as a log. Columns of the log are views of the arrays unless copied, and
+        stay valid until the next update
+        """
+        log = LogStore(self.column("time", copy), self.column("delta", copy), self.column("message_id", copy),
+                       self.column("payload", copy), self.column("dlc", copy),
+                       irregular = {row - self.first_row: strings for row, strings in self.irregular.items()})
+        log.set_descriptions(self.column("description_codes", copy), description_categories)
+        log.set_colours(self.column("colour_codes", copy), colour_categories)
+        log.set_trace_data(self.column("trace_data", copy))
+        return log
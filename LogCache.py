@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import time
+import zipfile
+import numpy as np
+from LogStore import LogStore
+
+#Bump when the layout of cached files changes so that old cache files are ignored
+CACHE_VERSION = 1
+
+
+def default_cache_dir() -> str:
+    """Returns the per-user directory used for cached logs
+    """
+    base_dir = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base_dir, "CAN-Analyze")
+
+
+def hash_file(filename:str, block_size:int = 1 << 20) -> str:
+    """Hashes the contents of a file
+
+    Args:
+        filename (str): path to file to be hashed
+        block_size (int, optional): number of bytes read at once. Defaults to 1 MB.
+
+    Returns:
+        str: hex digest of the file contents
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_config(config) -> str:
+    """Hashes a JSON serializable filter list or trace configuration
+    """
+    return hashlib.blake2b(json.dumps(config, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class LogCache():
+    def __init__(self, cache_dir:str = None, max_size:int = 2*1024**3, max_age_days:float = 30):
+        """A directory of parsed logs stored as binary columns, keyed by the hash of the log file.
+        Filter and trace results are stored next to them, keyed by the hash of the filter or trace configuration
+
+        Args:
+            cache_dir (str, optional): directory to keep cached files in. Defaults to default_cache_dir().
+            max_size (int, optional): total size of cached files in bytes before the least recently used ones are evicted. Defaults to 2 GB.
+            max_age_days (float, optional): cached files not used for this many days are evicted. Defaults to 30.
+        """
+        self.cache_dir = cache_dir if cache_dir else default_cache_dir()
+        self.max_size = max_size
+        self.max_age_days = max_age_days
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path(self, file_hash:str, kind:str, config_hash:str = "") -> str:
+        name = ".".join(part for part in [file_hash, kind, config_hash, "v%d" % CACHE_VERSION, "npz"] if part)
+        return os.path.join(self.cache_dir, name)
+
+    def load_log(self, file_hash:str, with_descriptions:bool = True) -> tuple:
+        """Loads a cached log
+
+        Args:
+            file_hash (str): hash of the log file
+            with_descriptions (bool, optional): look for the log cached along with its descriptions. Defaults to True.
+
+        Returns:
+            tuple: (log, embnote) or None if the log is not cached
+        """
+        arrays = self.read(self.path(file_hash, "log" if with_descriptions else "log_nodesc"))
+        if arrays is None:
+            return None
+        irregular = {int(row): strings for row, strings in json.loads(str(arrays["irregular"])).items()}
+        log = LogStore(arrays["time"], arrays["delta"], arrays["message_id"], arrays["payload"], arrays["dlc"], irregular = irregular)
+        log.set_descriptions(arrays["description_codes"], arrays["description_categories"].astype(object))
+        return log, json.loads(str(arrays["embnote"]))
+
+    def save_log(self, file_hash:str, log:LogStore, embnote:list[str], with_descriptions:bool = True):
+        """Saves the parsed columns of a log
+
+        Args:
+            file_hash (str): hash of the log file
+            log (LogStore): parsed log
+            embnote (list[str]): lines of the embedded note
+            with_descriptions (bool, optional): False if descriptions were not loaded from the log file. Defaults to True.
+        """
+        self.write(self.path(file_hash, "log" if with_descriptions else "log_nodesc"),
+                   time = log.time,
+                   delta = log.delta,
+                   message_id = log.message_id,
+                   payload = log.payload,
+                   dlc = log.dlc,
+                   description_codes = log.description_codes,
+                   description_categories = log.description_categories.astype(str),
+                   irregular = np.array(json.dumps(log.irregular)),
+                   embnote = np.array(json.dumps(embnote)))
+
+    def load_result(self, file_hash:str, kind:str, config_hash:str) -> dict:
+        """Loads cached filter or trace results of a log
+
+        Args:
+            file_hash (str): hash of the log file
+            kind (str): "filter" or "trace"
+            config_hash (str): hash of the filter list or trace configuration
+
+        Returns:
+            dict: arrays that were saved, or None if they are not cached
+        """
+        return self.read(self.path(file_hash, kind, config_hash))
+
+    def save_result(self, file_hash:str, kind:str, config_hash:str, arrays:dict):
+        """Saves filter or trace results of a log. See load_result
+        """
+        self.write(self.path(file_hash, kind, config_hash), **arrays)
+
+    def read(self, path:str) -> dict:
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+            #Mark as recently used for eviction
+            os.utime(path)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            #A damaged cache file, or one evicted while loading another log, is treated as a miss
+            return None
+        return arrays
+
+    def write(self, path:str, **arrays):
+        temp_path = path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(temp_path, path)
+        except OSError:
+            #Failing to cache is not an error, the log is simply parsed again next time
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """Removes cached files that haven't been used for max_age_days, then the least recently used ones until the cache fits in max_size
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith(".npz") and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        oldest_allowed = time.time() - self.max_age_days*24*3600
+        total_size = sum(entry[1] for entry in entries)
+        for mtime, size, path in entries:
+            if mtime >= oldest_allowed and total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+                total_size -= size
+            except OSError:
+                pass
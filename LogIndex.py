@@ -0,0 +1,178 @@
+import re
+import numpy as np
+from LogStore import LogStore
+
+
+def description_tokens(text:str) -> list[str]:
+    """Splits a description or a search query into lower case words. Underscores and punctuation separate words
+    """
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def normalize_trace_name(name:str) -> str:
+    """Trace names often contain line breaks. They are compared in lower case with any whitespace as a single space
+    """
+    return " ".join(name.lower().split())
+
+
+def grouped_rows(codes:np.ndarray) -> tuple:
+    """Groups row numbers by value
+
+    Args:
+        codes (np.ndarray): value of each row
+
+    Returns:
+        tuple: (values, starts, rows) where rows[starts[i]:starts[i + 1]] are the rows holding values[i] in ascending order
+    """
+    rows = np.argsort(codes, kind="stable")
+    values, starts = np.unique(codes[rows], return_index=True)
+    return values, np.append(starts, len(rows)), rows
+
+
+class LogIndex():
+    def __init__(self, log:LogStore, trace_names:list[str] = None):
+        """Index of the rows of a log by message ID, description word and trace transition. Lookups return sorted row
+        numbers, so the next or previous match from any row is found with a binary search
+
+        Args:
+            log (LogStore): the log to index
+            trace_names (list[str], optional): name of each trace column. Defaults to None.
+        """
+        self.rows = len(log)
+        self.id_values, self.id_starts, self.id_rows = grouped_rows(log.message_id)
+        #IDs of irregular rows are looked up by the string found in the log
+        self.irregular_ids = dict()
+        for row, strings in sorted(log.irregular.items()):
+            self.irregular_ids.setdefault(strings[0].upper(), []).append(row)
+        irregular_rows = np.array(sorted(log.irregular), dtype=np.int64)
+
+        self.description_codes, self.description_starts, self.description_rows = grouped_rows(log.description_codes)
+        self.description_words = [set(description_tokens(str(category))) for category in log.description_categories]
+
+        self.trace_names = [normalize_trace_name(name) for name in trace_names] if trace_names else []
+        self.transitions = []
+        for trace_index in range(log.trace_data.shape[1]):
+            values = log.trace_data[:,trace_index]
+            changed = np.flatnonzero(np.diff(values) != 0) + 1
+            self.transitions.append((changed[values[changed] > values[changed - 1]], changed[values[changed] < values[changed - 1]]))
+
+        #Rows of irregular messages are excluded from ID lookups by value, their message_id was only partially decoded
+        if len(irregular_rows):
+            self.id_rows_regular = ~np.isin(self.id_rows, irregular_rows)
+        else:
+            self.id_rows_regular = None
+        self.cache = dict()
+
+    def find_id(self, pattern:str) -> np.ndarray:
+        """Finds rows with a message ID
+
+        Args:
+            pattern (str): 8 hex digits, "?" matches any digit
+
+        Returns:
+            np.ndarray: sorted row numbers
+        """
+        pattern = pattern.upper()
+        if len(pattern) != 8 or not re.fullmatch(r"[0-9A-F?]{8}", pattern):
+            return np.array(sorted(self.irregular_ids.get(pattern, [])), dtype=np.int64)
+        value = int(pattern.replace("?", "0"), 16)
+        mask = int("".join("0" if char == "?" else "F" for char in pattern), 16)
+        matches = np.flatnonzero((self.id_values & np.uint32(mask)) == value)
+        rows = np.concatenate([self.group(self.id_rows, self.id_starts, i, self.id_rows_regular) for i in matches] +
+                              [np.array(self.irregular_ids.get(pattern, []), dtype=np.int64)])
+        return np.sort(rows)
+
+    def find_description(self, query:str) -> np.ndarray:
+        """Finds rows with descriptions that contain every word of a query. Words of the query match the start of words
+        in a description, e.g. "deliv" matches "SHEET DELIVERED"
+
+        Returns:
+            np.ndarray: sorted row numbers
+        """
+        query_words = description_tokens(query)
+        if not query_words:
+            return np.zeros(0, dtype=np.int64)
+        categories = [code for code, words in enumerate(self.description_words)
+                      if all(any(word.startswith(query_word) for word in words) for query_word in query_words)]
+        groups = np.flatnonzero(np.isin(self.description_codes, categories))
+        if len(groups) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.concatenate([self.group(self.description_rows, self.description_starts, i) for i in groups]))
+
+    def find_transitions(self, trace:str, edge:str = "any") -> np.ndarray:
+        """Finds rows where a trace changes value
+
+        Args:
+            trace (str): trace name, compared ignoring case and line breaks
+            edge (str, optional): "rising", "falling" or "any". Defaults to "any".
+
+        Returns:
+            np.ndarray: sorted row numbers
+        """
+        name = normalize_trace_name(trace)
+        if name not in self.trace_names:
+            return np.zeros(0, dtype=np.int64)
+        rising, falling = self.transitions[self.trace_names.index(name)]
+        if edge == "rising":
+            return rising
+        if edge == "falling":
+            return falling
+        return np.union1d(rising, falling)
+
+    def search(self, query:str) -> np.ndarray:
+        """Finds rows matching a query:
+        "id:0011FF10" or just "0011FF10" finds an ID, "?" matches any digit.
+        "trace:S5 Ready" or just the name of a trace finds its transitions, add "+" or "-" for rising or falling ones.
+        "desc:sheet exit" or any other text finds descriptions containing its words.
+        Results are cached
+
+        Returns:
+            np.ndarray: sorted row numbers
+        """
+        query = query.strip()
+        if query in self.cache:
+            return self.cache[query]
+        kind, _, text = query.partition(":")
+        kind = kind.lower()
+        if kind not in ("id", "trace", "desc"):
+            text = query
+            trace_name = normalize_trace_name(query.rstrip("+-"))
+            if re.fullmatch(r"[0-9A-Fa-f?]{8}", query):
+                kind = "id"
+            elif trace_name in self.trace_names:
+                kind = "trace"
+            else:
+                kind = "desc"
+        text = text.strip()
+        if kind == "id":
+            rows = self.find_id(text)
+        elif kind == "trace":
+            edge = {"+": "rising", "-": "falling"}.get(text[-1:], "any")
+            rows = self.find_transitions(text.rstrip("+-") if edge != "any" else text, edge)
+        else:
+            rows = self.find_description(text)
+        self.cache[query] = rows
+        return rows
+
+    def next_match(self, rows:np.ndarray, row:int, backwards:bool = False) -> int:
+        """Finds the match after (or before) a row, wrapping around at the end (or start) of the log
+
+        Args:
+            rows (np.ndarray): sorted row numbers as returned by search
+            row (int): row to start from, -1 to start from the top
+            backwards (bool, optional): find the previous match instead. Defaults to False.
+
+        Returns:
+            int: row of the match, or -1 if there are none
+        """
+        if len(rows) == 0:
+            return -1
+        if backwards:
+            position = np.searchsorted(rows, row, side="left") - 1
+            return int(rows[position]) if position >= 0 else int(rows[-1])
+        position = np.searchsorted(rows, row, side="right")
+        return int(rows[position]) if position < len(rows) else int(rows[0])
+
+    def group(self, rows:np.ndarray, starts:np.ndarray, i:int, keep:np.ndarray = None) -> np.ndarray:
+        group = slice(starts[i], starts[i + 1])
+        return rows[group] if keep is None else rows[group][keep[group]]
@@ -0,0 +1,204 @@
+import numpy as np
+from FilterEngine import decode_message_strings, pack_message_words
+
+#Column layout of a log: Time, Delta, Description, ID, D0..D7, Colour followed by one column per trace
+TIME_COLUMN = 0
+DELTA_COLUMN = 1
+DESCRIPTION_COLUMN = 2
+ID_COLUMN = 3
+FIRST_DATA_COLUMN = 4
+COLOUR_COLUMN = 12
+BASE_COLUMN_COUNT = 13
+
+#Hex strings of every byte value. The extra entry at the end is used for absent bytes
+BYTE_STRINGS = np.array(["%02X" % i for i in range(256)] + [""], dtype=object)
+
+
+def encode_categories(values) -> tuple:
+    """Converts a sequence of strings to categorical codes
+
+    Args:
+        values: sequence of strings
+
+    Returns:
+        tuple: (codes, categories) where categories is an object array of distinct strings starting with "" and
+            codes is an int32 array indexing into it
+    """
+    values = np.asarray(values, dtype=object)
+    categories, codes = np.unique(np.concatenate([np.array([""], dtype=object), values]).astype(str), return_inverse=True)
+    categories = categories.astype(object)
+    #The empty string sorts first, so it is always category 0
+    codes = codes.reshape(-1)[1:].astype(np.int32)
+    return codes, categories
+
+
+class LogStore():
+    def __init__(self, time:np.ndarray, delta:np.ndarray, message_id:np.ndarray, payload:np.ndarray, dlc:np.ndarray, descriptions = None, irregular:dict = None):
+        """Typed columnar storage of a CAN log
+
+        Args:
+            time (np.ndarray): cumulative time of each message in ms
+            delta (np.ndarray): time since previous message in ms
+            message_id (np.ndarray): message IDs
+            payload (np.ndarray): matrix of data bytes D0..D7, one row per message
+            dlc (np.ndarray): number of valid data bytes in each message
+            descriptions (optional): description of each message. Defaults to empty descriptions.
+            irregular (dict, optional): {row: [ID, D0..D7]} strings of rows that can't be represented by the typed arrays. Defaults to None.
+        """
+        rows = len(time)
+        self.time = np.asarray(time, dtype=np.float64)
+        self.delta = np.asarray(delta, dtype=np.float64)
+        self.message_id = np.asarray(message_id, dtype=np.uint32)
+        self.payload = np.asarray(payload, dtype=np.uint8).reshape(rows, 8)
+        self.dlc = np.asarray(dlc, dtype=np.uint8)
+        self.irregular = irregular if irregular else dict()
+
+        if descriptions is None:
+            self.description_codes = np.zeros(rows, dtype=np.int32)
+            self.description_categories = np.array([""], dtype=object)
+        else:
+            self.description_codes, self.description_categories = encode_categories(descriptions)
+        self.colour_codes = np.zeros(rows, dtype=np.int32)
+        self.colour_categories = np.array([""], dtype=object)
+
+        #One int8 column per trace
+        self.trace_data = np.zeros((rows, 0), dtype=np.int8)
+
+    @classmethod
+    def empty(cls):
+        """Creates a log without any messages
+        """
+        return cls(np.zeros(0), np.zeros(0), np.zeros(0), np.zeros((0, 8)), np.zeros(0))
+
+    @classmethod
+    def from_strings(cls, time:np.ndarray, delta:np.ndarray, descriptions:np.ndarray, id_column:np.ndarray, byte_columns:np.ndarray):
+        """Creates a log from ID and data bytes stored as hex strings
+
+        Args:
+            time (np.ndarray): cumulative time of each message in ms
+            delta (np.ndarray): time since previous message in ms
+            descriptions (np.ndarray): description of each message
+            id_column (np.ndarray): message IDs as hex strings
+            byte_columns (np.ndarray): matrix of data bytes D0..D7 as hex strings, empty string where a byte is absent
+        """
+        message_id, payload, dlc, regular = decode_message_strings(id_column, byte_columns)
+        irregular = {int(row): [str(id_column[row])] + [str(b) for b in byte_columns[row]] for row in np.flatnonzero(~regular)}
+        return cls(time, delta, message_id, payload, dlc, descriptions, irregular)
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self.time), BASE_COLUMN_COUNT + self.trace_data.shape[1])
+
+    @property
+    def valid_mask(self) -> np.ndarray:
+        """Bool matrix marking which of the data bytes D0..D7 are present in each message
+        """
+        return np.arange(8) < self.dlc[:,None]
+
+    def __getitem__(self, key):
+        """Indexes the log like the 2D object array it replaces, e.g. log[row, column], log[row] or log[:, column]
+        """
+        if not isinstance(key, tuple):
+            key = (key, slice(None))
+        rows, columns = key
+        if isinstance(columns, (int, np.integer)):
+            return self.column(int(columns), rows)
+
+        column_indices = range(self.shape[1])[columns] if isinstance(columns, slice) else columns
+        if isinstance(rows, (int, np.integer)):
+            return np.array([self.column(int(c), rows) for c in column_indices], dtype=object)
+        return np.stack([np.asarray(self.column(int(c), rows), dtype=object) for c in column_indices], axis=-1)
+
+    def column(self, column:int, rows = slice(None)):
+        """Returns display values of a column
+
+        Args:
+            column (int): column index in the log layout
+            rows (optional): row index, slice or index array. Defaults to all rows.
+
+        Returns:
+            a single value if rows is an integer, otherwise an array of values
+        """
+        if column < 0:
+            column += self.shape[1]
+        if column == TIME_COLUMN:
+            return self.time[rows]
+        if column == DELTA_COLUMN:
+            return self.delta[rows]
+        if column == DESCRIPTION_COLUMN:
+            return self.description_categories[self.description_codes[rows]]
+        if column == COLOUR_COLUMN:
+            return self.colour_categories[self.colour_codes[rows]]
+        if column >= BASE_COLUMN_COUNT:
+            return self.trace_data[rows, column - BASE_COLUMN_COUNT]
+        if column == ID_COLUMN:
+            message_id = self.message_id[rows]
+            values = BYTE_STRINGS[(message_id >> 24) & 255] + BYTE_STRINGS[(message_id >> 16) & 255] + BYTE_STRINGS[(message_id >> 8) & 255] + BYTE_STRINGS[message_id & 255]
+        else:
+            byte = column - FIRST_DATA_COLUMN
+            values = BYTE_STRINGS[np.where(self.dlc[rows] > byte, self.payload[rows, byte].astype(np.int32), 256)]
+        return self.apply_irregular(values, rows, column - ID_COLUMN)
+
+    def apply_irregular(self, values, rows, field:int):
+        """Replaces ID or data byte display values of irregular rows with the strings found in the log file
+        """
+        if not self.irregular:
+            return values
+        if isinstance(rows, (int, np.integer)):
+            return self.irregular[int(rows)][field] if int(rows) in self.irregular else values
+        row_numbers = np.arange(len(self.time))[rows]
+        for position in np.flatnonzero(np.isin(row_numbers, list(self.irregular.keys()))):
+            values[position] = self.irregular[int(row_numbers[position])][field]
+        return values
+
+    def take_rows(self, start:int, stop:int):
+        """Returns a range of rows as a new log along with their annotations. Columns of the new log are views of this one
+
+        Returns:
+            LogStore: the rows from start up to stop
+        """
+        rows = slice(start, stop)
+        start, stop, _ = rows.indices(len(self.time))
+        log = LogStore(self.time[rows], self.delta[rows], self.message_id[rows], self.payload[rows], self.dlc[rows],
+                       irregular = {row - start: strings for row, strings in self.irregular.items() if start <= row < stop})
+        log.set_descriptions(self.description_codes[rows], self.description_categories)
+        log.set_colours(self.colour_codes[rows], self.colour_categories)
+        log.set_trace_data(self.trace_data[rows])
+        return log
+
+    def message_string(self, row:int) -> str:
+        """Returns ID and data bytes of a row as a single hex string
+        """
+        return "".join(self[row, ID_COLUMN:COLOUR_COLUMN])
+
+    def packed_messages(self) -> tuple:
+        """Packs ID and data bytes of every row into 64 bit words for filter matching
+
+        Returns:
+            tuple: (hi, lo, hi_mask, lo_mask, nchars, packable) as returned by FilterEngine.pack_message_strings
+        """
+        packable = np.ones(len(self.time), dtype=bool)
+        packable[list(self.irregular.keys())] = False
+        return pack_message_words(self.message_id, self.payload, self.dlc) + (packable,)
+
+    def set_descriptions(self, codes:np.ndarray, categories:np.ndarray):
+        """Replaces descriptions of all rows with categorical codes
+        """
+        self.description_codes = np.asarray(codes, dtype=np.int32)
+        self.description_categories = np.asarray(categories, dtype=object)
+
+    def set_colours(self, codes:np.ndarray, categories:np.ndarray):
+        """Replaces colours of all rows with categorical codes
+        """
+        self.colour_codes = np.asarray(codes, dtype=np.int32)
+        self.colour_categories = np.asarray(categories, dtype=object)
+
+    def set_trace_data(self, trace_data:np.ndarray):
+        """Replaces trace columns with an int8 matrix, one column per trace
+        """
+        trace_data = np.asarray(trace_data, dtype=np.int8)
+        #The number of columns is taken from a matrix, so that a log without rows can still have trace columns
+        self.trace_data = trace_data.reshape(len(self.time), trace_data.shape[1] if trace_data.ndim == 2 else -1)
@@ -0,0 +1,207 @@
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from FilterEngine import CompiledFilter, MessageTable, evaluate_trace_states
+from LogStore import encode_categories
+
+#Columns of a MessageTable that filters are evaluated on
+MESSAGE_COLUMNS = ("hi", "lo", "hi_mask", "lo_mask", "nchars")
+#Chunks handed out per worker, so that a worker that finishes early can take over the remaining work
+CHUNKS_PER_WORKER = 4
+
+#Worker processes are started once and kept until the application exits
+pools = dict()
+pools_lock = threading.Lock()
+
+
+def get_pool(worker_count:int) -> ProcessPoolExecutor:
+    """Returns a pool of worker processes, starting it on first use. Workers are spawned rather than forked, as the
+    GUI process runs several threads
+    """
+    with pools_lock:
+        if worker_count not in pools:
+            pools[worker_count] = ProcessPoolExecutor(max_workers=worker_count, mp_context=multiprocessing.get_context("spawn"))
+        return pools[worker_count]
+
+
+@atexit.register
+def shutdown_pools():
+    with pools_lock:
+        for pool in pools.values():
+            pool.shutdown(cancel_futures=True)
+        pools.clear()
+
+
+def chunk_bounds(rows:int, worker_count:int) -> list[tuple]:
+    """Splits rows into about CHUNKS_PER_WORKER chunks per worker
+
+    Returns:
+        list[tuple]: (start, stop) of each chunk
+    """
+    chunk_count = max(1, min(rows, worker_count*CHUNKS_PER_WORKER))
+    bounds = np.linspace(0, rows, chunk_count + 1).astype(np.int64)
+    return [(int(start), int(stop)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+class SharedArrays():
+    def __init__(self, arrays:dict):
+        """Copies arrays to shared memory, so that worker processes read them and write results to them without
+        pickling. Use as a context manager to release the memory
+
+        Args:
+            arrays (dict): {name: np.ndarray}
+        """
+        self.blocks = []
+        #{name: (shared memory name, shape, dtype)} passed to workers to attach the arrays
+        self.spec = dict()
+        self.arrays = dict()
+        try:
+            for name, array in arrays.items():
+                array = np.asarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                self.blocks.append(block)
+                self.arrays[name] = np.ndarray(array.shape, array.dtype, buffer=block.buf)
+                self.arrays[name][...] = array
+                self.spec[name] = (block.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        #Views of the memory have to be gone before it can be closed
+        self.arrays.clear()
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_arrays(spec:dict) -> tuple:
+    """Attaches a worker to arrays shared by SharedArrays
+
+    Returns:
+        tuple: (blocks, arrays) where blocks have to be closed once the arrays are no longer used
+    """
+    blocks = []
+    arrays = dict()
+    for name, (block_name, shape, dtype) in spec.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        arrays[name] = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+    return blocks, arrays
+
+
+def evaluate_filter_chunk(spec:dict, start:int, stop:int, filter_list:list, strings:dict) -> tuple:
+    """Runs a chunk of distinct messages through a filter. Runs in a worker process
+
+    Args:
+        spec (dict): shared MESSAGE_COLUMNS of the messages
+        start, stop (int): rows of the chunk
+        filter_list (list): filter list as built by DataHandler.load_canview_filter
+        strings (dict): {row in the chunk: message string} of messages that can't be packed
+
+    Returns:
+        tuple: (description_codes, description_categories, colour_codes, colour_categories, matched) for each message
+            of the chunk. Strings are returned as categories, which are much faster to send back than a string per message
+    """
+    blocks, arrays = attach_arrays(spec)
+    try:
+        compiled_filter = CompiledFilter(filter_list)
+        descriptions, colours, matched = compiled_filter.evaluate(*(arrays[name][start:stop] for name in MESSAGE_COLUMNS))
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+    for i, test_string in strings.items():
+        descriptions[i], colours[i], matched[i] = compiled_filter.evaluate_string(test_string)
+    return encode_categories(descriptions) + encode_categories(colours) + (matched,)
+
+
+def evaluate_filter(messages:MessageTable, filter_list:list, worker_count:int) -> tuple:
+    """Runs every distinct message through a filter on several processes. Same result as MessageTable.evaluate_filter
+
+    Returns:
+        tuple: (descriptions, colours, matched) for each distinct message
+    """
+    chunks = chunk_bounds(len(messages), worker_count)
+    pool = get_pool(worker_count)
+    with SharedArrays({name: getattr(messages, name) for name in MESSAGE_COLUMNS}) as shared:
+        futures = [pool.submit(evaluate_filter_chunk, shared.spec, start, stop, filter_list,
+                               {i - start: test_string for i, test_string in messages.strings.items() if start <= i < stop})
+                   for start, stop in chunks]
+        results = [future.result() for future in futures]
+    descriptions = np.concatenate([description_categories[description_codes] for description_codes, description_categories, _, _, _ in results])
+    colours = np.concatenate([colour_categories[colour_codes] for _, _, colour_codes, colour_categories, _ in results])
+    matched = np.concatenate([result[4] for result in results])
+    return descriptions, colours, matched
+
+
+def trace_states_chunk(spec:dict, start:int, stop:int, pulse:list[bool]):
+    """Evaluates the trace state machines on a chunk of log rows, once starting low and once starting high, since the
+    value of each trace at the end of the previous chunk isn't known yet. Runs in a worker process
+
+    Args:
+        spec (dict): shared "message_index" of each row, "high_match" and "low_match" of each trace and distinct
+            message, and "states" the results are written to
+        start, stop (int): rows of the chunk
+        pulse (list[bool]): True for traces reset by the next message
+    """
+    blocks, arrays = attach_arrays(spec)
+    try:
+        write_trace_states(arrays, start, stop, pulse)
+    finally:
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+def write_trace_states(arrays:dict, start:int, stop:int, pulse:list[bool]):
+    message_index = arrays["message_index"][start:stop]
+    for trace_index, trace_pulse in enumerate(pulse):
+        high_match = arrays["high_match"][trace_index][message_index]
+        low_match = arrays["low_match"][trace_index][message_index]
+        for initial_value in (0, 1):
+            arrays["states"][initial_value, start:stop, trace_index] = evaluate_trace_states(high_match, low_match, trace_pulse, initial_value)
+
+
+def evaluate_traces(message_index:np.ndarray, high_match:np.ndarray, low_match:np.ndarray, pulse:list[bool], worker_count:int) -> np.ndarray:
+    """Evaluates the state machines of several traces on chunks of log rows on several processes. Chunks are joined
+    by continuing each trace from its value at the end of the previous chunk, giving the same values as
+    evaluate_trace_states over the whole log
+
+    Args:
+        message_index (np.ndarray): index of the distinct message on each row
+        high_match (np.ndarray): bool for each trace and distinct message that matches the high message
+        low_match (np.ndarray): bool for each trace and distinct message that matches the low message
+        pulse (list[bool]): True for traces reset by the next message
+        worker_count (int): number of worker processes
+
+    Returns:
+        np.ndarray: int8 value of each trace on each row, one column per trace
+    """
+    rows = len(message_index)
+    chunks = chunk_bounds(rows, worker_count)
+    pool = get_pool(worker_count)
+    trace_data = np.zeros((rows, len(pulse)), dtype=np.int8)
+    with SharedArrays({"message_index": message_index, "high_match": high_match, "low_match": low_match,
+                       "states": np.zeros((2, rows, len(pulse)), dtype=np.int8)}) as shared:
+        futures = [pool.submit(trace_states_chunk, shared.spec, start, stop, pulse) for start, stop in chunks]
+        for future in futures:
+            future.result()
+        states = shared.arrays["states"]
+        carry = np.zeros(len(pulse), dtype=bool)
+        for start, stop in chunks:
+            if stop > start:
+                trace_data[start:stop] = np.where(carry, states[1, start:stop], states[0, start:stop])
+                carry = trace_data[stop - 1] > 0
+        del states
+    return trace_data
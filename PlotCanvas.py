@@ -0,0 +1,644 @@
+import datetime
+import os
+import numpy as np
+from PyQt6 import QtGui, QtWidgets
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT
+
+from ResourcePaths import resolve_path
+
+matplotlib.use("QtAgg")
+matplotlib.rcParams["savefig.directory"] = ""
+matplotlib.rcParams["savefig.format"] = "svg"
+
+
+def decimate_steps(x:np.ndarray, y:np.ndarray, x_min:float, x_max:float, columns:int) -> tuple:
+    """Reduces a step line to at most five vertices per column of the visible range. Columns with several edges are drawn as the outline
+    of a box from the first to the last edge, spanning the lowest and highest value, followed by the last value in the column
+
+    Args:
+        x (np.ndarray): sorted times of edges
+        y (np.ndarray): values after each edge
+        x_min (float): left edge of the visible range
+        x_max (float): right edge of the visible range
+        columns (int): number of columns the visible range is divided into, usually a multiple of its width in pixels
+
+    Returns:
+        tuple: (x, y) of the decimated step line
+    """
+    column = np.clip(np.floor((x - x_min) * (columns / (x_max - x_min))), -1, columns)
+    starts = np.flatnonzero(np.concatenate([[True], column[1:] != column[:-1]]))
+    ends = np.concatenate([starts[1:], [len(y)]]) - 1
+    low = np.minimum.reduceat(y, starts)
+    high = np.maximum.reduceat(y, starts)
+    #Drawn with steps-post: bottom edge forwards, up at the last edge, top edge back, then down or up to the last value
+    decimated_x = np.column_stack([x[starts], x[ends], x[ends], x[starts], x[starts]])
+    decimated_y = np.column_stack([low, low, high, high, y[ends]])
+    return decimated_x.ravel(), decimated_y.ravel()
+
+
+def step_edges(time:np.ndarray, values:np.ndarray) -> tuple:
+    """Reduces a trace to its first value, the values where it changes and its last value
+
+    Returns:
+        tuple: (x, y) of the edges
+    """
+    edges = np.concatenate([[0], np.flatnonzero(np.diff(values) != 0) + 1, [len(values) - 1]]) if len(values) else np.zeros(0, dtype=np.int64)
+    return time[edges], values[edges]
+
+
+def transition_rows(trace_data:np.ndarray, signal_data:np.ndarray = None) -> np.ndarray:
+    """Finds lines where any trace or signal changes, compared with the line before
+
+    Returns:
+        np.ndarray: sorted line numbers
+    """
+    rows = np.flatnonzero(np.any(np.diff(trace_data, axis=0) != 0, axis=1)) + 1
+    if signal_data is not None and signal_data.shape[1]:
+        #Signals are NaN until their first message
+        changed = (signal_data[1:] != signal_data[:-1]) & ~np.isnan(signal_data[1:])
+        rows = np.union1d(rows, np.flatnonzero(np.any(changed, axis=1)) + 1)
+    return rows
+
+
+class MplCanvas(FigureCanvasQTAgg):
+
+    def __init__(self, parent=None, width=5, height=4, dpi=100):
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = self.fig.add_subplot(111)
+
+        self.snap_x = np.zeros(0)
+        self.snap_rows = np.zeros(0, dtype=np.int64)
+        self._last_index = None
+        self.current_snap_index = 0
+
+        trans = matplotlib.transforms.blended_transform_factory(self.axes.transData, self.axes.transAxes)
+        self.text = self.axes.text(0.0, 0.0, '', va="center", ha="center", transform = trans)
+        self.measured_value_text = self.axes.text(0.0, 0.0, '', va="center", ha="center", transform = trans, bbox=dict(boxstyle="round", fc="orange", alpha = 0.8))
+        self.measured_value_text.set_visible(False)
+
+        self.measurement_arrow = self.axes.annotate("", xy=(0, 0), xytext=(0, 0), arrowprops=dict(arrowstyle="<->", color = "orange", lw = 2), xycoords = trans, textcoords = trans)
+        self.measurement_arrow.set_visible(False)
+
+
+        self.axes.set_yticklabels("",ha = "right", va = "bottom")
+        self.axes.yaxis.set_major_formatter(self.y_label_formatter)
+        self.axes.yaxis.set_major_locator(matplotlib.ticker.MultipleLocator(2))
+
+        self.log_file_name = "log"
+        self.save_count = 1
+
+        self.status_label = QtWidgets.QLabel()
+
+        self.trace_count = 0
+
+        #A dictionary that contains functions passed on from other classes that can be used by the canvas
+        self.linked_callbacks = dict()
+
+        #Step traces as (line, edge times, edge values). Lines are re-sampled to the visible range on pan and zoom
+        self.step_data = []
+        #Time of the oldest and newest line shown by append_live_data, None unless a live capture is shown
+        self.live_start_time = None
+        self.live_end_time = None
+        #Edges of each step trace of a live capture as (line numbers, times, values), without the end of the line
+        self.live_edges = []
+        #Names and values of numeric signals, shown in the status bar for the line under the cursor. See set_signal_readout
+        self.signal_names = []
+        self.signal_data = None
+        self.axes.callbacks.connect('xlim_changed', self.update_level_of_detail)
+
+        #Cursor and measurement artists are blitted over a cached background instead of redrawing the whole figure
+        self.animated_artists = [self.text, self.measured_value_text, self.measurement_arrow]
+        for artist in self.animated_artists:
+            artist.set_animated(True)
+        self.background = None
+
+        super(MplCanvas, self).__init__(self.fig)
+        self.use_blit = self.supports_blit
+        self.mpl_connect('draw_event', self.on_draw)
+        self.mpl_connect('resize_event', self.update_level_of_detail)
+
+    def remove_traces(self):
+        #Remove any existing traces lines from the plot
+        for line in self.axes.get_lines():
+            line.remove()
+        self.animated_artists = [self.text, self.measured_value_text, self.measurement_arrow]
+        self.step_data = []
+        self.live_start_time = None
+        self.live_end_time = None
+        self.live_edges = []
+        self.signal_names = []
+        self.signal_data = None
+        if self.axes.get_legend():
+            self.axes.get_legend().remove()
+        self.trace_count = 1
+        self.trace_labels = [""]
+
+    def add_step_trace(self, time:np.ndarray, values:np.ndarray, label:str):
+        """Plots a trace as a step line with vertices only where its value changes
+
+        Args:
+            time (np.ndarray): time of each log line
+            values (np.ndarray): value of the trace at each log line, including its offset on the y axis
+            label (str): name of the trace
+        """
+        edge_x, edge_y = step_edges(time, values)
+        line, = self.axes.step(x = edge_x, y = edge_y, label = label, where = 'post')
+        self.step_data.append((line, edge_x, edge_y))
+        return line
+
+    def update_step_trace(self, trace_index:int, time:np.ndarray, values:np.ndarray):
+        """Replaces the values of a trace that has been added with add_step_trace. Other lines are left as they are
+        """
+        line = self.step_data[trace_index][0]
+        edge_x, edge_y = step_edges(time, values)
+        self.step_data[trace_index] = (line, edge_x, edge_y)
+        x_min, x_max = self.axes.get_xlim()
+        self.resample_step_trace(line, edge_x, edge_y, x_min, x_max, 2*max(1, int(self.axes.bbox.width)))
+
+    def set_trace_label(self, trace_index:int, label:str):
+        self.step_data[trace_index][0].set_label(label)
+        self.trace_labels[trace_index] = label
+
+    def start_live_view(self, window:float = 10000):
+        """Sets up the time axis for traces that have been added without any data yet, to be filled in by append_live_data.
+        Call after initialize_cursor_snapping
+
+        Args:
+            window (float, optional): width of the x axis in ms. Defaults to 10 s.
+        """
+        self.axes.set_xlim(-0.05*window, 0.95*window)
+        self.live_start_time = None
+        self.live_end_time = 0.0
+        self.live_edges = [(np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)) for _ in self.step_data]
+        if self.use_blit:
+            #Lines are drawn over the cached background as they grow, like the cursor
+            lines = [line for line, _, _ in self.step_data]
+            for line in lines:
+                line.set_animated(True)
+            self.animated_artists = lines + self.animated_artists
+
+    def append_live_data(self, time:np.ndarray, new_rows:int, dropped:int, trace_values:list, trace_data:np.ndarray, signal_data:np.ndarray = None):
+        """Adds the newest lines of a live capture to the traces and drops the oldest ones. While the newest line is in
+        view, the x axis scrolls along with the capture and the figure is drawn again. Otherwise only the traces are
+        redrawn over the cached background, and only if lines in view changed
+
+        Args:
+            time (np.ndarray): time of each log line kept
+            new_rows (int): number of lines at the end that are new
+            dropped (int): number of lines dropped from the start since the last call
+            trace_values (list): values of each trace at the new lines, including their offsets on the y axis. Values
+                at every line kept plot the trace again, e.g. after its scale changed
+            trace_data (np.ndarray): matrix of trace values of the lines kept, one column per trace. Used for cursor snapping
+            signal_data (np.ndarray, optional): matrix of signal values of the lines kept, one column per signal. Defaults to None.
+        """
+        first_new = len(time) - new_rows
+        for trace_index, values in enumerate(trace_values):
+            edge_rows, edge_x, edge_y = self.live_edges[trace_index]
+            if len(values) == len(time):
+                edge_rows = np.concatenate([[0], np.flatnonzero(np.diff(values) != 0) + 1]) if len(values) else np.zeros(0, dtype=np.int64)
+                edge_x, edge_y = time[edge_rows], values[edge_rows]
+            else:
+                #The edge the kept lines start with moves to the first of them
+                first = np.searchsorted(edge_rows, dropped, side="right") - 1
+                edge_rows = edge_rows[first:] - dropped
+                edge_rows[0] = 0
+                edge_x = edge_x[first:].copy()
+                edge_x[0] = time[0]
+                edge_y = edge_y[first:]
+                changes = np.flatnonzero(np.diff(np.concatenate([edge_y[-1:], values])) != 0)
+                edge_rows = np.concatenate([edge_rows, changes + first_new])
+                edge_x = np.concatenate([edge_x, time[changes + first_new]])
+                edge_y = np.concatenate([edge_y, values[changes]])
+            self.live_edges[trace_index] = (edge_rows, edge_x, edge_y)
+            #Like step_edges, the line ends at the last line
+            self.step_data[trace_index] = (self.step_data[trace_index][0], np.append(edge_x, time[-1:]), np.append(edge_y, edge_y[-1:]))
+        self.append_snap_points(time, new_rows, dropped, trace_data, signal_data)
+        if self.signal_names:
+            self.signal_data = signal_data
+
+        x_min, x_max = self.axes.get_xlim()
+        new_time = time[first_new:][np.isfinite(time[first_new:])]
+        end_time = new_time.max() if len(new_time) else self.live_end_time
+        following = self.live_end_time is not None and self.live_end_time <= x_max
+        #Lines dropped from the start were shown from live_start_time up to the new first line
+        dropped_in_view = dropped and self.live_start_time is not None and self.live_start_time <= x_max and time[0] >= x_min
+        self.live_start_time = time[0]
+        self.live_end_time = end_time
+        if following and end_time > x_max - 0.05*(x_max - x_min):
+            #Moving the axis re-samples the lines
+            width = x_max - x_min
+            self.axes.set_xlim(end_time - 0.95*width, end_time + 0.05*width)
+            self.draw_idle()
+        elif (len(new_time) and new_time[0] <= x_max) or dropped_in_view:
+            columns = 2*max(1, int(self.axes.bbox.width))
+            for line, edge_x, edge_y in self.step_data:
+                self.resample_step_trace(line, edge_x, edge_y, x_min, x_max, columns)
+            self.update_animated_artists()
+
+    def stop_live_view(self):
+        """Draws the traces of a stopped live capture along with the rest of the figure again
+        """
+        lines = [line for line, _, _ in self.step_data]
+        for line in lines:
+            line.set_animated(False)
+        self.animated_artists = [artist for artist in self.animated_artists if artist not in lines]
+        self.live_edges = []
+        self.live_start_time = None
+        self.live_end_time = None
+        self.draw_idle()
+
+    def update_level_of_detail(self, *args):
+        """Plots only the edges of each trace in the visible range, decimated to the width of the axes in pixels
+        """
+        x_min, x_max = self.axes.get_xlim()
+        #Two columns per pixel keep the decimated lines as close to the full ones as matplotlib's own path simplification
+        columns = 2*max(1, int(self.axes.bbox.width))
+        for line, edge_x, edge_y in self.step_data:
+            self.resample_step_trace(line, edge_x, edge_y, x_min, x_max, columns)
+
+    def resample_step_trace(self, line, edge_x:np.ndarray, edge_y:np.ndarray, x_min:float, x_max:float, columns:int):
+        #Keep one edge on either side so that lines continue past the edges of the plot
+        first = max(np.searchsorted(edge_x, x_min, side='right') - 1, 0)
+        last = min(np.searchsorted(edge_x, x_max, side='left') + 1, len(edge_x))
+        x = edge_x[first:last]
+        y = edge_y[first:last]
+        if len(x) > 5*columns and x_max > x_min:
+            x, y = decimate_steps(x, y, x_min, x_max, columns)
+        line.set_data(x, y)
+
+    def initialize_cursor_snapping(self, time:np.ndarray, trace_data:np.ndarray, signal_data:np.ndarray = None):
+        """Sets up the cursor to snap to log lines where any of the traces changes value
+
+        Args:
+            time (np.ndarray): time of each log line
+            trace_data (np.ndarray): matrix of trace values, one column per trace
+            signal_data (np.ndarray, optional): matrix of signal values, one column per signal. Defaults to None.
+        """
+
+        #Reset save counter
+        self.save_count = 1
+
+        #Before adding any other lines, collect names of traces that have been added so far
+        self.trace_count = len(self.axes.get_lines())
+        self.trace_labels = [line.get_label() for line in self.axes.get_lines()]
+
+        self.update_snap_points(time, trace_data, signal_data)
+
+        #Re-set x and y axis limits
+        self.reset_time_axis(np.nanmax(time) if len(time) else 0)
+        self.axes.set_ylim([1, (self.trace_count+1)*2])
+
+        #Define vertical cursor line and measurement lines
+        self.vertical_line = self.axes.axvline(color='k', lw=0.8, ls='--')
+        self.measurement_start_line = self.axes.axvline(color='red', lw=2, ls='-')
+        self.measurement_end_line = self.axes.axvline(color='red', lw=2, ls='-')
+        self.measurement_start_line.set_visible(False)
+        self.measurement_end_line.set_visible(False)
+        self.measurement_step = 0
+        self.measured_value = 0
+        self.animated_artists = [self.vertical_line, self.measurement_start_line, self.measurement_end_line, self.text, self.measured_value_text, self.measurement_arrow]
+        for artist in self.animated_artists:
+            artist.set_animated(True)
+
+        self.text.set_text('t=%1.2f ms\nLine %d' % (0,self.current_snap_index+1))
+        self.text.set_position((0,-0.1))
+        self.text.set_visible(True)
+
+        self.measured_value_text.set_text('Δt = %1.2f ms' % abs(self.measured_value))
+        self.measured_value_text.set_position(((self.measurement_end_line.get_xdata()[0]+self.measurement_start_line.get_xdata()[0])/2, 0.04))
+        self.measured_value_text.set_visible(True)
+
+        self.measurement_arrow.xyann = (self.measurement_start_line.get_xdata()[0], 0)
+        self.measurement_arrow.xytext = (self.measurement_end_line.get_xdata()[0], 0)
+        self.measurement_arrow.set_visible(True)
+
+        self.fig.canvas.draw_idle()
+
+        self.fig.tight_layout()
+
+        self.text.set_visible(False)
+        self.measured_value_text.set_visible(False)
+        self.measurement_arrow.set_visible(False)
+
+
+    def on_draw(self, event):
+        """Caches the figure without cursor and measurement artists after every full draw, e.g. after resizing, panning or zooming
+        """
+        if self.use_blit:
+            self.background = self.copy_from_bbox(self.fig.bbox)
+            self.draw_animated_artists()
+
+    def draw_animated_artists(self):
+        for artist in self.animated_artists:
+            if artist.get_visible():
+                self.fig.draw_artist(artist)
+
+    def update_animated_artists(self):
+        """Redraws cursor and measurement artists. Only they are drawn over the cached background when blitting is available
+        """
+        if self.use_blit and self.background is not None:
+            self.restore_region(self.background)
+            self.draw_animated_artists()
+            self.blit(self.fig.bbox)
+        else:
+            self.draw()
+
+    def update_snap_points(self, time:np.ndarray, trace_data:np.ndarray, signal_data:np.ndarray = None):
+        """Sets up the cursor to snap to lines where any trace or signal changes. Each snap time maps to the first such line at that time
+        """
+        rows = transition_rows(trace_data, signal_data)
+        self.snap_x, first_rows = np.unique(time[rows], return_index=True)
+        self.snap_rows = rows[first_rows]
+        self._last_index = None
+
+    def append_snap_points(self, time:np.ndarray, new_rows:int, dropped:int, trace_data:np.ndarray, signal_data:np.ndarray = None):
+        """Adds snap points for lines appended by a live capture and drops those of lines dropped from the start.
+        Arguments are the same as for append_live_data
+        """
+        keep = np.searchsorted(self.snap_rows, dropped, side="right")
+        snap_x = self.snap_x[keep:]
+        snap_rows = self.snap_rows[keep:] - dropped
+        #The first new line is compared with the line before it
+        start = max(len(time) - new_rows - 1, 0)
+        rows = transition_rows(trace_data[start:], None if signal_data is None else signal_data[start:]) + start
+        new_x, first_rows = np.unique(time[rows], return_index=True)
+        #Times already snapped to map to their first line
+        later = new_x > snap_x[-1] if len(snap_x) else np.ones(len(new_x), dtype=bool)
+        self.snap_x = np.concatenate([snap_x, new_x[later]])
+        self.snap_rows = np.concatenate([snap_rows, rows[first_rows][later]])
+        self._last_index = None
+
+    def set_signal_readout(self, names:list[str], signal_data:np.ndarray):
+        """Shows the value of each signal on the line under the cursor in the status bar
+
+        Args:
+            names (list[str]): name of each signal
+            signal_data (np.ndarray): matrix of signal values, one column per signal
+        """
+        self.signal_names = names
+        self.signal_data = signal_data if names else None
+
+    def y_label_formatter(self, tick_val, tick_pos):
+        if self.trace_count:
+            yval_range = range(2*self.trace_count, 1, -2)
+            if int(tick_val) in yval_range:
+                return self.trace_labels[yval_range.index(int(tick_val))]
+        return ''
+
+    def set_cross_hair_visible(self, visible):
+        need_redraw = self.vertical_line.get_visible() != visible
+        self.vertical_line.set_visible(visible)
+        self.text.set_visible(visible)
+        return need_redraw
+
+    def on_mouse_move(self, event):
+        if self.trace_count > 0 and len(self.snap_x) > 0:
+            if not event.inaxes:
+                self._last_index = None
+                need_redraw = self.set_cross_hair_visible(False)
+                if need_redraw:
+                    self.update_animated_artists()
+            else:
+                self.set_cross_hair_visible(True)
+                x, y = event.xdata, event.ydata
+
+                #find index of the nearest match in the data to snap to            
+                self.current_snap_index = min(np.searchsorted(self.snap_x, x), len(self.snap_x) - 1)
+                if self.current_snap_index>0 and (abs(self.snap_x[self.current_snap_index] - x) > abs(self.snap_x[self.current_snap_index-1] - x)):
+                    self.current_snap_index -=1
+
+                if self.current_snap_index == self._last_index:
+                    return  # still on the same data point, no update needed
+                self._last_index = self.current_snap_index
+
+                self.current_line_index = int(self.snap_rows[self.current_snap_index])
+                x = self.snap_x[self.current_snap_index]
+
+
+                # update snapline position
+                self.vertical_line.set_xdata([x])
+                # show current time and line number in plot and in status bar
+                self.text.set_text('t=%1.2f ms\nLine %d' % (x,self.current_line_index+1))
+                status_label_text = 'Line %d   t=%1.2f ms   ' % (self.current_line_index+1, x)
+                if self.measurement_step > 0:
+                    status_label_text = ''.join([status_label_text, "Δt = %1.2f ms   " % abs(self.measured_value)])
+                if self.signal_data is not None:
+                    status_label_text += "".join("%s = %g   " % (name, value) for name, value in zip(self.signal_names, self.signal_data[self.current_line_index]))
+                self.status_label.setText(status_label_text)
+
+                #x in data coordinates, y in axes coordinates
+                self.text.set_position((x, -0.1))
+                self.update_animated_artists()
+
+
+    def on_press(self, event):
+        #print("keypress detected in matplotlib canvas:")
+        if event.key == " ":
+            if not event.inaxes:
+                #press spacebar outside the graph to clear measurement lines
+                self.measurement_start_line.set_visible(False)
+                self.measurement_end_line.set_visible(False)
+                self.measured_value_text.set_visible(False)
+                self.measurement_arrow.set_visible(False)
+                self.update_animated_artists()
+                self.measurement_step = 0 
+            else:
+                if self.measurement_step == 0:
+                    #press spacear once to set the first measurement line
+                    self.measurement_start_line.set_xdata(self.vertical_line.get_xdata())
+                    self.measurement_start_line.set_visible(True)
+                    self.update_animated_artists()  
+                    self.measurement_step += 1
+
+                elif self.measurement_step == 1:
+                    #press spacebar twice to set the second measurement line and display measured value
+                    self.measurement_end_line.set_xdata(self.vertical_line.get_xdata())
+                    self.measurement_end_line.set_visible(True)
+                    self.measured_value = self.measurement_end_line.get_xdata()[0] - self.measurement_start_line.get_xdata()[0]
+
+                    self.measured_value_text.set_text('Δt = %1.2f ms' % abs(self.measured_value))
+                    self.measured_value_text.set_position(((self.measurement_end_line.get_xdata()[0]+self.measurement_start_line.get_xdata()[0])/2, 0.04))
+                    self.measured_value_text.set_visible(True)
+
+                    self.measurement_arrow.xy = (self.measurement_start_line.get_xdata()[0], 0)
+                    self.measurement_arrow.xyann = (self.measurement_end_line.get_xdata()[0], 0)
+                    self.measurement_arrow.set_visible(True)
+
+                    self.update_animated_artists()  
+                    self.measurement_step += 1
+                else:
+                    #press spacebar again to clear measurement
+                    self.measurement_start_line.set_visible(False)
+                    self.measurement_end_line.set_visible(False)
+                    self.measured_value_text.set_visible(False)
+                    self.measurement_arrow.set_visible(False)
+                    self.update_animated_artists()  
+                    self.measurement_step = 0
+        else:
+            print(event.key)
+
+    def on_mouse_click(self, event):
+        if event.inaxes and self.trace_count > 0 and self._last_index is not None:
+            func = self.linked_callbacks.get("highlight_row", None)
+            if func:
+                func(self.current_line_index)
+
+    def set_callback_function(self, callback_type:str, callback_function:callable):
+        """Used to set callback functions, e.g. "highlight_row" which is called with the log line clicked on the plot
+
+        Args:
+            callback_type (str): name of the callback function
+            callback_function (callable): function that should be called
+        """
+        self.linked_callbacks[callback_type] = callback_function
+
+    def set_status_label(self, label:QtWidgets.QLabel):
+        """Passes a QLabel to the canvas. Used to display timestamp and log line number
+
+        Args:
+            label (QtWidgets.QLabel): A label that will display current timestamp and line in log file
+        """        
+        self.status_label = label
+
+    def get_default_filename(self) -> str:
+        filename = "".join([self.log_file_name, "_CAN-Analyze_" , datetime.datetime.today().strftime('%Y-%m-%d'), "_", str(self.save_count)])
+        self.save_count = self.save_count + 1
+        return filename
+
+    def reset_time_axis(self, max_time:float):
+        margin = max_time*0.05
+        if max_time > 0:
+            self.axes.set_xlim([-margin, max_time+margin])
+
+    def set_trace_labels(self, labels:list[str]):
+        """Labels the levels of the y axis from the top down. Call after initialize_cursor_snapping when there isn't
+        exactly one line per level, e.g. when traces of several logs are drawn on the same levels
+
+        Args:
+            labels (list[str]): label of each level
+        """
+        self.trace_count = len(labels)
+        self.trace_labels = list(labels)
+        self.axes.set_ylim([1, (self.trace_count+1)*2])
+
+    def set_log_legend(self, lines:list, log_names:list[str]):
+        """Shows which colour belongs to which log when traces of several logs are plotted
+
+        Args:
+            lines (list): a line of each log
+            log_names (list[str]): name of each log
+        """
+        self.axes.legend(lines, log_names, loc="upper right")
+
+    def set_plot_title(self,plot_title:str):
+        self.log_file_name = plot_title
+        self.axes.set_title(self.log_file_name)
+
+class BusLoadCanvas(FigureCanvasQTAgg):
+
+    def __init__(self, parent=None, width=5, height=2, dpi=100):
+        """A small plot of the message rate or bus load of a log over time, shown in the statistics window
+        """
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = self.fig.add_subplot(111)
+        super(BusLoadCanvas, self).__init__(self.fig)
+
+    def show_bus_load(self, series:dict):
+        """Plots a series returned by DataHandler.get_bus_load, the bus load if it was computed and the message rate otherwise
+        """
+        self.axes.clear()
+        if "load" in series:
+            self.axes.step(series["time"], series["load"]*100, where="post")
+            self.axes.set_ylabel("Bus load (%)")
+        else:
+            self.axes.step(series["time"], series["frames_per_second"], where="post")
+            self.axes.set_ylabel("Messages/s")
+        self.axes.set_xlabel("t (ms)")
+        self.axes.set_ylim(bottom=0)
+        self.fig.tight_layout()
+        self.draw_idle()
+
+class LatencyCanvas(FigureCanvasQTAgg):
+
+    def __init__(self, parent=None, width=5, height=3, dpi=100):
+        """A histogram of latencies between trace edges, shown in the statistics window
+        """
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = self.fig.add_subplot(111)
+        super(LatencyCanvas, self).__init__(self.fig)
+
+    def show_latency(self, latency:np.ndarray, p99:float = None):
+        """Plots the distribution of latencies returned by DataHandler.measure_latency, marking the 99th percentile
+        """
+        self.axes.clear()
+        if len(latency):
+            self.axes.hist(latency, bins=min(100, max(10, len(latency)//20)))
+            if p99 is not None:
+                self.axes.axvline(p99, color="tab:red", linestyle="--", label="p99")
+                self.axes.legend()
+        self.axes.set_xlabel("Δt (ms)")
+        self.axes.set_ylabel("Pairs")
+        self.fig.tight_layout()
+        self.draw_idle()
+
+class MplNavigationToolbar(NavigationToolbar2QT):
+    """Inherited class from matplotlib. Modified to remove unnecessary toolbar buttons and add new application specific ones
+    """    
+    def __init__(self, canvas, parent=None, coordinates=True):
+        #A dictionary that contains functions passed on from other classes that can be used by the toolbar
+        self.linked_callbacks = dict()
+
+        #text, tooltip_text, image file, callback function
+        #None means separator
+        NavigationToolbar2QT.toolitems = (
+                    ('Home', 'Reset view', 'home', 'home'),
+                    ('Back', 'Back to previous view', 'arrow-180', 'back'),
+                    ('Forward', 'Forward to next view', 'arrow', 'forward'),
+                    (None, None, None, None),
+                    ('Pan',
+                    'Left button pans, Right button zooms\n'
+                    'x/y fixes axis, CTRL fixes aspect',
+                    'arrow-move', 'pan'),
+                    ('Zoom', 'Zoom to rectangle\nx/y fixes axis', 'magnifier-zoom', 'zoom'),
+                    #('Subplots', 'Configure subplots', 'subplots', 'configure_subplots'),
+                    (None, None, None, None),
+                    ('Screenshot', 'Save plot', 'camera', 'save_figure'),
+                    ('Save', 'Save log with descriptions', 'disk', 'save_log'),
+                    ('Open', 'Open log file, filter or trace configuration', 'folder-open-document-text', 'open_file')
+                    )
+
+        NavigationToolbar2QT.__init__(self, canvas, parent, coordinates)
+
+    def set_callback_function(self, callback_type:str, callback_function:callable):
+        """Used to set callback functions for custom toolbar buttons
+
+        Args:
+            callback_type (str): name of the callback function
+            callback_function (callable): function that should be called
+        """        
+        self.linked_callbacks[callback_type] = callback_function
+
+    def open_file(self):
+        """Callback function for Open button on toolbar
+        """        
+        func = self.linked_callbacks.get("open_file", None)
+        if func:
+            func()
+
+    def save_log(self):
+        """Callback function for Save button on toolbar
+        """        
+        func = self.linked_callbacks.get("save_log", None)
+        if func:
+            func()
+
+    def _icon(self, name):
+        """
+        Re-implementation of matplotlib toolbar method to bypass built-in icons and replace them with application specific ones
+        Construct a `.QIcon` from an image file *name*. Name must already include file type extension
+        """
+        path_to_icon = resolve_path("images" + os.path.sep + name)
+        return QtGui.QIcon(path_to_icon)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+
+def resolve_path(path:str, freeze_path:bool = True) -> str:
+    """A helper function to convert relative paths to absolute paths for correct resource location both when program is run as a script or bundled as an executable
+
+    Args:
+        path (str): relative path to desired resource
+        freeze_path (bool, optional): in a bundled executable look for resource in the un-bundle location (instead of executable directory). Defaults to True.
+
+    Returns:
+        str: runtime absolute path to desired resource
+    """     
+    if getattr(sys, "frozen", False) and freeze_path:
+        # If the 'frozen' flag is set, we are in bundled app mode
+        resolved_path = os.path.abspath(os.path.join(sys._MEIPASS, path))
+    else:
+        # Normal development mode
+        resolved_path = os.path.abspath(os.path.join(os.getcwd(), path))
+
+    return resolved_path
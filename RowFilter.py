@@ -0,0 +1,125 @@
+import re
+import shlex
+from fnmatch import fnmatchcase
+import numpy as np
+from LogStore import LogStore
+from LogIndex import normalize_trace_name
+from SignalDecoder import parse_hex_pattern
+
+#Kinds of terms that can hide rows as well as show them
+HIDEABLE_KINDS = ("id", "description", "colour")
+#Prefixes accepted in filter text for each kind of term
+TERM_PREFIXES = {"id": "id", "desc": "description", "description": "description", "colour": "colour", "color": "colour",
+                 "trace": "trace", "time": "time"}
+
+
+def parse_row_filter(text:str) -> dict:
+    """Parses a row filter typed above the table, e.g. 'id:0011FF?? -id:00010010 desc:"sheet exit" trace:"S5 Ready"=1 time:1000..5000'.
+    Terms are separated by spaces, quote terms containing spaces. A term prefixed with "-" hides matching rows. Terms
+    without a prefix are IDs if they are 8 hex digits and descriptions otherwise
+
+    Returns:
+        dict: row filter, see select_rows
+    """
+    row_filter = dict()
+    for term in shlex.split(text):
+        hide = term.startswith("-")
+        term = term[1:] if hide else term
+        prefix, separator, value = term.partition(":")
+        if separator and prefix.lower() in TERM_PREFIXES:
+            kind = TERM_PREFIXES[prefix.lower()]
+        else:
+            kind, value = ("id" if re.fullmatch(r"[0-9A-Fa-f?xX]{8}", term) else "description"), term
+        if not value:
+            continue
+        if hide and kind not in HIDEABLE_KINDS:
+            raise ValueError("%s terms can't be hidden" % kind)
+        if kind == "trace":
+            name, _, state = value.rpartition("=") if "=" in value else (value, "", "1")
+            if state not in ("0", "1"):
+                raise ValueError("Trace state must be 0 or 1: %s" % value)
+            row_filter.setdefault("trace", dict())[name] = int(state)
+        elif kind == "time":
+            start, separator, end = value.partition("..")
+            if not separator:
+                raise ValueError("Time range must be written as start..end: %s" % value)
+            row_filter["time"] = (float(start) if start else None, float(end) if end else None)
+        else:
+            row_filter.setdefault(("hide_" if hide else "") + kind, []).append(value)
+    check_row_filter(row_filter)
+    return row_filter
+
+
+def check_row_filter(row_filter:dict):
+    """Raises ValueError for ID patterns that can't be matched, so that they are reported when the filter is set
+    rather than when rows are selected
+    """
+    for pattern in row_filter.get("id", []) + row_filter.get("hide_id", []):
+        parse_hex_pattern(pattern, 8)
+
+
+def match_categories(categories:np.ndarray, patterns:list[str]) -> np.ndarray:
+    """Matches description or colour categories against patterns, ignoring case. Patterns without wildcards match
+    categories that contain them
+
+    Returns:
+        np.ndarray: True for each category matching any pattern
+    """
+    patterns = [pattern.lower() if re.search(r"[*?\[]", pattern) else "*%s*" % pattern.lower() for pattern in patterns]
+    return np.array([any(fnmatchcase(str(category).lower(), pattern) for pattern in patterns) for category in categories], dtype=bool)
+
+
+def match_ids(message_id:np.ndarray, patterns:list[str]) -> np.ndarray:
+    """Matches message IDs against hex patterns where "x" or "?" matches any digit. Shorter patterns match the start of the ID
+    """
+    matched = np.zeros(len(message_id), dtype=bool)
+    for pattern in patterns:
+        value, mask = parse_hex_pattern(pattern, 8)
+        matched |= (message_id & np.uint32(mask)) == np.uint32(value)
+    return matched
+
+
+def select_rows(log:LogStore, trace_names:list[str], row_filter:dict) -> np.ndarray:
+    """Finds the rows of a log shown by a row filter. Rows have to match every kind of term in the filter, any of the
+    terms of each kind, and none of the hiding terms
+
+    Args:
+        log (LogStore): annotated log
+        trace_names (list[str]): name of each trace column
+        row_filter (dict): any of "id", "hide_id" (hex patterns), "description", "hide_description", "colour",
+            "hide_colour" (category patterns, see match_categories), "trace" ({trace name: 0 or 1}) and "time"
+            ((start, end) in ms, either may be None)
+
+    Returns:
+        np.ndarray: sorted row numbers
+    """
+    shown = np.ones(len(log), dtype=bool)
+    #IDs of irregular rows were only partially decoded, so they match no ID terms
+    regular = np.ones(len(log), dtype=bool)
+    regular[np.fromiter(log.irregular, dtype=np.int64, count=len(log.irregular))] = False
+    if row_filter.get("id"):
+        shown &= regular & match_ids(log.message_id, row_filter["id"])
+    if row_filter.get("hide_id"):
+        shown &= ~(regular & match_ids(log.message_id, row_filter["hide_id"]))
+
+    for kind, codes, categories in (("description", log.description_codes, log.description_categories),
+                                    ("colour", log.colour_codes, log.colour_categories)):
+        if row_filter.get(kind):
+            shown &= match_categories(categories, row_filter[kind])[codes]
+        if row_filter.get("hide_" + kind):
+            shown &= ~match_categories(categories, row_filter["hide_" + kind])[codes]
+
+    #Like a search for its transitions, a trace the log doesn't have matches no rows
+    normalized_names = [normalize_trace_name(name) for name in trace_names]
+    for name, state in row_filter.get("trace", dict()).items():
+        if normalize_trace_name(name) not in normalized_names:
+            shown[:] = False
+        else:
+            shown &= log.trace_data[:,normalized_names.index(normalize_trace_name(name))] == state
+
+    start, end = row_filter.get("time", (None, None))
+    if start is not None:
+        shown &= log.time >= start
+    if end is not None:
+        shown &= log.time <= end
+    return np.flatnonzero(shown)
@@ -0,0 +1,134 @@
+import re
+import numpy as np
+
+#Fields of a signal definition and their defaults, see load_signal
+SIGNAL_DEFAULTS = {"data": "", "byte_order": "big_endian", "signed": False, "scale": 1.0, "offset": 0.0, "unit": ""}
+
+
+def is_signal_definition(entry:dict) -> bool:
+    """Entries of a trace configuration with a start bit are signals, the others are high/low traces
+    """
+    return "start_bit" in entry
+
+
+def parse_hex_pattern(pattern:str, digits:int) -> tuple:
+    """Converts a hex pattern where "x" or "?" matches any digit to a value and a mask
+
+    Args:
+        pattern (str): hex digits, spaces and commas are ignored. Shorter patterns match the start of the value
+        digits (int): number of hex digits of the value
+
+    Returns:
+        tuple: (value, mask) as int
+    """
+    pattern = re.sub(r"[\s,]", "", pattern).upper().replace("X", "?")
+    if len(pattern) > digits or not re.fullmatch(r"[0-9A-F?]*", pattern):
+        raise ValueError("Invalid pattern %s" % pattern)
+    pattern = pattern.ljust(digits, "?")
+    value = int(pattern.replace("?", "0"), 16)
+    mask = int("".join("0" if char == "?" else "F" for char in pattern), 16)
+    return value, mask
+
+
+def load_signal(entry:dict) -> dict:
+    """Checks a signal definition and fills in defaults. Bits are numbered like in DBC files: bit 0 is the least
+    significant bit of D0 and bit 63 the most significant bit of D7. The start bit of a big endian signal is its most
+    significant bit, that of a little endian signal its least significant bit
+
+    Args:
+        entry (dict): "name", "id" (8 hex digits, "x" matches any digit), "start_bit", "length" and optionally
+            "data" (pattern the data bytes have to match, e.g. "xx 07 00 3C"), "byte_order" ("big_endian" or
+            "little_endian"), "signed", "scale", "offset" and "unit"
+
+    Returns:
+        dict: the definition with defaults filled in
+    """
+    missing = [field for field in ("name", "id", "start_bit", "length") if field not in entry]
+    if missing:
+        raise ValueError("Signal definition %s is missing %s" % (entry.get("name", ""), ", ".join(missing)))
+    signal = dict(SIGNAL_DEFAULTS, **entry)
+    parse_hex_pattern(signal["id"], 8)
+    parse_hex_pattern(signal["data"], 16)
+    if signal["byte_order"] not in ("big_endian", "little_endian"):
+        raise ValueError("Signal %s: byte_order must be big_endian or little_endian" % signal["name"])
+    if not 1 <= signal["length"] <= 64:
+        raise ValueError("Signal %s: length must be 1 to 64 bits" % signal["name"])
+    if signal_bits(signal)[0] < 0 or signal_bytes(signal) > 8:
+        raise ValueError("Signal %s doesn't fit in 8 data bytes" % signal["name"])
+    return signal
+
+
+def signal_bits(signal:dict) -> tuple:
+    """Returns (shift, length) that extract a signal from the data bytes packed into an integer: D0 in the most
+    significant byte for big endian signals, in the least significant byte for little endian ones
+    """
+    start_bit = signal["start_bit"]
+    if signal["byte_order"] == "little_endian":
+        return start_bit, signal["length"]
+    #Position of the most significant bit counted from the least significant bit of D7
+    msb = (7 - start_bit // 8)*8 + start_bit % 8
+    return msb - signal["length"] + 1, signal["length"]
+
+
+def signal_bytes(signal:dict) -> int:
+    """Returns the number of data bytes a message needs to contain a signal
+    """
+    shift, length = signal_bits(signal)
+    if signal["byte_order"] == "little_endian":
+        return (shift + length - 1) // 8 + 1
+    return 8 - shift // 8
+
+
+def decode_signal(message_id:np.ndarray, payload:np.ndarray, dlc:np.ndarray, signal:dict, irregular:dict = None) -> np.ndarray:
+    """Decodes a signal from every message of a log at once
+
+    Args:
+        message_id (np.ndarray): message ID of each row
+        payload (np.ndarray): data bytes of each row, one row of 8 bytes per message
+        dlc (np.ndarray): number of data bytes of each row
+        signal (dict): definition as returned by load_signal
+        irregular (dict, optional): rows that can't be decoded, see LogStore. Defaults to None.
+
+    Returns:
+        np.ndarray: physical value on rows with a matching message and NaN elsewhere
+    """
+    id_value, id_mask = parse_hex_pattern(signal["id"], 8)
+    data_value, data_mask = parse_hex_pattern(signal["data"], 16)
+    #D0 is the most significant byte of the packed big endian data
+    packed = np.ascontiguousarray(payload, dtype=np.uint8).view(">u8").reshape(-1).astype(np.uint64)
+    matched = (message_id & np.uint32(id_mask)) == np.uint32(id_value)
+    matched &= (packed & np.uint64(data_mask)) == np.uint64(data_value)
+    matched &= dlc >= signal_bytes(signal)
+    if irregular:
+        matched[np.fromiter(irregular, dtype=np.int64, count=len(irregular))] = False
+
+    shift, length = signal_bits(signal)
+    if signal["byte_order"] == "little_endian":
+        packed = packed.byteswap()
+    raw = (packed[matched] >> np.uint64(shift)) & np.uint64((1 << length) - 1)
+    if signal["signed"]:
+        #Two's complement. 64 bit signals already wrap around when converted
+        raw = raw.astype(np.int64)
+        if length < 64:
+            raw[raw >= 1 << (length - 1)] -= 1 << length
+    values = np.full(len(message_id), np.nan)
+    values[matched] = raw*signal["scale"] + signal["offset"]
+    return values
+
+
+def hold_values(values:np.ndarray) -> np.ndarray:
+    """Keeps each decoded value until the next message of the signal, like the trace latches. Rows before the first
+    message stay NaN
+    """
+    rows = np.where(np.isnan(values), 0, np.arange(len(values)))
+    np.maximum.accumulate(rows, out=rows)
+    return values[rows]
+
+
+def value_range(values:np.ndarray) -> tuple:
+    """Returns (low, high) of the decoded values of a signal for scaling it in a plot. high is always above low
+    """
+    if not np.any(np.isfinite(values)):
+        return 0.0, 1.0
+    low, high = np.nanmin(values), np.nanmax(values)
+    return (low, high) if high > low else (low - 0.5, low + 0.5)